@@ -1,4 +1,6 @@
 from django.contrib import admin
+
+from core.uploads import IMAGE_FORMFIELD_OVERRIDES
 from .models import User, UserFollows
 
 
@@ -12,6 +14,14 @@ class UserFollowsAdmin(admin.ModelAdmin):
 class UserAdmin(admin.ModelAdmin):
     """Liste des utilisateurs"""
     list_display = ("username", "last_login", "date_joined", "is_staff")
+    readonly_fields = (
+        "followers_count",
+        "following_count",
+        "ticket_count",
+        "review_count",
+        "profile_photo_status",
+    )
+    formfield_overrides = IMAGE_FORMFIELD_OVERRIDES
 
 
 
@@ -2,6 +2,8 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm, PasswordChangeForm
 from django.contrib.auth import get_user_model
 
+from core.uploads import BoundedImageField
+
 User = get_user_model()
 TAILWIND_INPUT_CLASS = "w-full px-4 py-2 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-transparent"
 
@@ -138,6 +140,9 @@ class ProfilePictureForm(forms.ModelForm):
         model = User
         fields = ["profile_photo"]
 
+        # Image limitée en taille de fichier et en pixels (core/uploads.py)
+        field_classes = {"profile_photo": BoundedImageField}
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
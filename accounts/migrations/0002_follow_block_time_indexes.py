@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="userblock",
+            name="accounts_us_blocker_47e452_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="userfollows",
+            name="accounts_us_user_id_461baf_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="userfollows",
+            name="accounts_us_followe_0721fd_idx",
+        ),
+        migrations.AddIndex(
+            model_name="userblock",
+            index=models.Index(
+                fields=["blocker", "-created_at"], name="accounts_us_blocker_1cc77b_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="userfollows",
+            index=models.Index(
+                fields=["user", "-created_at"], name="accounts_us_user_id_18a96f_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="userfollows",
+            index=models.Index(
+                fields=["followed_user", "-created_at"],
+                name="accounts_us_followe_53ec7a_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0002_follow_block_time_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="followers_count",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Nombre d'abonnés"
+            ),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="following_count",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Nombre d'abonnements"
+            ),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="review_count",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Nombre de critiques"
+            ),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="ticket_count",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Nombre de tickets"
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0003_user_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="profile_photo_status",
+            field=models.CharField(
+                choices=[
+                    ("PENDING", "En attente"),
+                    ("PROCESSING", "En cours"),
+                    ("READY", "Prête"),
+                    ("FAILED", "Échec"),
+                ],
+                default="READY",
+                max_length=10,
+                verbose_name="Traitement de la photo",
+            ),
+        ),
+    ]
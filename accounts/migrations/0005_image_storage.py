@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:03
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0004_user_profile_photo_status"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="user",
+            name="profile_photo",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=core.storage.image_storage,
+                upload_to="profile_pics/",
+                verbose_name="Photo de profil",
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0005_image_storage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="profile_photo_generation",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Génération des variantes"
+            ),
+        ),
+    ]
@@ -1,13 +1,14 @@
-import os
-
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
 from django.db.models import Q
-from PIL import Image
+
+from core import images
+from core.models import CounterFieldsMixin
+from core.storage import image_storage
 
 
-class User(AbstractUser):
+class User(CounterFieldsMixin, AbstractUser):
     """
     Modèle utilisateur personnalisé avec photo de profil et rôle
 
@@ -28,11 +29,29 @@ class User(AbstractUser):
     # Photo de profil (optionnelle)
     profile_photo = models.ImageField(
         upload_to="profile_pics/",
+        storage=image_storage,
         blank=True,
         null=True,
         verbose_name="Photo de profil"
     )
 
+    # Statut du traitement de l'image (terminé en arrière-plan, voir core/images.py)
+    profile_photo_status = models.CharField(
+        max_length=10,
+        choices=images.STATUS_CHOICES,
+        default=images.READY,
+        verbose_name="Traitement de la photo",
+    )
+
+    # Génération des variantes (core/images.py), indexée : sa valeur maximale
+    # est lue à chaque image traitée
+    profile_photo_generation = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        db_index=True,
+        verbose_name="Génération des variantes",
+    )
+
     # Rôle de l'utilisateur
     role = models.CharField(
         max_length=30,
@@ -51,40 +70,36 @@ class User(AbstractUser):
         verbose_name="Suit"
     )
 
+    # Compteurs dénormalisés (tenus à jour par core/signals.py)
+    followers_count = models.PositiveIntegerField(default=0, verbose_name="Nombre d'abonnés")
+    following_count = models.PositiveIntegerField(
+        default=0, verbose_name="Nombre d'abonnements"
+    )
+    ticket_count = models.PositiveIntegerField(default=0, verbose_name="Nombre de tickets")
+    review_count = models.PositiveIntegerField(default=0, verbose_name="Nombre de critiques")
+
+    # Compteurs jamais réécrits par un enregistrement complet (core/models.py)
+    COUNTER_FIELDS = (
+        "followers_count",
+        "following_count",
+        "ticket_count",
+        "review_count",
+    )
+
     # Taille maximale pour le redimensionnement
     IMAGE_MAX_SIZE = (800, 800)
 
-    def resize_image(self):
-        """Redimensionne l'image en conservant les proportions"""
-        # Vérifier que l'image existe
-        if not self.profile_photo or not self.profile_photo.name:
-            return
-
-        # Vérifier que le fichier existe physiquement
-        try:
-            if not os.path.exists(self.profile_photo.path):
-                return
-        except (ValueError, AttributeError):
-            return
-
-        # Redimensionner avec gestion d'erreurs
-        try:
-            profile_photo = Image.open(self.profile_photo.path)
-
-            # Redimensionner seulement si nécessaire
-            if profile_photo.height > self.IMAGE_MAX_SIZE[1] or profile_photo.width > self.IMAGE_MAX_SIZE[0]:
-                profile_photo.thumbnail(self.IMAGE_MAX_SIZE, Image.Resampling.LANCZOS)
-                profile_photo.save(self.profile_photo.path)
-        except Exception as e:
-            print(f"Erreur lors du redimensionnement de l'image : {e}")
-
     def save(self, *args, **kwargs):
-        """Sauvegarde et redimensionne automatiquement la photo de profil"""
+        """Sauvegarde, la photo de profil est réduite en mémoire avant son écriture"""
+        new_photo = images.is_new_upload(self.profile_photo)
+        if new_photo:
+            images.resize_upload(self, "profile_photo", self.IMAGE_MAX_SIZE)
+            self.profile_photo_status = images.PENDING
+
         super().save(*args, **kwargs)
 
-        # Redimensionner uniquement si une photo existe
-        if self.profile_photo:
-            self.resize_image()
+        if new_photo:
+            images.schedule_resize(self, "profile_photo", self.IMAGE_MAX_SIZE)
 
     class Meta:
         verbose_name = "Utilisateur"
@@ -94,6 +109,30 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    @property
+    def avatar_url(self):
+        """Photo de profil en avatar 48x48 (l'original tant que la variante manque)"""
+        return images.variant_url(
+            self.profile_photo, self.profile_photo_status, images.AVATAR_WIDTHS[0]
+        )
+
+    @property
+    def avatar_srcset(self):
+        """Avatars 1x et 2x pour l'attribut srcset (vide tant qu'ils manquent)"""
+        return images.density_srcset(
+            self.profile_photo, self.profile_photo_status, images.AVATAR_WIDTHS
+        )
+
+    @property
+    def avatar_sources(self):
+        """Avatars AVIF / WebP pour les balises <source> : (type MIME, srcset)"""
+        return images.modern_sources(
+            images.density_srcset,
+            self.profile_photo,
+            self.profile_photo_status,
+            images.AVATAR_WIDTHS,
+        )
+
 class UserFollows(models.Model):
     """
     Modèle pour gérer les abonnements entre utilisateurs
@@ -138,9 +177,10 @@ class UserFollows(models.Model):
         verbose_name_plural = "Abonnements"
 
         # Index pour améliorer les performances
+        # (listes triées de la page des abonnements, sans tri temporaire)
         indexes = [
-            models.Index(fields=["user"]),
-            models.Index(fields=["followed_user"]),
+            models.Index(fields=["user", "-created_at"]),
+            models.Index(fields=["followed_user", "-created_at"]),
         ]
 
     def __str__(self):
@@ -206,7 +246,7 @@ class UserBlock(models.Model):
 
         # Index pour améliorer les performances
         indexes = [
-            models.Index(fields=["blocker"]),
+            models.Index(fields=["blocker", "-created_at"]),
             models.Index(fields=["blocked_user"]),
         ]
 
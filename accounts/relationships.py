@@ -0,0 +1,168 @@
+"""
+Service des relations entre utilisateurs (abonnements et blocages)
+
+Fournit, depuis le cache, pour un utilisateur :
+- les identifiants des utilisateurs qu'il suit
+- les identifiants des utilisateurs bloqués dans les deux sens
+
+Le cache est invalidé par les signaux de UserFollows et UserBlock
+(voir accounts/signals.py). Il sert à l'affichage ; les contrôles
+qui précèdent une écriture lisent la base (block_exists, follow_exists)
+"""
+
+import asyncio
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from .models import UserFollows, UserBlock
+
+
+# Durée de vie (en secondes) des relations en cache
+RELATIONSHIPS_CACHE_TIMEOUT = 60 * 60
+
+Relationships = namedtuple("Relationships", ["followed_ids", "blocked_ids"])
+
+
+def relationships_cache_key(user_id):
+    return f"relationships:{user_id}"
+
+
+def get_relationships(user):
+    """
+    Relations d'un utilisateur (objet User ou identifiant)
+
+    Deux requêtes au plus en cas d'absence du cache, aucune sinon
+    """
+    user_id = getattr(user, "pk", user)
+    key = relationships_cache_key(user_id)
+
+    relationships = cache.get(key)
+    if relationships is None:
+        relationships = load_relationships(user_id)
+        cache.set(key, relationships, RELATIONSHIPS_CACHE_TIMEOUT)
+
+    return relationships
+
+
+async def aget_relationships(user):
+    """Version asynchrone de get_relationships"""
+    user_id = getattr(user, "pk", user)
+    key = relationships_cache_key(user_id)
+
+    relationships = await cache.aget(key)
+    if relationships is None:
+        relationships = await aload_relationships(user_id)
+        await cache.aset(key, relationships, RELATIONSHIPS_CACHE_TIMEOUT)
+
+    return relationships
+
+
+# Les relations sont lues comme des ensembles : le tri par défaut est retiré
+def followed_query(user_id):
+    """Identifiants des utilisateurs suivis"""
+    return (
+        UserFollows.objects.filter(user_id=user_id)
+        .order_by()
+        .values_list("followed_user_id", flat=True)
+    )
+
+
+def blocks_query(user_id):
+    """Blocages dans les deux sens, en une seule requête"""
+    return (
+        UserBlock.objects.filter(Q(blocker_id=user_id) | Q(blocked_user_id=user_id))
+        .order_by()
+        .values_list("blocker_id", "blocked_user_id")
+    )
+
+
+def build_relationships(user_id, followed_ids, blocks):
+    blocked_ids = {
+        blocked_user_id if blocker_id == user_id else blocker_id
+        for blocker_id, blocked_user_id in blocks
+    }
+    return Relationships(frozenset(followed_ids), frozenset(blocked_ids))
+
+
+def load_relationships(user_id):
+    """Lit les relations d'un utilisateur dans la base de données"""
+    return build_relationships(user_id, followed_query(user_id), blocks_query(user_id))
+
+
+async def aload_relationships(user_id):
+    """
+    Version asynchrone de load_relationships
+
+    Les deux requêtes passent par le thread unique de l'ORM asynchrone :
+    elles s'exécutent l'une après l'autre
+    """
+    followed_ids, blocks = await asyncio.gather(
+        alist(followed_query(user_id)), alist(blocks_query(user_id))
+    )
+    return build_relationships(user_id, followed_ids, blocks)
+
+
+async def alist(queryset):
+    """
+    Évalue un queryset de façon asynchrone
+
+    aiterator() n'est pas utilisé : avec values_list(), il exécute la requête
+    avant de passer dans un thread (SynchronousOnlyOperation)
+    """
+    return [row async for row in queryset]
+
+
+def get_followed_ids(user):
+    """Identifiants des utilisateurs suivis"""
+    return get_relationships(user).followed_ids
+
+
+def get_blocked_ids(user):
+    """Identifiants des utilisateurs bloqués (bidirectionnel)"""
+    return get_relationships(user).blocked_ids
+
+
+def is_following(user, other):
+    """L'utilisateur suit-il other ? (lecture du cache, pour l'affichage)"""
+    return getattr(other, "pk", other) in get_followed_ids(user)
+
+
+def is_blocked(user, other):
+    """
+    Existe-t-il un blocage entre les deux utilisateurs (dans un sens ou l'autre) ?
+
+    Lecture du cache, pour l'affichage : les contrôles avant une écriture
+    utilisent block_exists
+    """
+    return getattr(other, "pk", other) in get_blocked_ids(user)
+
+
+# Contrôles des écritures (abonnement, critique, fan-out) : lus en base.
+# Le cache peut être local à un processus, et donc en retard sur un blocage
+# enregistré par un autre processus
+def follow_exists(user, other):
+    """L'utilisateur suit-il other ? (lu en base)"""
+    return UserFollows.objects.filter(
+        user_id=getattr(user, "pk", user), followed_user_id=getattr(other, "pk", other)
+    ).exists()
+
+
+def block_exists(user, other):
+    """Blocage entre les deux utilisateurs, dans un sens ou l'autre (lu en base)"""
+    user_id, other_id = getattr(user, "pk", user), getattr(other, "pk", other)
+    return UserBlock.objects.filter(
+        Q(blocker_id=user_id, blocked_user_id=other_id)
+        | Q(blocker_id=other_id, blocked_user_id=user_id)
+    ).exists()
+
+
+def load_blocked_ids(user_id):
+    """Utilisateurs bloqués dans les deux sens (lus en base)"""
+    return build_relationships(user_id, (), blocks_query(user_id)).blocked_ids
+
+
+def invalidate_relationships(*user_ids):
+    """Supprime du cache les relations des utilisateurs"""
+    cache.delete_many([relationships_cache_key(user_id) for user_id in set(user_ids)])
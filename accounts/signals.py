@@ -0,0 +1,35 @@
+"""
+Signaux d'invalidation du cache des relations (accounts/relationships.py)
+
+- Abonnement créé ou supprimé : relations de l'abonné
+- Blocage créé ou supprimé : relations des deux utilisateurs
+
+L'invalidation est refaite après la validation de la transaction,
+pour qu'une lecture concurrente ne remette pas en cache l'ancien état
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import UserFollows, UserBlock
+from .relationships import invalidate_relationships
+
+
+def invalidate(*user_ids):
+    invalidate_relationships(*user_ids)
+    transaction.on_commit(lambda: invalidate_relationships(*user_ids))
+
+
+@receiver(post_save, sender=UserFollows)
+@receiver(post_delete, sender=UserFollows)
+def invalidate_follower_relationships(sender, instance, **kwargs):
+    """Un abonnement change : seules les relations de l'abonné sont concernées"""
+    invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=UserBlock)
+@receiver(post_delete, sender=UserBlock)
+def invalidate_blocked_relationships(sender, instance, **kwargs):
+    """Un blocage change : les relations des deux utilisateurs sont concernées"""
+    invalidate(instance.blocker_id, instance.blocked_user_id)
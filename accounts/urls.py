@@ -9,6 +9,7 @@ urlpatterns = [
     path("profile/edit/", views.edit_profile_page, name="edit_profile"),
     path("profile/change-password/", views.change_password_page, name="change_password"),
     path("subscriptions/", views.subscriptions, name="subscriptions"),
+    path("subscriptions/async/", views.subscriptions_async, name="subscriptions_async"),
     path("follow/<int:user_id>/", views.follow_user, name="follow_user"),
     path("unfollow/<int:user_id>/", views.unfollow_user, name="unfollow_user"),
     path("block/<int:user_id>/", views.block_user, name="block_user"),
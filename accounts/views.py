@@ -1,10 +1,12 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth import authenticate, login, logout, update_session_auth_hash
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q
 from django.shortcuts import render, redirect, get_object_or_404
 
-from . import forms
+from . import forms, relationships
 from .models import UserFollows, User, UserBlock
 
 
@@ -183,19 +185,14 @@ def subscriptions(request):
                     messages.error(request, "Vous ne pouvez pas vous suivre vous-même.")
 
                 # Validation : vérifier si un blocage existe
-                elif UserBlock.objects.filter(
-                    Q(blocker=request.user, blocked_user=user_to_follow)
-                    | Q(blocker=user_to_follow, blocked_user=request.user)
-                ).exists():
+                elif relationships.block_exists(request.user, user_to_follow):
                     messages.error(
                         request,
                         "Vous ne pouvez pas suivre cet utilisateur en raison d'un blocage.",
                     )
 
                 # Validation : on ne suit pas déjà cet utilisateur
-                elif UserFollows.objects.filter(
-                    user=request.user, followed_user=user_to_follow
-                ).exists():
+                elif relationships.follow_exists(request.user, user_to_follow):
                     messages.warning(
                         request, f"Vous suivez déjà {user_to_follow.username}."
                     )
@@ -219,26 +216,20 @@ def subscriptions(request):
         return redirect("subscriptions")
 
     # Affichage de la page (GET)
-    following = UserFollows.objects.filter(user=request.user).select_related(
-        "followed_user"
-    )
-
-    followers = UserFollows.objects.filter(followed_user=request.user).select_related(
-        "user"
-    )
+    following = following_query(request.user)
+    followers = followers_query(request.user)
 
     # Récupérer les utilisateurs bloqués
-    blocked_users_preview = UserBlock.objects.filter(
-        blocker=request.user
-    ).select_related("blocked_user")[:3]
+    blocked_users_preview = blocked_preview_query(request.user)
 
     blocked_count = UserBlock.objects.filter(blocker=request.user).count()
 
     context = {
         "following": following,
         "followers": followers,
-        "following_count": following.count(),
-        "followers_count": followers.count(),
+        # Compteurs dénormalisés : aucune requête COUNT
+        "following_count": request.user.following_count,
+        "followers_count": request.user.followers_count,
         "blocked_users_preview": blocked_users_preview,
         "blocked_count": blocked_count,
         "active_page": "subscriptions",
@@ -247,6 +238,54 @@ def subscriptions(request):
     return render(request, "accounts/subscriptions.html", context)
 
 
+@login_required
+async def subscriptions_async(request):
+    """
+    Version asynchrone de la page des abonnements (servie par config/asgi.py)
+
+    Les abonnements, abonnés et blocages sont attendus ensemble (asyncio.gather) ;
+    l'ORM asynchrone exécute leurs requêtes l'une après l'autre, dans un seul thread.
+    La recherche (POST) reste traitée par la vue synchrone
+    """
+
+    if request.method == "POST":
+        return await sync_to_async(subscriptions)(request)
+
+    user = await request.auser()
+
+    following, followers, blocked_users_preview, blocked_count = await asyncio.gather(
+        relationships.alist(following_query(user)),
+        relationships.alist(followers_query(user)),
+        relationships.alist(blocked_preview_query(user)),
+        UserBlock.objects.filter(blocker=user).acount(),
+    )
+
+    context = {
+        "following": following,
+        "followers": followers,
+        "following_count": user.following_count,
+        "followers_count": user.followers_count,
+        "blocked_users_preview": blocked_users_preview,
+        "blocked_count": blocked_count,
+        "active_page": "subscriptions",
+    }
+
+    return await sync_to_async(render)(request, "accounts/subscriptions.html", context)
+
+
+# Requêtes de la page des abonnements (partagées par les deux versions)
+def following_query(user):
+    return UserFollows.objects.filter(user=user).select_related("followed_user")
+
+
+def followers_query(user):
+    return UserFollows.objects.filter(followed_user=user).select_related("user")
+
+
+def blocked_preview_query(user):
+    return UserBlock.objects.filter(blocker=user).select_related("blocked_user")[:3]
+
+
 @login_required
 def follow_user(request, user_id):
     """
@@ -263,21 +302,14 @@ def follow_user(request, user_id):
         return redirect("subscriptions")
 
     # Vérifier si un blocage existe
-    block_exists = UserBlock.objects.filter(
-        Q(blocker=request.user, blocked_user=user_to_follow)
-        | Q(blocker=user_to_follow, blocked_user=request.user)
-    ).exists()
-
-    if block_exists:
+    if relationships.block_exists(request.user, user_to_follow):
         messages.error(
             request, "Vous ne pouvez pas suivre cet utilisateur en raison d'un blocage."
         )
         return redirect("subscriptions")
 
     # Vérifier si on ne suit pas déjà cet utilisateur
-    if UserFollows.objects.filter(
-        user=request.user, followed_user=user_to_follow
-    ).exists():
+    if relationships.follow_exists(request.user, user_to_follow):
         messages.warning(request, f"Vous suivez déjà {user_to_follow.username}.")
         return redirect("subscriptions")
 
@@ -379,7 +411,7 @@ def blocked_users(request):
 
     context = {
         "blocked_users": blocked_users,
-        "blocked_count": blocked_users.count(),
+        "blocked_count": len(blocked_users),
     }
 
     return render(request, "accounts/blocked_users.html", context)
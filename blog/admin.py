@@ -1,10 +1,14 @@
 from django.contrib import admin
+
+from core.uploads import IMAGE_FORMFIELD_OVERRIDES
 from .models import Photo, Blog, Ticket, Review
 
 
 @admin.register(Photo)
 class PhotoAdmin(admin.ModelAdmin):
-    list_display = ("uploader", "caption", "date_created")
+    list_display = ("uploader", "caption", "date_created", "image_status")
+    list_filter = ("image_status",)
+    formfield_overrides = IMAGE_FORMFIELD_OVERRIDES
 
 
 @admin.register(Blog)
@@ -16,9 +20,10 @@ class BlogAdmin(admin.ModelAdmin):
 class TicketAdmin(admin.ModelAdmin):
     """Configuration de l'admin pour les demandes de critique"""
     list_display = ("title", "description", "user", "time_created")
-    list_filter = ("time_created", "user")
+    list_filter = ("time_created", "user", "image_status")
     search_fields = ("title", "description", "user__username")
-    readonly_fields = ("time_created",)
+    readonly_fields = ("time_created", "review_count", "image_status")
+    formfield_overrides = IMAGE_FORMFIELD_OVERRIDES
 
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
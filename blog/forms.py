@@ -1,6 +1,8 @@
 # blog/forms.py
 from django import forms
 from django.contrib.auth import get_user_model
+
+from core.uploads import BoundedImageField
 from . import models
 
 User = get_user_model()
@@ -23,6 +25,9 @@ class TicketForm(forms.ModelForm):
         model = models.Ticket
         fields = ["title", "description", "image"]
 
+        # Image limitée en taille de fichier et en pixels (core/uploads.py)
+        field_classes = {"image": BoundedImageField}
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -62,7 +67,8 @@ class TicketForm(forms.ModelForm):
             "Expliquez quel type de critique vous recherchez (max 2048 caractères)."
         )
         self.fields["image"].help_text = (
-            "Ajoutez une image de couverture pour illustrer votre demande (optionnel)."
+            "Ajoutez une image de couverture pour illustrer votre demande "
+            "(optionnel, 5 Mo maximum)."
         )
 
 
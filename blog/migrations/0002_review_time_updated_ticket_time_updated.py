@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="review",
+            name="time_updated",
+            field=models.DateTimeField(
+                auto_now=True, verbose_name="Date de modification"
+            ),
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="time_updated",
+            field=models.DateTimeField(
+                auto_now=True, verbose_name="Date de modification"
+            ),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:44
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min, Count
+
+
+def remove_duplicate_reviews(apps, schema_editor):
+    """Garde la première critique de chaque utilisateur pour un même ticket"""
+    Review = apps.get_model("blog", "Review")
+
+    duplicates = (
+        Review.objects.values("ticket_id", "user_id")
+        .annotate(first_id=Min("id"), count=Count("id"))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates:
+        Review.objects.filter(
+            ticket_id=duplicate["ticket_id"], user_id=duplicate["user_id"]
+        ).exclude(id=duplicate["first_id"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0002_review_time_updated_ticket_time_updated"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["user", "-time_created"], name="blog_review_user_time_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ticket",
+            index=models.Index(
+                fields=["user", "-time_created"], name="blog_ticket_user_time_idx"
+            ),
+        ),
+        migrations.RunPython(remove_duplicate_reviews, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="review",
+            constraint=models.UniqueConstraint(
+                fields=("ticket", "user"), name="blog_review_unique_ticket_user"
+            ),
+        ),
+    ]
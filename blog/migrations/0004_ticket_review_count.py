@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:48
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def counted(model, field):
+    """Nombre de lignes de model dont la clé field pointe vers la ligne courante"""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def fill_counters(apps, schema_editor):
+    """Calcule les compteurs dénormalisés des données existantes"""
+    User = apps.get_model("accounts", "User")
+    UserFollows = apps.get_model("accounts", "UserFollows")
+    Ticket = apps.get_model("blog", "Ticket")
+    Review = apps.get_model("blog", "Review")
+
+    User.objects.update(
+        followers_count=counted(UserFollows, "followed_user"),
+        following_count=counted(UserFollows, "user"),
+        ticket_count=counted(Ticket, "user"),
+        review_count=counted(Review, "user"),
+    )
+    Ticket.objects.update(review_count=counted(Review, "ticket"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0003_review_ticket_indexes"),
+        ("accounts", "0003_user_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ticket",
+            name="review_count",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Nombre de critiques"
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
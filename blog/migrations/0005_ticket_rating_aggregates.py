@@ -0,0 +1,81 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:50
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Count
+from django.db.models.functions import Coalesce
+
+
+def aggregated(Review, aggregate, **filters):
+    """Agrégat des critiques du ticket courant"""
+    return Coalesce(
+        Subquery(
+            Review.objects.filter(ticket=OuterRef("pk"), **filters)
+            .order_by()
+            .values("ticket")
+            .annotate(value=aggregate)
+            .values("value")
+        ),
+        0,
+    )
+
+
+def fill_rating_aggregates(apps, schema_editor):
+    """Calcule les agrégats des notes des tickets existants"""
+    Ticket = apps.get_model("blog", "Ticket")
+    Review = apps.get_model("blog", "Review")
+
+    Ticket.objects.update(
+        rating_sum=aggregated(Review, Sum("rating")),
+        **{
+            f"rating_{rating}_count": aggregated(Review, Count("pk"), rating=rating)
+            for rating in range(6)
+        },
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0004_ticket_review_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ticket",
+            name="rating_0_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="Notes 0"),
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="rating_1_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="Notes 1"),
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="rating_2_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="Notes 2"),
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="rating_3_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="Notes 3"),
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="rating_4_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="Notes 4"),
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="rating_5_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="Notes 5"),
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="rating_sum",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Somme des notes"
+            ),
+        ),
+        migrations.RunPython(fill_rating_aggregates, migrations.RunPython.noop),
+    ]
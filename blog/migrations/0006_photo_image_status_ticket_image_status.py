@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0005_ticket_rating_aggregates"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="photo",
+            name="image_status",
+            field=models.CharField(
+                choices=[
+                    ("PENDING", "En attente"),
+                    ("PROCESSING", "En cours"),
+                    ("READY", "Prête"),
+                    ("FAILED", "Échec"),
+                ],
+                default="READY",
+                max_length=10,
+                verbose_name="Traitement de l'image",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="image_status",
+            field=models.CharField(
+                choices=[
+                    ("PENDING", "En attente"),
+                    ("PROCESSING", "En cours"),
+                    ("READY", "Prête"),
+                    ("FAILED", "Échec"),
+                ],
+                default="READY",
+                max_length=10,
+                verbose_name="Traitement de l'image",
+            ),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:58
+
+from django.db import migrations, models
+
+
+def queue_existing_images(apps, schema_editor):
+    """
+    Images existantes : à traiter par la commande process_images
+    (variantes et dimensions), l'original reste affiché en attendant
+    """
+    User = apps.get_model("accounts", "User")
+    Ticket = apps.get_model("blog", "Ticket")
+
+    Ticket.objects.exclude(image="").exclude(image__isnull=True).update(
+        image_status="PENDING"
+    )
+    User.objects.exclude(profile_photo="").exclude(profile_photo__isnull=True).update(
+        profile_photo_status="PENDING"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0006_photo_image_status_ticket_image_status"),
+        ("accounts", "0004_user_profile_photo_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ticket",
+            name="image_height",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Hauteur de l'image"
+            ),
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="image_width",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Largeur de l'image"
+            ),
+        ),
+        migrations.RunPython(queue_existing_images, migrations.RunPython.noop),
+    ]
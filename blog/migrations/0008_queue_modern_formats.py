@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:20
+
+from django.db import migrations
+
+
+def queue_existing_images(apps, schema_editor):
+    """
+    Images existantes : copies AVIF / WebP à écrire par la commande
+    process_images, l'original reste affiché en attendant
+    """
+    User = apps.get_model("accounts", "User")
+    Photo = apps.get_model("blog", "Photo")
+    Ticket = apps.get_model("blog", "Ticket")
+
+    # Tous les champs image traités (core/images.py, IMAGE_FIELDS)
+    Photo.objects.exclude(image="").update(image_status="PENDING")
+    Ticket.objects.exclude(image="").exclude(image__isnull=True).update(
+        image_status="PENDING"
+    )
+    User.objects.exclude(profile_photo="").exclude(profile_photo__isnull=True).update(
+        profile_photo_status="PENDING"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0007_ticket_image_dimensions"),
+    ]
+
+    operations = [
+        migrations.RunPython(queue_existing_images, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:03
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0008_queue_modern_formats"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="photo",
+            name="image",
+            field=models.ImageField(
+                storage=core.storage.image_storage,
+                upload_to="photos/",
+                verbose_name="Image",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="ticket",
+            name="image",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=core.storage.image_storage,
+                upload_to="tickets/",
+                verbose_name="Image",
+            ),
+        ),
+    ]
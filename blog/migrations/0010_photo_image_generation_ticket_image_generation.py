@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0009_image_storage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="photo",
+            name="image_generation",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Génération des variantes"
+            ),
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="image_generation",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Génération des variantes"
+            ),
+        ),
+    ]
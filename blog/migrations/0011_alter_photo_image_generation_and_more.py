@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0010_photo_image_generation_ticket_image_generation"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="photo",
+            name="image_generation",
+            field=models.PositiveIntegerField(
+                db_index=True,
+                default=0,
+                editable=False,
+                verbose_name="Génération des variantes",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="ticket",
+            name="image_generation",
+            field=models.PositiveIntegerField(
+                db_index=True,
+                default=0,
+                editable=False,
+                verbose_name="Génération des variantes",
+            ),
+        ),
+    ]
@@ -1,8 +1,10 @@
-import os
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
-from PIL import Image
+
+from core import images
+from core.models import CounterFieldsMixin
+from core.storage import image_storage
 
 
 class Photo(models.Model):
@@ -10,11 +12,13 @@ class Photo(models.Model):
     Modèle pour stocker les photos uploadées par les utilisateurs
 
     Les photos sont automatiquement redimensionnées à 800x800 pixels max
-    pour optimiser le stockage et les performances
+    pour optimiser le stockage et les performances (en mémoire, avant écriture)
     """
 
     # Fichier image (stocké dans MEDIA_ROOT/photos/)
-    image = models.ImageField(upload_to="photos/", verbose_name="Image")
+    image = models.ImageField(
+        upload_to="photos/", storage=image_storage, verbose_name="Image"
+    )
 
     # Légende optionnelle
     caption = models.CharField(max_length=128, blank=True, verbose_name="Légende")
@@ -29,40 +33,37 @@ class Photo(models.Model):
         auto_now_add=True, verbose_name="Date de création"
     )
 
+    # Statut du traitement de l'image (terminé en arrière-plan, voir core/images.py)
+    image_status = models.CharField(
+        max_length=10,
+        choices=images.STATUS_CHOICES,
+        default=images.READY,
+        verbose_name="Traitement de l'image",
+    )
+
+    # Génération des variantes (core/images.py), indexée : sa valeur maximale
+    # est lue à chaque image traitée
+    image_generation = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        db_index=True,
+        verbose_name="Génération des variantes",
+    )
+
     # Taille maximale pour le redimensionnement
     IMAGE_MAX_SIZE = (800, 800)
 
-    def resize_image(self):
-        """Redimensionne l'image en conservant les proportions"""
-        # Vérifier que l'image existe avant de la redimensionner
-        if not self.image or not self.image.name:
-            return  # Sortir si pas d'image
-
-        # Vérifier que le fichier existe physiquement
-        try:
-            if not os.path.exists(self.image.path):
-                return
-        except (ValueError, AttributeError):
-            return
-
-        try:
-            image = Image.open(self.image.path)
-
-            # Vérifier si le redimensionnement est nécessaire
-            if image.height > IMAGE_MAX_SIZE[1] or image.width > IMAGE_MAX_SIZE[0]:
-                image.thumbnail(IMAGE_MAX_SIZE, Image.Resampling.LANCZOS)
-                image.save(self.image.path)
-        except Exception as e:
-            # Ne pas bloquer la sauvegarde en cas d'erreur
-            print(f"Erreur lors du redimensionnement de l'image : {e}")
-
     def save(self, *args, **kwargs):
-        """Sauvegarde la photo et la redimensionne automatiquement"""
+        """Sauvegarde la photo, réduite en mémoire avant son écriture"""
+        new_image = images.is_new_upload(self.image)
+        if new_image:
+            images.resize_upload(self, "image", self.IMAGE_MAX_SIZE)
+            self.image_status = images.PENDING
+
         super().save(*args, **kwargs)
 
-        # ⭐ CORRECTION : Redimensionner uniquement si une image existe
-        if self.image:
-            self.resize_image()
+        if new_image:
+            images.schedule_resize(self, "image", self.IMAGE_MAX_SIZE)
 
     class Meta:
         ordering = ["-date_created"]
@@ -114,7 +115,7 @@ class Blog(models.Model):
         return f"{self.title} par {self.author.username}"
 
 
-class Ticket(models.Model):
+class Ticket(CounterFieldsMixin, models.Model):
     """
     Modèle pour une demande de critique
 
@@ -137,7 +138,36 @@ class Ticket(models.Model):
 
     # Image optionnelle (couverture du livre)
     image = models.ImageField(
-        upload_to="tickets/", null=True, blank=True, verbose_name="Image"
+        upload_to="tickets/",
+        storage=image_storage,
+        null=True,
+        blank=True,
+        verbose_name="Image",
+    )
+
+    # Statut du traitement de l'image (terminé en arrière-plan, voir core/images.py)
+    image_status = models.CharField(
+        max_length=10,
+        choices=images.STATUS_CHOICES,
+        default=images.READY,
+        verbose_name="Traitement de l'image",
+    )
+
+    # Génération des variantes (core/images.py), indexée : sa valeur maximale
+    # est lue à chaque image traitée
+    image_generation = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        db_index=True,
+        verbose_name="Génération des variantes",
+    )
+
+    # Dimensions de l'image (renseignées à la fin du traitement, servent au srcset)
+    image_width = models.PositiveIntegerField(
+        null=True, blank=True, editable=False, verbose_name="Largeur de l'image"
+    )
+    image_height = models.PositiveIntegerField(
+        null=True, blank=True, editable=False, verbose_name="Hauteur de l'image"
     )
 
     # Date de création (automatique)
@@ -145,14 +175,111 @@ class Ticket(models.Model):
         auto_now_add=True, verbose_name="Date de création"
     )
 
+    # Date de dernière modification (sert de version au cache des cartes)
+    time_updated = models.DateTimeField(
+        auto_now=True, verbose_name="Date de modification"
+    )
+
+    # Nombre de critiques reçues (compteur dénormalisé, voir core/counters.py)
+    review_count = models.PositiveIntegerField(
+        default=0, verbose_name="Nombre de critiques"
+    )
+
+    # Agrégats des notes reçues : somme et répartition par note (0 à 5)
+    # Mis à jour à chaque critique créée, modifiée ou supprimée
+    rating_sum = models.PositiveIntegerField(default=0, verbose_name="Somme des notes")
+    rating_0_count = models.PositiveIntegerField(default=0, verbose_name="Notes 0")
+    rating_1_count = models.PositiveIntegerField(default=0, verbose_name="Notes 1")
+    rating_2_count = models.PositiveIntegerField(default=0, verbose_name="Notes 2")
+    rating_3_count = models.PositiveIntegerField(default=0, verbose_name="Notes 3")
+    rating_4_count = models.PositiveIntegerField(default=0, verbose_name="Notes 4")
+    rating_5_count = models.PositiveIntegerField(default=0, verbose_name="Notes 5")
+
     class Meta:
         ordering = ["-time_created"]
         verbose_name = "Demande de critique"
         verbose_name_plural = "Demandes de critique"
 
+        # Index des tickets d'un utilisateur, du plus récent au plus ancien
+        # (flux et page des posts)
+        indexes = [
+            models.Index(fields=["user", "-time_created"], name="blog_ticket_user_time_idx"),
+        ]
+
+    # Agrégats jamais réécrits par un enregistrement complet (core/models.py)
+    COUNTER_FIELDS = (
+        "review_count",
+        "rating_sum",
+        *(f"rating_{rating}_count" for rating in range(6)),
+    )
+
+    # Taille maximale pour le redimensionnement
+    IMAGE_MAX_SIZE = (800, 800)
+
     def __str__(self):
         return f"Ticket: {self.title} par {self.user.username}"
 
+    def save(self, *args, **kwargs):
+        """Sauvegarde le ticket, l'image est réduite en mémoire avant son écriture"""
+        new_image = images.is_new_upload(self.image)
+        if new_image:
+            images.resize_upload(self, "image", self.IMAGE_MAX_SIZE)
+            self.image_status = images.PENDING
+            self.image_width = self.image_height = None
+
+        super().save(*args, **kwargs)
+
+        if new_image:
+            images.schedule_resize(self, "image", self.IMAGE_MAX_SIZE)
+
+    @property
+    def card_url(self):
+        """Image des cartes : variante de 400px si l'original est plus large"""
+        if self.image_width and self.image_width > images.CARD_WIDTHS[0]:
+            return images.variant_url(
+                self.image, self.image_status, images.CARD_WIDTHS[0]
+            )
+        return self.image.url
+
+    @property
+    def card_srcset(self):
+        """Variantes de l'image pour l'attribut srcset (vide tant qu'elles manquent)"""
+        return images.width_srcset(
+            self.image, self.image_status, images.CARD_WIDTHS, self.image_width
+        )
+
+    @property
+    def card_sources(self):
+        """Variantes AVIF / WebP pour les balises <source> : (type MIME, srcset)"""
+        return images.modern_sources(
+            images.width_srcset,
+            self.image,
+            self.image_status,
+            images.CARD_WIDTHS,
+            self.image_width,
+        )
+
+    @property
+    def rating_average(self):
+        """Note moyenne des critiques (None sans critique)"""
+        if not self.review_count:
+            return None
+        return round(self.rating_sum / self.review_count, 1)
+
+    @property
+    def rating_counts(self):
+        """Nombre de critiques par note, de 0 à 5"""
+        return [getattr(self, f"rating_{rating}_count") for rating in range(6)]
+
+    @property
+    def rating_histogram(self):
+        """Répartition des notes pour l'affichage : (note, nombre, pourcentage), de 5 à 0"""
+        total = self.review_count or 1
+        return [
+            (rating, count, round(100 * count / total))
+            for rating, count in reversed(list(enumerate(self.rating_counts)))
+        ]
+
 
 class Review(models.Model):
     """
@@ -198,10 +325,28 @@ class Review(models.Model):
         auto_now_add=True, verbose_name="Date de création"
     )
 
+    # Date de dernière modification (sert de version au cache des cartes)
+    time_updated = models.DateTimeField(
+        auto_now=True, verbose_name="Date de modification"
+    )
+
     class Meta:
         ordering = ["-time_created"]
         verbose_name = "Critique"
         verbose_name_plural = "Critiques"
 
+        # Contrainte unique : une seule critique par utilisateur et par ticket
+        # (sert aussi d'index pour retrouver la critique d'un utilisateur)
+        constraints = [
+            models.UniqueConstraint(
+                fields=["ticket", "user"], name="blog_review_unique_ticket_user"
+            ),
+        ]
+
+        # Index des critiques d'un utilisateur, de la plus récente à la plus ancienne
+        indexes = [
+            models.Index(fields=["user", "-time_created"], name="blog_review_user_time_idx"),
+        ]
+
     def __str__(self):
         return f"Critique de {self.user.username} - Note: {self.rating}/5"
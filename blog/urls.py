@@ -14,4 +14,5 @@ urlpatterns = [
     path("review/<int:review_id>/delete/", views.delete_review, name="delete_review"),
     # Posts utilisateur
     path("mes-posts/", views.user_posts, name="user_posts"),
+    path("mes-posts/async/", views.user_posts_async, name="user_posts_async"),
 ]
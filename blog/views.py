@@ -1,10 +1,17 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth.decorators import login_required, permission_required
-from django.db.models import Q
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.db import transaction
-
-from accounts.models import UserBlock
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import etag
+
+from accounts import relationships
+from core import feed
+from core.etags import user_page_etag
 from . import models, forms
 
 
@@ -53,16 +60,23 @@ def ticket_and_review_create(request):
         review_form = forms.ReviewForm(request.POST)
 
         if ticket_form.is_valid() and review_form.is_valid():
-            # Création du ticket
-            ticket = ticket_form.save(commit=False)
-            ticket.user = request.user
-            ticket.save()
-
-            # Création de la critique liée au ticket
-            review = review_form.save(commit=False)
-            review.user = request.user
-            review.ticket = ticket
-            review.save()
+            try:
+                with transaction.atomic():
+                    # Création du ticket
+                    ticket = ticket_form.save(commit=False)
+                    ticket.user = request.user
+                    ticket.save()
+
+                    # Création de la critique liée au ticket
+                    review = review_form.save(commit=False)
+                    review.user = request.user
+                    review.ticket = ticket
+                    review.save()
+            except IntegrityError:
+                messages.warning(
+                    request, "Vous avez déjà publié une critique pour ce ticket."
+                )
+                return redirect("feed")
 
             messages.success(
                 request, "Votre critique a été publiée avec succès !"
@@ -81,7 +95,39 @@ def ticket_and_review_create(request):
     )
 
 
+def user_posts_etag(request):
+    """
+    ETag de la page des posts : nombre de lignes et dernière modification
+    de chaque catégorie (trois agrégats au lieu du chargement complet)
+
+    Les nombres détectent les suppressions, les dates les modifications
+    (y compris celle des tickets affichés dans les cartes de critiques).
+    La version du flux couvre les auteurs renommés ou changeant de photo
+    et les images traitées (mes tickets et les critiques reçues sont
+    dans mon flux)
+    """
+    user = request.user
+
+    tickets = user_tickets_query(user).aggregate(count=Count("id"), last=Max("time_updated"))
+    reviews = user_reviews_query(user).aggregate(
+        count=Count("id"), last=Max("time_updated"), ticket_last=Max("ticket__time_updated")
+    )
+    received = reviews_received_query(user).aggregate(
+        count=Count("id"), last=Max("time_updated")
+    )
+
+    return user_page_etag(
+        request,
+        feed.get_feed_version(user.id),
+        *tickets.values(),
+        *reviews.values(),
+        *received.values(),
+    )
+
+
 @login_required
+@cache_control(private=True, no_cache=True)
+@etag(user_posts_etag)
 def user_posts(request):
     """
     Vue pour afficher tous les posts de l'utilisateur connecté
@@ -90,20 +136,35 @@ def user_posts(request):
     1. Tickets créés
     2. Critiques créées
     3. Critiques reçues sur les tickets de l'utilisateur
+
+    Requête conditionnelle : 304 si aucun post n'a changé (voir user_posts_etag)
     """
 
-    user_tickets = models.Ticket.objects.filter(user=request.user).order_by(
-        "-time_created"
-    )
-    user_reviews = models.Review.objects.filter(user=request.user).order_by(
-        "-time_created"
-    )
+    context = {
+        "user_tickets": user_tickets_query(request.user),
+        "user_reviews": user_reviews_query(request.user),
+        "reviews_received": reviews_received_query(request.user),
+        "active_page": "user_posts",
+    }
 
-    # Critiques reçues (écrites par d'autres utilisateurs)
-    reviews_received = (
-        models.Review.objects.filter(ticket__user=request.user)
-        .exclude(user=request.user)
-        .order_by("-time_created")
+    return render(request, "blog/user_posts.html", context=context)
+
+
+@login_required
+async def user_posts_async(request):
+    """
+    Version asynchrone de la page des posts (servie par config/asgi.py)
+
+    Les trois catégories de posts sont attendues ensemble (asyncio.gather) ;
+    l'ORM asynchrone exécute leurs requêtes l'une après l'autre, dans un seul thread
+    """
+
+    user = await request.auser()
+
+    user_tickets, user_reviews, reviews_received = await asyncio.gather(
+        relationships.alist(user_tickets_query(user)),
+        relationships.alist(user_reviews_query(user)),
+        relationships.alist(reviews_received_query(user)),
     )
 
     context = {
@@ -113,7 +174,31 @@ def user_posts(request):
         "active_page": "user_posts",
     }
 
-    return render(request, "blog/user_posts.html", context=context)
+    return await sync_to_async(render)(request, "blog/user_posts.html", context=context)
+
+
+# Requêtes de la page des posts (partagées par les deux versions)
+def user_tickets_query(user):
+    return models.Ticket.objects.filter(user=user).order_by("-time_created")
+
+
+def user_reviews_query(user):
+    # Les tickets (et leurs auteurs) lus par les cartes sont joints
+    return (
+        models.Review.objects.filter(user=user)
+        .select_related("ticket__user")
+        .order_by("-time_created")
+    )
+
+
+def reviews_received_query(user):
+    # Critiques reçues (écrites par d'autres utilisateurs)
+    return (
+        models.Review.objects.filter(ticket__user=user)
+        .exclude(user=user)
+        .select_related("user", "ticket")
+        .order_by("-time_created")
+    )
 
 
 @login_required
@@ -196,12 +281,7 @@ def review_create(request, ticket_id):
     ticket = get_object_or_404(models.Ticket, id=ticket_id)
 
     # Vérifier si un blocage existe avec l'auteur du ticket
-    block_exists = UserBlock.objects.filter(
-        Q(blocker=request.user, blocked_user=ticket.user)
-        | Q(blocker=ticket.user, blocked_user=request.user)
-    ).exists()
-
-    if block_exists:
+    if relationships.block_exists(request.user, ticket.user_id):
         messages.error(
             request, "Vous ne pouvez pas répondre à ce ticket en raison d'un blocage."
         )
@@ -222,7 +302,16 @@ def review_create(request, ticket_id):
             review = review_form.save(commit=False)
             review.user = request.user
             review.ticket = ticket
-            review.save()
+            try:
+                with transaction.atomic():
+                    review.save()
+            except IntegrityError:
+                # Double envoi : la critique a été enregistrée entre-temps
+                # (contrainte unique ticket / utilisateur)
+                messages.warning(
+                    request, "Vous avez déjà publié une critique pour ce ticket."
+                )
+                return redirect("feed")
 
             messages.success(request, "Votre critique a été publiée avec succès !")
             return redirect("feed")
@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Sous un serveur ASGI (uvicorn, daphne...), les vues asynchrones
+(feed/async/, accounts/subscriptions/async/, blog/mes-posts/async/)
+attendent la base de données sans mobiliser un thread par requête.
 """
 
 import os
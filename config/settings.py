@@ -91,6 +91,20 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Le cache local suffit en développement (un seul processus).
+# En production avec plusieurs processus, utiliser un cache partagé
+# (Redis, Memcached) pour que l'invalidation du flux soit vue par tous.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "litreview",
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -154,3 +168,37 @@ NPM_BIN_PATH = r"C:\Program Files\nodejs\npm.cmd"
 # ✅ Configuration des fichiers médias
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+    },
+    # Images envoyées (tickets, photos) : nommées par l'empreinte de leur contenu,
+    # les doublons partagent un fichier (core/storage.py)
+    "images": {"BACKEND": "core.storage.ContentAddressedStorage"},
+}
+
+# Envoi des fichiers média par le serveur web (core/media.py) :
+# nginx : "X-Accel-Redirect" et la location interne "/protected-media/",
+# Apache (mod_xsendfile) : "X-Sendfile" et MEDIA_ROOT + "/".
+# None : Django envoie lui-même les fichiers
+MEDIA_SENDFILE_HEADER = None
+MEDIA_SENDFILE_ROOT = "/protected-media/"
+
+# Nombre de threads de redimensionnement des images (core/images.py)
+IMAGE_WORKERS = 2
+
+# Qualité des JPEG réduits et des variantes JPEG (core/images.py)
+IMAGE_JPEG_QUALITY = 85
+
+# Limites des images envoyées (core/uploads.py) : taille du fichier contrôlée
+# pendant la réception, nombre de pixels lu dans l'en-tête
+IMAGE_UPLOAD_MAX_BYTES = 5 * 1024 * 1024
+IMAGE_UPLOAD_MAX_PIXELS = 25_000_000
+
+FILE_UPLOAD_HANDLERS = [
+    "core.uploads.LimitedUploadHandler",
+    "django.core.files.uploadhandler.MemoryFileUploadHandler",
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
@@ -1,8 +1,9 @@
 from django.contrib import admin
 from django.urls import path, include
-from django.conf.urls.static import static
 from django.conf import settings
 
+from core.media import serve_media
+
 urlpatterns = [
     path("", include("core.urls")),
     path("admin/", admin.site.urls),
@@ -12,7 +13,8 @@ urlpatterns = [
 
 ]
 
-# Configuration pour servir les fichiers média en mode développement
-# IMPORTANT : Ceci ne fonctionne que quand DEBUG = True
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# Fichiers média (images envoyées), aussi en production : cache, ETag, Range,
+# envoi confié au serveur web si MEDIA_SENDFILE_HEADER est défini (core/media.py)
+urlpatterns += [
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:path>", serve_media, name="media"),
+]
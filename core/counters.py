@@ -0,0 +1,102 @@
+"""
+Compteurs dénormalisés (abonnés, abonnements, tickets et critiques)
+et agrégats des notes de chaque ticket (somme et répartition par note)
+
+Stockés dans les colonnes de User et Ticket : leur affichage est une simple
+lecture de colonne au lieu d'un COUNT(*).
+
+Les signaux (core/signals.py) les ajustent à chaque création ou suppression
+avec des expressions F() : le calcul est fait par la base, sans lecture
+préalable, donc sans perte de mise à jour entre requêtes concurrentes.
+La commande repair_counters les recalcule en cas de dérive
+(insertions en masse, modifications directes en base...).
+"""
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest
+
+from accounts.models import UserFollows
+from blog.models import Ticket, Review
+
+
+def adjust_counters(model, pk, **deltas):
+    """Ajoute delta à chaque compteur d'une ligne (jamais en dessous de zéro)"""
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, 0) for field, delta in deltas.items()}
+    )
+
+
+def rating_deltas(rating, delta):
+    """Variation des agrégats de notes d'un ticket pour une critique ajoutée / retirée"""
+    return {"rating_sum": rating * delta, f"rating_{rating}_count": delta}
+
+
+def rating_change(old_rating, new_rating):
+    """Variation des agrégats de notes d'un ticket quand une note est modifiée"""
+    return {
+        "rating_sum": new_rating - old_rating,
+        f"rating_{old_rating}_count": -1,
+        f"rating_{new_rating}_count": 1,
+    }
+
+
+def counted(model, field, aggregate=None, **filters):
+    """
+    Agrégat (par défaut le nombre) des lignes de model dont la clé field
+    pointe vers la ligne courante
+    """
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef("pk")}, **filters)
+            .order_by()
+            .values(field)
+            .annotate(total=aggregate or Count("pk"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def counter_definitions():
+    """(modèle, compteur, expression du recalcul)"""
+    User = get_user_model()
+    definitions = [
+        (User, "followers_count", counted(UserFollows, "followed_user")),
+        (User, "following_count", counted(UserFollows, "user")),
+        (User, "ticket_count", counted(Ticket, "user")),
+        (User, "review_count", counted(Review, "user")),
+        (Ticket, "review_count", counted(Review, "ticket")),
+        (Ticket, "rating_sum", counted(Review, "ticket", Sum("rating"))),
+    ]
+    definitions += [
+        (Ticket, f"rating_{rating}_count", counted(Review, "ticket", rating=rating))
+        for rating in range(6)
+    ]
+    return definitions
+
+
+def repair_counters(dry_run=False):
+    """
+    Recalcule les compteurs faux
+
+    Retourne le nombre de lignes corrigées (ou à corriger) par compteur
+    """
+    repaired = {}
+
+    for model, field, expected in counter_definitions():
+        stale = (
+            model.objects.annotate(expected=expected)
+            .exclude(**{field: F("expected")})
+            .values("pk")
+        )
+
+        label = f"{model._meta.label}.{field}"
+        if dry_run:
+            repaired[label] = stale.count()
+        else:
+            repaired[label] = model.objects.filter(pk__in=stale).update(
+                **{field: expected}
+            )
+
+    return repaired
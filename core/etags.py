@@ -0,0 +1,38 @@
+"""
+Validateurs des requêtes conditionnelles (ETag)
+
+Une page dont l'ETag correspond à l'en-tête If-None-Match du navigateur
+est servie par une réponse 304 vide, sans requêtes ni rendu.
+
+L'ETag d'une page personnelle inclut :
+- l'utilisateur et ce qui s'affiche dans l'en-tête (nom, photo de profil)
+- le jeton CSRF de la session (présent dans les formulaires de la page)
+- les éléments propres à la page (version du flux, dates de modification...)
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.contrib import messages
+
+
+def user_page_etag(request, *parts):
+    """
+    ETag d'une page propre à l'utilisateur connecté
+
+    Retourne None (pas de validation) si des messages sont en attente :
+    ils doivent être affichés par un rendu complet de la page
+    """
+    if len(messages.get_messages(request)):
+        return None
+
+    user = request.user
+    values = [
+        user.pk,
+        user.username,
+        user.profile_photo.name,
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ""),
+        *parts,
+    ]
+
+    return hashlib.md5("|".join(str(value) for value in values).encode()).hexdigest()
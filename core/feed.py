@@ -0,0 +1,648 @@
+"""
+Construction du flux paginé
+
+Le flux fusionne les tickets et les critiques visibles par un utilisateur.
+Il est matérialisé dans la table FeedEntry (fan-out à l'écriture) :
+la lecture d'une page est un parcours d'index sur (owner, date).
+
+La pagination se fait par curseur (keyset) : le curseur encode la position
+du dernier post affiché (date de création, type de contenu, identifiant).
+
+Les références de chaque page sont mises en cache par utilisateur.
+Un numéro de version par utilisateur est incrémenté à chaque changement
+de son flux : les anciennes clés de cache deviennent simplement inutilisées.
+"""
+
+import asyncio
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q, Value, CharField
+
+from accounts import relationships
+from accounts.models import UserFollows
+from blog.models import Ticket, Review
+from .models import FeedCacheCounter, FeedEntry
+
+
+# Nombre de posts affichés par page du flux
+FEED_PAGE_SIZE = 20
+
+# Première page : seulement le premier écran, la suite est chargée au défilement
+FEED_FIRST_PAGE_SIZE = 10
+
+# Nombre d'entrées insérées par requête lors d'une reconstruction
+REBUILD_BATCH_SIZE = 1000
+
+# Types de contenu du flux (l'ordre alphabétique sert au départage)
+TICKET = FeedEntry.TICKET
+REVIEW = FeedEntry.REVIEW
+
+# Mode streaming : nombre maximal de posts envoyés et taille des lots chargés
+FEED_STREAM_LIMIT = 200
+FEED_STREAM_CHUNK_SIZE = 20
+
+# Durée de vie (en secondes) d'une page de flux en cache
+FEED_CACHE_TIMEOUT = 60 * 15
+
+# Compteurs de succès / échecs du cache du flux : cumulés par processus,
+# enregistrés en base (FeedCacheCounter) au plus toutes les N secondes
+FEED_CACHE_STATS_FLUSH_INTERVAL = 10
+
+_pending_stats = Counter()
+_stats_flushed_at = time.monotonic()
+_stats_lock = threading.Lock()
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def encode_cursor(time_created, content_type, post_id):
+    """Encode la position d'un post sous forme de curseur pour l'URL"""
+    microseconds = (time_created - EPOCH) // timedelta(microseconds=1)
+    return f"{microseconds}-{content_type}-{post_id}"
+
+
+def decode_cursor(raw_cursor):
+    """
+    Décode un curseur d'URL
+
+    Retourne un tuple (date de création, type de contenu, identifiant)
+    ou None si le curseur est absent ou invalide
+    """
+    if not raw_cursor:
+        return None
+
+    try:
+        microseconds, content_type, post_id = raw_cursor.split("-")
+        time_created = EPOCH + timedelta(microseconds=int(microseconds))
+        post_id = int(post_id)
+    except (ValueError, OverflowError):
+        return None
+
+    if content_type not in (TICKET, REVIEW):
+        return None
+
+    return time_created, content_type, post_id
+
+
+def filter_after_cursor(entries, cursor):
+    """
+    Restreint les entrées de flux à celles situées après le curseur
+
+    Ordre du flux : date décroissante, puis tickets avant critiques,
+    puis identifiants décroissants
+    """
+    if cursor is None:
+        return entries
+
+    time_created, post_type, post_id = cursor
+
+    return entries.filter(
+        Q(time_created__lt=time_created)
+        | Q(time_created=time_created, post_type__lt=post_type)
+        | Q(time_created=time_created, post_type=post_type, post_id__lt=post_id)
+    )
+
+
+def visible_tickets(user, followed_users, blocked_ids):
+    """Tickets visibles dans le flux : les miens et ceux des utilisateurs suivis"""
+    return Ticket.objects.filter(
+        Q(user=user) |  # Mes tickets
+        Q(user__in=followed_users)  # Tickets des utilisateurs suivis
+    ).exclude(
+        user__id__in=blocked_ids  # Exclut les utilisateurs bloqués
+    )
+
+
+def visible_reviews(user, followed_users, blocked_ids):
+    """Critiques visibles : les miennes, celles des suivis et celles sur mes tickets"""
+    return Review.objects.filter(
+        Q(user=user) |  # Mes critiques
+        Q(user__in=followed_users) |  # Critiques des utilisateurs suivis
+        Q(ticket__user=user)  # Critiques sur mes tickets
+    ).exclude(
+        user__id__in=blocked_ids  # Exclut les utilisateurs bloqués
+    )
+
+
+def visible_posts(user):
+    """
+    Références (type, id, date) de tous les posts visibles par un utilisateur
+
+    Une seule requête UNION, parcourue par lots (iterator).
+    Les relations sont relues en base (et non dans le cache) :
+    une reconstruction doit partir de l'état validé le plus récent
+    """
+    followed_users, blocked_ids = relationships.load_relationships(user.pk)
+
+    # L'ordre par défaut des modèles est retiré (interdit dans un UNION)
+    tickets = visible_tickets(user, followed_users, blocked_ids).annotate(
+        content_type=Value(TICKET, output_field=CharField())
+    ).values_list("content_type", "id", "time_created").order_by()
+
+    reviews = visible_reviews(user, followed_users, blocked_ids).annotate(
+        content_type=Value(REVIEW, output_field=CharField())
+    ).values_list("content_type", "id", "time_created").order_by()
+
+    return tickets.union(reviews, all=True).iterator()
+
+
+def get_feed_page(user, cursor=None, page_size=FEED_PAGE_SIZE):
+    """
+    Retourne une page du flux et le curseur de la page suivante
+
+    Les références de la page viennent du cache (clé versionnée par utilisateur)
+    ou, à défaut, du flux matérialisé ; les objets sont ensuite chargés par type.
+    Le curseur suivant vaut None sur la dernière page.
+    """
+    key = page_cache_key(user.id, cursor, page_size)
+    page = cache.get(key)
+
+    if page is None:
+        record_cache_access(hit=False)
+        page = read_feed_page(user, cursor, page_size)
+        cache.set(key, page, FEED_CACHE_TIMEOUT)
+    else:
+        record_cache_access(hit=True)
+
+    references, next_cursor = page
+    return load_posts(references), next_cursor
+
+
+async def aget_feed_page(user, cursor=None, page_size=FEED_PAGE_SIZE):
+    """Version asynchrone de get_feed_page (vues servies par ASGI)"""
+    version = await aget_feed_version(user.id)
+    key = page_cache_key(user.id, cursor, page_size, version)
+    page = await cache.aget(key)
+
+    if page is None:
+        await arecord_cache_access(hit=False)
+        page = await aread_feed_page(user, cursor, page_size)
+        await cache.aset(key, page, FEED_CACHE_TIMEOUT)
+    else:
+        await arecord_cache_access(hit=True)
+
+    references, next_cursor = page
+    return await aload_posts(references), next_cursor
+
+
+def feed_page_rows(user, cursor, page_size):
+    """
+    Requête des lignes (type, id, date) d'une page du flux matérialisé
+
+    Une ligne de plus que la page pour savoir s'il existe une page suivante
+    """
+    entries = filter_after_cursor(FeedEntry.objects.filter(owner=user), cursor)
+    return entries.values_list("post_type", "post_id", "time_created")[: page_size + 1]
+
+
+def split_feed_page(rows, page_size):
+    """Sépare les lignes lues en (références de la page, curseur suivant)"""
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+
+    next_cursor = None
+    if has_next:
+        post_type, post_id, time_created = rows[-1]
+        next_cursor = encode_cursor(time_created, post_type, post_id)
+
+    return [(post_type, post_id) for post_type, post_id, _ in rows], next_cursor
+
+
+def read_feed_page(user, cursor, page_size):
+    """
+    Lit une page de références (type, id) dans le flux matérialisé
+
+    Retourne (références, curseur suivant)
+    """
+    return split_feed_page(list(feed_page_rows(user, cursor, page_size)), page_size)
+
+
+async def aread_feed_page(user, cursor, page_size):
+    """Version asynchrone de read_feed_page"""
+    rows = [row async for row in feed_page_rows(user, cursor, page_size)]
+    return split_feed_page(rows, page_size)
+
+
+# Requêtes de chargement des posts : auteurs et tickets lus par les cartes joints
+# (sans tri : les posts sont remis dans l'ordre des références)
+def feed_tickets():
+    return Ticket.objects.select_related("user").order_by()
+
+
+def feed_reviews():
+    return Review.objects.select_related("user", "ticket", "ticket__user").order_by()
+
+
+def split_references(references):
+    """Identifiants des tickets et des critiques d'une liste de (type, id)"""
+    ticket_ids = [post_id for content_type, post_id in references if content_type == TICKET]
+    review_ids = [post_id for content_type, post_id in references if content_type == REVIEW]
+    return ticket_ids, review_ids
+
+
+def order_posts(references, objects):
+    """Posts dans l'ordre des références (objets indexés par type puis id)"""
+    posts = []
+    for content_type, post_id in references:
+        post = objects[content_type].get(post_id)
+
+        # Le post a pu être supprimé entre-temps
+        if post is None:
+            continue
+
+        post.content_type = content_type
+        posts.append(post)
+
+    return posts
+
+
+def load_posts(references):
+    """
+    Charge les posts à partir d'une liste ordonnée de (type, id)
+
+    Une requête par type de contenu, l'ordre de la liste est conservé.
+    Les auteurs et tickets lus par les cartes du flux sont joints (select_related)
+    """
+    ticket_ids, review_ids = split_references(references)
+
+    objects = {
+        TICKET: feed_tickets().in_bulk(ticket_ids) if ticket_ids else {},
+        REVIEW: feed_reviews().in_bulk(review_ids) if review_ids else {},
+    }
+
+    return order_posts(references, objects)
+
+
+async def ain_bulk(queryset, ids):
+    """in_bulk asynchrone, sans requête pour une liste vide"""
+    return await queryset.ain_bulk(ids) if ids else {}
+
+
+async def aload_posts(references):
+    """
+    Version asynchrone de load_posts
+
+    Les requêtes des tickets et des critiques passent par le thread unique
+    de l'ORM asynchrone : elles s'exécutent l'une après l'autre
+    """
+    ticket_ids, review_ids = split_references(references)
+
+    tickets, reviews = await asyncio.gather(
+        ain_bulk(feed_tickets(), ticket_ids),
+        ain_bulk(feed_reviews(), review_ids),
+    )
+
+    return order_posts(references, {TICKET: tickets, REVIEW: reviews})
+
+
+def annotate_viewer_flags(posts, user, blocked_ids):
+    """
+    Ajoute aux posts de la page les indicateurs propres au lecteur
+
+    - is_own : le post a été publié par l'utilisateur (« Vous »)
+    - user_review (tickets) : critique déjà publiée par l'utilisateur (ou None)
+    - is_blocked (tickets) : l'auteur du ticket est bloqué (bidirectionnel)
+
+    Une seule requête pour toute la page, quel que soit le nombre de tickets.
+    Ces indicateurs font partie de la clé de cache des cartes du flux
+    """
+    tickets = [post for post in posts if post.content_type == TICKET]
+    reviews = list(viewer_reviews(tickets, user)) if tickets else []
+    apply_viewer_flags(posts, tickets, user, blocked_ids, reviews)
+
+
+async def aannotate_viewer_flags(posts, user, blocked_ids):
+    """Version asynchrone de annotate_viewer_flags"""
+    tickets = [post for post in posts if post.content_type == TICKET]
+    reviews = [review async for review in viewer_reviews(tickets, user)] if tickets else []
+    apply_viewer_flags(posts, tickets, user, blocked_ids, reviews)
+
+
+def viewer_reviews(tickets, user):
+    """Critiques de l'utilisateur pour les tickets de la page"""
+    return Review.objects.filter(
+        ticket_id__in=[ticket.id for ticket in tickets], user=user
+    ).only("id", "ticket_id")
+
+
+def apply_viewer_flags(posts, tickets, user, blocked_ids, reviews):
+    for post in posts:
+        post.is_own = post.user_id == user.id
+
+    # Critiques de l'utilisateur indexées par ticket
+    user_reviews = {}
+    for review in reviews:
+        user_reviews.setdefault(review.ticket_id, review)
+
+    for ticket in tickets:
+        ticket.user_review = user_reviews.get(ticket.id)
+        ticket.is_blocked = ticket.user_id in blocked_ids
+
+
+class FeedStream:
+    """
+    Itérateur paresseux sur les posts du flux (mode streaming)
+
+    Les références sont lues par un curseur côté serveur (iterator),
+    puis les posts sont chargés et annotés par lots : le premier lot
+    peut être rendu avant que les suivants ne soient lus.
+    Après l'itération, next_cursor indique la suite éventuelle du flux.
+    """
+
+    def __init__(self, user, blocked_ids, cursor=None,
+                 limit=FEED_STREAM_LIMIT, chunk_size=FEED_STREAM_CHUNK_SIZE):
+        self.user = user
+        self.blocked_ids = blocked_ids
+        self.cursor = cursor
+        self.limit = limit
+        self.chunk_size = chunk_size
+        self.next_cursor = None
+        self.count = 0
+
+    def __iter__(self):
+        entries = filter_after_cursor(
+            FeedEntry.objects.filter(owner=self.user), self.cursor
+        ).values_list("post_type", "post_id", "time_created")
+
+        rows = entries[: self.limit + 1].iterator(chunk_size=self.chunk_size)
+
+        chunk = []
+        last_row = None
+        for index, row in enumerate(rows):
+            # Ligne supplémentaire : il existe une suite au flux
+            if index == self.limit:
+                post_type, post_id, time_created = last_row
+                self.next_cursor = encode_cursor(time_created, post_type, post_id)
+                break
+
+            chunk.append(row)
+            last_row = row
+
+            if len(chunk) >= self.chunk_size:
+                yield from self._load(chunk)
+                chunk = []
+
+        if chunk:
+            yield from self._load(chunk)
+
+    def _load(self, rows):
+        """Charge et annote un lot de posts"""
+        posts = load_posts([(post_type, post_id) for post_type, post_id, _ in rows])
+        annotate_viewer_flags(posts, self.user, self.blocked_ids)
+        self.count += len(posts)
+        return posts
+
+
+# ==========================================
+# FAN-OUT : MISE À JOUR DU FLUX MATÉRIALISÉ
+# ==========================================
+
+def feed_owners(author_id, extra_owner_ids=()):
+    """
+    Propriétaires des flux dans lesquels apparaît un post de author_id
+
+    L'auteur, ses abonnés et les propriétaires supplémentaires
+    (auteur du ticket pour une critique), sauf en cas de blocage
+    """
+    owner_ids = {author_id, *extra_owner_ids}
+    owner_ids.update(
+        UserFollows.objects.filter(followed_user_id=author_id).values_list("user_id", flat=True)
+    )
+    return owner_ids - relationships.load_blocked_ids(author_id)
+
+
+def add_post(content_type, post):
+    """Ajoute un nouveau post dans les flux de tous les utilisateurs concernés"""
+    if content_type == TICKET:
+        owner_ids = feed_owners(post.user_id)
+    else:
+        owner_ids = feed_owners(post.user_id, extra_owner_ids=[post.ticket.user_id])
+
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(
+                owner_id=owner_id,
+                post_type=content_type,
+                post_id=post.id,
+                time_created=post.time_created,
+            )
+            for owner_id in owner_ids
+        ],
+        batch_size=REBUILD_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+    bump_feed_versions(owner_ids)
+
+
+def touch_post(content_type, post_id):
+    """
+    Un post a été modifié : invalide le cache des flux qui le contiennent
+
+    Un ticket est aussi affiché dans les cartes de ses critiques :
+    les flux contenant ces critiques sont également invalidés
+    """
+    owner_ids = post_owner_ids(content_type, post_id)
+
+    if content_type == TICKET:
+        owner_ids += FeedEntry.objects.filter(
+            post_type=REVIEW,
+            post_id__in=Review.objects.filter(ticket_id=post_id).values("id"),
+        ).values_list("owner_id", flat=True)
+
+    bump_feed_versions(owner_ids)
+
+
+def touch_author(user_id):
+    """
+    Le nom ou la photo d'un utilisateur a changé : invalide le cache
+    des flux qui l'affichent (ses posts et les critiques de ses tickets)
+    """
+    tickets = Ticket.objects.filter(user_id=user_id).values("id")
+    reviews = Review.objects.filter(
+        Q(user_id=user_id) | Q(ticket__user_id=user_id)
+    ).values("id")
+
+    owner_ids = FeedEntry.objects.filter(
+        Q(post_type=TICKET, post_id__in=tickets)
+        | Q(post_type=REVIEW, post_id__in=reviews)
+    ).values_list("owner_id", flat=True)
+
+    bump_feed_versions([user_id, *owner_ids])
+
+
+def remove_post(content_type, post_id):
+    """Retire un post supprimé de tous les flux"""
+    owner_ids = post_owner_ids(content_type, post_id)
+    FeedEntry.objects.filter(post_type=content_type, post_id=post_id).delete()
+    bump_feed_versions(owner_ids)
+
+
+def post_owner_ids(content_type, post_id):
+    """Propriétaires des flux contenant actuellement un post"""
+    return list(
+        FeedEntry.objects.filter(
+            post_type=content_type, post_id=post_id
+        ).values_list("owner_id", flat=True)
+    )
+
+
+def rebuild_feed(user):
+    """
+    Reconstruit entièrement le flux matérialisé d'un utilisateur
+
+    Utilisé quand ses abonnements ou ses blocages changent,
+    et par la commande rebuild_feeds pour les reprises de données
+
+    Dans une transaction : un lecteur ne voit jamais le flux à moitié vide.
+    Les conflits sont ignorés : deux reconstructions simultanées
+    (double clic sur « Suivre ») insèrent les mêmes entrées sans erreur
+    """
+    with transaction.atomic():
+        FeedEntry.objects.filter(owner=user).delete()
+
+        batch = []
+        for content_type, post_id, time_created in visible_posts(user):
+            batch.append(
+                FeedEntry(
+                    owner=user,
+                    post_type=content_type,
+                    post_id=post_id,
+                    time_created=time_created,
+                )
+            )
+
+            if len(batch) >= REBUILD_BATCH_SIZE:
+                FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+
+        if batch:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+    bump_feed_versions([user.id])
+
+
+# ==========================================
+# CACHE DU FLUX (VERSION PAR UTILISATEUR)
+# ==========================================
+
+def feed_version_key(user_id):
+    return f"feed:version:{user_id}"
+
+
+def get_feed_version(user_id):
+    """
+    Version courante du flux d'un utilisateur
+
+    Initialisée à partir de l'horloge : si la clé est évincée du cache,
+    la nouvelle version ne peut pas retomber sur d'anciennes pages en cache
+    """
+    key = feed_version_key(user_id)
+    version = cache.get(key)
+
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+
+    return version
+
+
+async def aget_feed_version(user_id):
+    """Version asynchrone de get_feed_version"""
+    key = feed_version_key(user_id)
+    version = await cache.aget(key)
+
+    if version is None:
+        await cache.aadd(key, time.time_ns(), None)
+        version = await cache.aget(key)
+
+    return version
+
+
+def bump_feed_versions(user_ids):
+    """Invalide le cache du flux des utilisateurs (nouvelle version)"""
+    for user_id in set(user_ids):
+        try:
+            cache.incr(feed_version_key(user_id))
+        except ValueError:
+            # Version absente du cache : une version neuve suffit
+            cache.set(feed_version_key(user_id), time.time_ns(), None)
+
+
+def page_cache_key(user_id, cursor, page_size, version=None):
+    """Clé de cache d'une page du flux, liée à la version courante"""
+    if version is None:
+        version = get_feed_version(user_id)
+
+    position = encode_cursor(*cursor) if cursor else "first"
+    return f"feed:page:{user_id}:{version}:{page_size}:{position}"
+
+
+def record_cache_access(hit):
+    """
+    Compte un succès ou un échec du cache du flux
+
+    Compté en mémoire, enregistré en base au plus toutes les
+    FEED_CACHE_STATS_FLUSH_INTERVAL secondes : pas d'écriture à chaque page
+    """
+    with _stats_lock:
+        _pending_stats[FeedCacheCounter.HITS if hit else FeedCacheCounter.MISSES] += 1
+        due = time.monotonic() - _stats_flushed_at >= FEED_CACHE_STATS_FLUSH_INTERVAL
+
+    if due:
+        flush_cache_stats()
+
+
+async def arecord_cache_access(hit):
+    """Version asynchrone de record_cache_access"""
+    with _stats_lock:
+        _pending_stats[FeedCacheCounter.HITS if hit else FeedCacheCounter.MISSES] += 1
+        due = time.monotonic() - _stats_flushed_at >= FEED_CACHE_STATS_FLUSH_INTERVAL
+
+    if due:
+        await sync_to_async(flush_cache_stats)()
+
+
+def flush_cache_stats():
+    """Ajoute aux compteurs en base les accès comptés par ce processus"""
+    global _stats_flushed_at
+
+    with _stats_lock:
+        pending = dict(_pending_stats)
+        _pending_stats.clear()
+        _stats_flushed_at = time.monotonic()
+
+    for name, count in pending.items():
+        # Incrément fait par la base : pas de perte entre processus
+        rows = FeedCacheCounter.objects.filter(name=name)
+        if not rows.update(value=F("value") + count):
+            FeedCacheCounter.objects.bulk_create(
+                [FeedCacheCounter(name=name)], ignore_conflicts=True
+            )
+            rows.update(value=F("value") + count)
+
+
+def get_cache_stats():
+    """Compteurs du cache du flux (tous processus) : succès, échecs et taux de succès"""
+    counters = dict(FeedCacheCounter.objects.values_list("name", "value"))
+    hits = counters.get(FeedCacheCounter.HITS, 0)
+    misses = counters.get(FeedCacheCounter.MISSES, 0)
+    total = hits + misses
+
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / total if total else 0.0,
+    }
+
+
+def reset_cache_stats():
+    """Remet à zéro les compteurs du cache du flux"""
+    FeedCacheCounter.objects.update(value=0)
+
@@ -0,0 +1,484 @@
+"""
+Traitement des images en arrière-plan (redimensionnement, variantes)
+
+Une image envoyée est réduite en mémoire avant sa première écriture
+(décodage JPEG à échelle réduite), puis le modèle est enregistré avec un
+statut « en attente ». Après la validation de la transaction, la suite du
+traitement est confiée à un pool de threads : la requête HTTP ne l'attend pas.
+
+Ce traitement génère des variantes de taille fixe (avatars, cartes des
+tickets), nommées d'après le fichier d'origine (« photo_96w.jpg »), et
+leurs copies AVIF et WebP (« photo_96w.jpg.webp ») proposées au navigateur
+par des balises <source>. Tant qu'elles ne sont pas prêtes, les pages
+affichent l'original.
+
+Les tâches perdues (arrêt du serveur) ou en échec sont reprises
+par la commande process_images. La commande regenerate_images retraite
+toutes les images sans les remettre « en attente » : un numéro de
+génération (<champ>_generation) suit son avancement.
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.db.models import Max
+from django.dispatch import Signal
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+# Statuts du traitement d'une image
+PENDING = "PENDING"
+PROCESSING = "PROCESSING"
+READY = "READY"
+FAILED = "FAILED"
+
+STATUS_CHOICES = [
+    (PENDING, "En attente"),
+    (PROCESSING, "En cours"),
+    (READY, "Prête"),
+    (FAILED, "Échec"),
+]
+
+# Nombre de threads de traitement (réglable dans les settings)
+IMAGE_WORKERS = getattr(settings, "IMAGE_WORKERS", 2)
+
+# Largeurs des variantes en pixels (avatars : 1x et 2x d'un avatar de 48px)
+AVATAR_WIDTHS = (48, 96)
+CARD_WIDTHS = (400, 800)
+
+# Champs image traités en arrière-plan :
+# (modèle, champ) -> (largeurs des variantes, variantes recadrées en carré)
+IMAGE_FIELDS = {
+    ("blog.Photo", "image"): ((), False),
+    ("blog.Ticket", "image"): (CARD_WIDTHS, False),
+    ("accounts.User", "profile_photo"): (AVATAR_WIDTHS, True),
+}
+
+# Formats modernes écrits à côté de chaque image, s'ils sont pris en charge
+# par Pillow : (format Pillow, type MIME, extension ajoutée au nom),
+# du plus compact au moins compact (le navigateur prend la première source)
+MODERN_FORMATS = [
+    (image_format, mime_type, extension)
+    for image_format, mime_type, extension in (
+        ("AVIF", "image/avif", ".avif"),
+        ("WEBP", "image/webp", ".webp"),
+    )
+    if features.check(image_format.lower())
+]
+
+# Marge du décodage à échelle réduite : l'image décodée fait au moins
+# DRAFT_GAP fois la taille finale
+DRAFT_GAP = 2
+
+# Qualité des JPEG écrits (Pillow enregistre en qualité 75 par défaut)
+IMAGE_JPEG_QUALITY = getattr(settings, "IMAGE_JPEG_QUALITY", 85)
+
+# Filtre de rééchantillonnage des réductions et des variantes
+# (comparaison des filtres : commande benchmark_images)
+RESAMPLE = Image.Resampling.LANCZOS
+
+_executor = None
+
+# Envoyé après le traitement d'une image (sender : modèle, pk, field_name, status).
+# Le statut est mis à jour par un queryset : post_save n'est pas envoyé
+image_processed = Signal()
+
+
+def get_executor():
+    """Pool de threads créé à la première utilisation"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=IMAGE_WORKERS, thread_name_prefix="images"
+        )
+    return _executor
+
+
+def is_new_upload(field_file):
+    """Le champ contient-il un fichier pas encore écrit dans le stockage ?"""
+    return bool(field_file) and not field_file._committed
+
+
+def schedule_resize(instance, field_name, max_size):
+    """
+    Programme le redimensionnement d'une image après la validation de la transaction
+
+    Le statut du champ (<champ>_status) doit déjà valoir PENDING
+    """
+    label = instance._meta.label
+    pk = instance.pk
+    name = getattr(instance, field_name).name
+
+    transaction.on_commit(
+        lambda: get_executor().submit(
+            process_in_worker, label, pk, field_name, name, max_size
+        )
+    )
+
+
+def process_in_worker(*args):
+    """Tâche du pool de threads"""
+    try:
+        process_image(*args)
+    finally:
+        # Thread hors requête : la connexion n'est pas fermée par Django
+        close_old_connections()
+
+
+def process_image(label, pk, field_name, name, max_size, generation=None):
+    """
+    Redimensionne une image enregistrée et met à jour son statut
+
+    Avec generation (commande regenerate_images), l'image déjà prête le
+    reste pendant son traitement : les pages gardent ses variantes
+    actuelles, réécrites sur place. Le numéro de génération (sinon la
+    génération courante) est enregistré à la fin. Retourne le statut final,
+    ou None si l'image a été remplacée ou supprimée
+    """
+    model = apps.get_model(label)
+    status_field = f"{field_name}_status"
+
+    # Le fichier a pu être remplacé ou l'objet supprimé entre-temps
+    rows = model.objects.filter(pk=pk, **{field_name: name})
+    if generation is not None:
+        if not rows.exists():
+            return None
+    elif not rows.update(**{status_field: PROCESSING}):
+        return None
+
+    updates = {status_field: FAILED}
+    try:
+        field_file = getattr(rows.get(), field_name)
+        resize_field_file(field_file, max_size)
+        size = create_variants(field_file, *IMAGE_FIELDS[(label, field_name)])
+
+        # Nom de l'image réduite (inchangé si l'image était assez petite)
+        updates = {
+            field_name: field_file.name,
+            status_field: READY,
+            **dimension_updates(model, field_name, size),
+        }
+        # Premier traitement (envoi) : l'image est à jour, elle prend la
+        # génération courante et n'est pas reprise par regenerate_images --resume
+        updates[f"{field_name}_generation"] = (
+            current_generation() if generation is None else generation
+        )
+    except Exception:
+        logger.exception("Échec du traitement de %s (%s %s)", name, label, pk)
+
+    rows.update(**updates)
+    image_processed.send(
+        sender=model, pk=pk, field_name=field_name, status=updates[status_field]
+    )
+    return updates[status_field]
+
+
+def unprocessed_images(statuses, batch_size=1000):
+    """
+    Images dont le statut fait partie de statuses : (label, pk, champ, nom, taille)
+
+    Lues par lots de batch_size (pagination sur la clé primaire) : aucune
+    lecture longue ne bloque les mises à jour de statut faites en parallèle
+    """
+    return image_tasks("status__in", statuses, batch_size)
+
+
+def outdated_images(generation, batch_size=1000):
+    """
+    Images d'une génération antérieure à generation :
+    (label, pk, champ, nom, taille, generation), lues comme unprocessed_images
+    """
+    for task in image_tasks("generation__lt", generation, batch_size):
+        yield *task, generation
+
+
+def image_tasks(lookup, value, batch_size):
+    """Tâches des images filtrées sur <champ>_<lookup>, par lots de batch_size"""
+    for label, field_name in IMAGE_FIELDS:
+        model = apps.get_model(label)
+        rows = model.objects.filter(**{f"{field_name}_{lookup}": value})
+        rows = rows.values_list("pk", field_name).order_by("pk")
+
+        last_pk = 0
+        while batch := list(rows.filter(pk__gt=last_pk)[:batch_size]):
+            last_pk = batch[-1][0]
+            for pk, name in batch:
+                if name:
+                    yield label, pk, field_name, name, model.IMAGE_MAX_SIZE
+
+
+def count_images(statuses):
+    """Nombre d'images dont le statut fait partie de statuses"""
+    return count_image_rows("status__in", statuses)
+
+
+def count_outdated_images(generation):
+    """Nombre d'images d'une génération antérieure à generation"""
+    return count_image_rows("generation__lt", generation)
+
+
+def count_image_rows(lookup, value):
+    """Nombre d'images (champ renseigné) filtrées sur <champ>_<lookup>"""
+    total = 0
+    for label, field_name in IMAGE_FIELDS:
+        rows = apps.get_model(label).objects.filter(
+            **{f"{field_name}_{lookup}": value}
+        )
+        total += (
+            rows.exclude(**{field_name: ""})
+            .exclude(**{f"{field_name}__isnull": True})
+            .count()
+        )
+    return total
+
+
+def current_generation():
+    """
+    Génération des variantes la plus récente (0 avant toute régénération),
+    lue sur l'index de chaque colonne <champ>_generation
+
+    Chaque exécution de regenerate_images traite les images sous la
+    génération suivante ; une exécution interrompue est reprise en
+    traitant celles restées sous la génération courante
+    """
+    generations = (
+        apps.get_model(label).objects.aggregate(
+            generation=Max(f"{field_name}_generation")
+        )["generation"]
+        for label, field_name in IMAGE_FIELDS
+    )
+    return max((generation or 0 for generation in generations), default=0)
+
+
+def init_worker_process():
+    """
+    Processus de traitement (commande regenerate_images, lancé par spawn) :
+    initialise Django, qui ouvre sa propre connexion à la base
+    """
+    django.setup()
+
+
+def resize_upload(instance, field_name, max_size):
+    """
+    Réduit en mémoire une image envoyée, avant sa première écriture
+
+    Le fichier reçu (en mémoire ou fichier temporaire de Django) est lu une
+    seule fois et seule l'image réduite, sans métadonnées, est écrite
+    dans le stockage.
+    En cas d'erreur, le fichier est enregistré tel quel et le traitement
+    en arrière-plan enregistre l'échec.
+    """
+    upload = getattr(instance, field_name)
+
+    try:
+        upload.seek(0)
+        content = shrink(Image.open(upload), max_size, reencode=True)
+    except Exception:
+        logger.warning("Image illisible à l'envoi : %s", upload.name, exc_info=True)
+        content = None
+    finally:
+        upload.seek(0)
+
+    if content is not None:
+        setattr(instance, field_name, ContentFile(content, name=upload.name))
+
+
+def resize_field_file(field_file, max_size):
+    """
+    Réduit l'image stockée à max_size (proportions conservées)
+
+    L'image réduite est un nouveau fichier (nouvelle empreinte) : field_file
+    pointe ensuite dessus, l'original reste intact pour les autres champs
+    qui le partagent (repris par collect_orphan_media s'il n'est plus
+    référencé). Retourne True si l'image a été réduite.
+    """
+    with field_file.open("rb") as source:
+        content = shrink(Image.open(source), max_size)
+
+    if content is None:
+        return False
+
+    field_file.name = field_file.storage.save(
+        field_file.name, ContentFile(content)
+    )
+    # Le fichier déjà ouvert est l'original : relu sous le nouveau nom
+    del field_file.file
+    return True
+
+
+def shrink(image, max_size, reencode=False):
+    """
+    Contenu de l'image réduite à max_size, dans son format d'origine
+
+    Retourne None si l'image est déjà assez petite (seul l'en-tête est lu),
+    sauf avec reencode : l'image est alors toujours réécrite. L'image écrite
+    ne garde aucune métadonnée (EXIF, XMP, textes) hormis le profil de
+    couleurs, l'orientation EXIF étant appliquée aux pixels.
+    """
+    if not reencode and image.width <= max_size[0] and image.height <= max_size[1]:
+        return None
+
+    image_format = image.format
+    icc_profile = image.info.get("icc_profile")
+
+    # JPEG : décodage directement à échelle réduite (1/2, 1/4 ou 1/8),
+    # en gardant une marge pour la qualité du rééchantillonnage final
+    image.draft(None, (max_size[0] * DRAFT_GAP, max_size[1] * DRAFT_GAP))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail(max_size, RESAMPLE, reducing_gap=DRAFT_GAP)
+
+    buffer = BytesIO()
+    image.save(
+        buffer,
+        format=image_format,
+        icc_profile=icc_profile,
+        **save_options(image_format),
+    )
+    return buffer.getvalue()
+
+
+def create_variants(field_file, widths, square):
+    """
+    Écrit les variantes d'une image stockée et retourne sa taille (largeur, hauteur)
+
+    Variantes carrées : toujours générées (dimensions fixes des avatars).
+    Autres variantes : seulement plus étroites que l'original, qui sert
+    de plus grande variante. L'original et chaque variante sont aussi
+    écrits dans les formats modernes.
+    """
+    storage = field_file.storage
+    with field_file.open("rb") as source:
+        image = Image.open(source)
+        image_format = image.format
+        image.load()
+
+    write_modern_formats(storage, field_file.name, image)
+
+    for width in widths:
+        if square:
+            variant = ImageOps.fit(image, (width, width), RESAMPLE)
+        elif width < image.width:
+            variant = image.copy()
+            variant.thumbnail((width, image.height), RESAMPLE)
+        else:
+            continue
+
+        name = variant_name(field_file.name, width)
+        overwrite(storage, name, encode(variant, image_format))
+        write_modern_formats(storage, name, variant)
+
+    return image.size
+
+
+def write_modern_formats(storage, name, image):
+    """Copies AVIF / WebP d'une image (« livre.jpg » -> « livre.jpg.webp »)"""
+    for image_format, _, extension in MODERN_FORMATS:
+        overwrite(storage, name + extension, encode(image, image_format))
+
+
+def encode(image, image_format):
+    """Contenu de l'image enregistrée dans ce format"""
+    if image_format != image.format and image.mode not in ("RGB", "RGBA"):
+        # Formats modernes : couleurs RVB, transparence conservée
+        image = image.convert("RGBA" if image.has_transparency_data else "RGB")
+
+    buffer = BytesIO()
+    image.save(buffer, format=image_format, **save_options(image_format))
+    return buffer.getvalue()
+
+
+def save_options(image_format):
+    """Options d'enregistrement Pillow : qualité explicite des JPEG"""
+    if image_format == "JPEG":
+        return {"quality": IMAGE_JPEG_QUALITY}
+    return {}
+
+
+def overwrite(storage, name, content):
+    """
+    Écrit un fichier dérivé sous ce nom exact (le stockage renommerait un doublon)
+
+    Seulement pour les variantes et formats modernes, dont le contenu est
+    déterminé par le nom : jamais pour un original
+    """
+    # Stockage adressé par contenu (core/storage.py) : écriture directe
+    if hasattr(storage, "overwrite"):
+        storage.overwrite(name, ContentFile(content))
+        return
+
+    storage.delete(name)
+    storage.save(name, ContentFile(content))
+
+
+def dimension_updates(model, field_name, size):
+    """Largeur et hauteur à enregistrer, si le modèle les stocke (<champ>_width)"""
+    width_field, height_field = f"{field_name}_width", f"{field_name}_height"
+    if not hasattr(model, width_field):
+        return {}
+
+    return {width_field: size[0], height_field: size[1]}
+
+
+def variant_name(name, width):
+    """Nom du fichier d'une variante : « tickets/livre.jpg » -> « tickets/livre_400w.jpg »"""
+    root, extension = os.path.splitext(name)
+    return f"{root}_{width}w{extension}"
+
+
+def variant_url(field_file, status, width, extension=""):
+    """URL d'une variante, ou de l'original tant que les variantes ne sont pas prêtes"""
+    if status != READY:
+        return field_file.url
+    return field_file.storage.url(variant_name(field_file.name, width) + extension)
+
+
+def density_srcset(field_file, status, widths, extension=""):
+    """Attribut srcset des variantes carrées : « avatar_48w.jpg 1x, avatar_96w.jpg 2x »"""
+    if status != READY:
+        return ""
+
+    return ", ".join(
+        f"{variant_url(field_file, status, width, extension)} {width // widths[0]}x"
+        for width in widths
+    )
+
+
+def width_srcset(field_file, status, widths, image_width, extension=""):
+    """
+    Attribut srcset des variantes en largeur : « livre_400w.jpg 400w, livre.jpg 800w »
+
+    L'original (largeur image_width) complète les variantes plus étroites
+    """
+    if status != READY or not image_width:
+        return ""
+
+    candidates = [
+        f"{variant_url(field_file, status, width, extension)} {width}w"
+        for width in widths
+        if width < image_width
+    ]
+    original = field_file.storage.url(field_file.name + extension)
+    candidates.append(f"{original} {image_width}w")
+    return ", ".join(candidates)
+
+
+def modern_sources(srcset, *args):
+    """
+    Balises <source> des formats modernes : liste de (type MIME, srcset)
+
+    srcset : density_srcset ou width_srcset, appelée avec args
+    et l'extension de chaque format (vide tant que les variantes manquent)
+    """
+    sources = [
+        (mime_type, srcset(*args, extension=extension))
+        for _, mime_type, extension in MODERN_FORMATS
+    ]
+    return [(mime_type, value) for mime_type, value in sources if value]
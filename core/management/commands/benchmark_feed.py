@@ -0,0 +1,124 @@
+import time
+import tracemalloc
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse
+
+from core import seeding
+
+
+# Pages mesurées (noms d'URL)
+BENCHMARK_URLS = ["feed", "user_posts", "subscriptions"]
+
+
+def percentile(values, rank):
+    """Centile (méthode du rang le plus proche) d'une liste de mesures"""
+    ordered = sorted(values)
+    index = max(0, round(rank / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    """
+    Mesure les pages du flux, des posts et des abonnements
+
+    Chaque taille de données est générée dans une base de test temporaire
+    (la base de développement n'est pas modifiée). Les pages sont appelées
+    par le client de test, comme le ferait un navigateur.
+    """
+
+    help = "Mesure latence (p50/p95), nombre de requêtes et mémoire des pages principales."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[100, 1000],
+            help="Nombres d'utilisateurs générés (une mesure par taille)",
+        )
+        parser.add_argument(
+            "--requests", type=int, default=20, help="Requêtes mesurées par page"
+        )
+        parser.add_argument(
+            "--viewers",
+            type=int,
+            default=5,
+            help="Lecteurs utilisés (ceux qui suivent le plus de comptes)",
+        )
+        parser.add_argument(
+            "--cold",
+            action="store_true",
+            help="Vide le cache avant chaque requête",
+        )
+        parser.add_argument("--seed", type=int, default=1, help="Graine aléatoire")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+        try:
+            self.stdout.write(
+                f"{'Utilisateurs':>12}  {'Page':<14}{'p50 (ms)':>10}{'p95 (ms)':>10}"
+                f"{'Requêtes':>10}{'Mémoire (Ko)':>14}"
+            )
+            for size in options["sizes"]:
+                self.benchmark_size(size, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def benchmark_size(self, size, options):
+        call_command("flush", interactive=False, verbosity=0)
+        cache.clear()
+        seeding.seed_social_graph(size, prefix="bench", seed=options["seed"])
+
+        viewers = seeding.heaviest_viewers(options["viewers"])
+
+        clients = []
+        for viewer in viewers:
+            client = Client()
+            client.force_login(viewer)
+            clients.append(client)
+
+        for name in BENCHMARK_URLS:
+            timings, queries, peak = self.measure(reverse(name), clients, options)
+            self.stdout.write(
+                f"{size:>12}  {name:<14}{percentile(timings, 50):>10.1f}"
+                f"{percentile(timings, 95):>10.1f}{max(queries):>10}{peak / 1024:>14.0f}"
+            )
+
+    def measure(self, url, clients, options):
+        """Durées (ms) et nombres de requêtes SQL, puis pic mémoire d'un appel"""
+        timings = []
+        queries = []
+
+        for index in range(options["requests"]):
+            client = clients[index % len(clients)]
+            if options["cold"]:
+                cache.clear()
+
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                client.get(url)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(len(captured))
+
+        # Mémoire mesurée à part : le traçage ralentit fortement les requêtes
+        if options["cold"]:
+            cache.clear()
+        tracemalloc.start()
+        clients[0].get(url)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return timings, queries, peak
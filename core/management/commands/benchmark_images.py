@@ -0,0 +1,400 @@
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from multiprocessing import get_context
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from PIL import Image
+
+from core import images
+
+try:
+    import resource
+except ImportError:  # Windows : pas de mesure de la mémoire
+    resource = None
+
+
+# Baseline enregistrée avec --save, comparée aux mesures suivantes
+BASELINE_PATH = os.path.join(settings.BASE_DIR, "core", "benchmarks", "images.json")
+
+# Images générées : nom -> (format, largeur, hauteur)
+# (les grandes restent sous les limites d'envoi de core/uploads.py)
+BENCHMARK_IMAGES = {
+    "jpeg-grande": ("JPEG", 4000, 3000),
+    "jpeg-petite": ("JPEG", 64, 64),
+    "png-grande": ("PNG", 2000, 1500),
+    "png-petite": ("PNG", 64, 64),
+}
+
+# Opérations mesurées : nom -> (modèle, champ)
+# - photo, avatar, ticket : réduction en mémoire puis variantes, comme
+#   l'enregistrement d'un modèle suivi de son traitement en arrière-plan
+# - ticket-disque : original écrit tel quel, relu puis réécrit réduit
+# - envoi : formulaire de création de ticket, réponse HTTP seule
+#   (variantes en arrière-plan)
+# - envoi-sync : même envoi, variantes terminées (traitement synchrone)
+OPERATIONS = {
+    "photo": ("blog.Photo", "image"),
+    "avatar": ("accounts.User", "profile_photo"),
+    "ticket": ("blog.Ticket", "image"),
+    "ticket-disque": ("blog.Ticket", "image"),
+    "envoi": ("blog.Ticket", "image"),
+    "envoi-sync": ("blog.Ticket", "image"),
+}
+
+# Opérations qui passent par la vue (base de test dans le processus)
+UPLOAD_OPERATIONS = ("envoi", "envoi-sync")
+
+FILTERS = {
+    "lanczos": Image.Resampling.LANCZOS,
+    "bicubic": Image.Resampling.BICUBIC,
+    "bilinear": Image.Resampling.BILINEAR,
+}
+
+
+def generate_image(image_name, seed):
+    """Contenu d'une image de test, identique d'une exécution à l'autre"""
+    image_format, width, height = BENCHMARK_IMAGES[image_name]
+    rng = random.Random(f"{seed}-{image_name}")
+
+    # Bruit agrandi : des dégradés proches d'une photo, pas un aplat
+    small = (max(width // 16, 2), max(height // 16, 2))
+    image = Image.frombytes("RGB", small, rng.randbytes(small[0] * small[1] * 3))
+    image = image.resize((width, height), Image.Resampling.BICUBIC)
+
+    buffer = BytesIO()
+    if image_format == "JPEG":
+        image.save(buffer, format=image_format, quality=90)
+    else:
+        image.save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+def written_bytes():
+    """Octets écrits par le processus depuis son démarrage (Linux, sinon None)"""
+    try:
+        with open("/proc/self/io") as io_stats:
+            for line in io_stats:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss():
+    """Pic de mémoire résidente du processus, en Ko (None sous Windows)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS : octets, Linux : Ko
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def run_case(operation, image_name, filter_name, repeats, seed):
+    """
+    Mesure une opération dans un processus neuf (lancé par spawn) :
+    le pic de mémoire ne dépend pas des mesures précédentes
+    """
+    django.setup()
+    images.RESAMPLE = FILTERS[filter_name]
+    # Un seul thread de traitement : attendre une tâche vide suffit
+    # à attendre la fin des variantes (envoi-sync)
+    images.IMAGE_WORKERS = 1
+
+    data = generate_image(image_name, seed)
+    extension = BENCHMARK_IMAGES[image_name][0].lower()
+    file_name = f"bench.{'jpg' if extension == 'jpeg' else extension}"
+
+    run = OperationRunner(operation, data, file_name)
+    rss_before = peak_rss()
+
+    try:
+        run.setup()
+        run.measure()  # Échauffement (imports, caches de Pillow)
+
+        timings, written = [], []
+        for _ in range(repeats):
+            duration, size = run.measure()
+            timings.append(duration)
+            written.append(size)
+    finally:
+        run.teardown()
+
+    rss_after = peak_rss()
+    return {
+        "operation": operation,
+        "image": image_name,
+        "filter": filter_name,
+        "median_ms": round(statistics.median(timings), 2),
+        "min_ms": round(min(timings), 2),
+        "peak_rss_kb": rss_after,
+        "rss_growth_kb": None if rss_after is None else rss_after - rss_before,
+        "bytes_written": None if None in written else int(statistics.median(written)),
+    }
+
+
+class OperationRunner:
+    """Exécute une opération dans un dossier média temporaire neuf"""
+
+    def __init__(self, operation, data, file_name):
+        self.operation = operation
+        self.data = data
+        self.file_name = file_name
+        label, self.field_name = OPERATIONS[operation]
+        self.model = apps.get_model(label)
+
+    def setup(self):
+        if self.operation not in UPLOAD_OPERATIONS:
+            return
+
+        from django.db import connection
+        from django.test import Client
+        from django.test.utils import setup_test_environment
+
+        setup_test_environment()
+        self.old_name = connection.creation.create_test_db(verbosity=0)
+
+        user = apps.get_model("accounts.User").objects.create_user("bench", "x")
+        self.client = Client()
+        self.client.force_login(user)
+
+    def teardown(self):
+        if self.operation not in UPLOAD_OPERATIONS:
+            return
+
+        from django.db import connection
+
+        images.get_executor().shutdown(wait=True)
+        connection.creation.destroy_test_db(self.old_name, verbosity=0)
+
+    def measure(self):
+        """Durée (ms) et octets écrits d'une exécution"""
+        media_root = tempfile.mkdtemp(prefix="bench-media-")
+        try:
+            with override_settings(MEDIA_ROOT=media_root):
+                before = written_bytes()
+                start = time.perf_counter()
+                self.run()
+                duration = (time.perf_counter() - start) * 1000
+
+                if self.operation == "envoi":
+                    # Variantes terminées hors durée, mais comptées dans
+                    # les octets écrits
+                    images.get_executor().submit(lambda: None).result()
+                after = written_bytes()
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        size = None if before is None else after - before
+        return duration, size
+
+    def run(self):
+        if self.operation in UPLOAD_OPERATIONS:
+            self.upload()
+            return
+
+        upload = SimpleUploadedFile(self.file_name, self.data)
+        instance = self.model()
+        setattr(instance, self.field_name, upload)
+        max_size = self.model.IMAGE_MAX_SIZE
+
+        if self.operation != "ticket-disque":
+            images.resize_upload(instance, self.field_name, max_size)
+
+        # Écriture dans le stockage, comme lors de l'enregistrement du modèle
+        field = self.model._meta.get_field(self.field_name)
+        name = field.pre_save(instance, True).name
+
+        # Fichier relu depuis le stockage, comme par le traitement en arrière-plan
+        field_file = field.attr_class(instance, field, name)
+
+        if self.operation == "ticket-disque":
+            images.resize_field_file(field_file, max_size)
+
+        label = self.model._meta.label
+        images.create_variants(
+            field_file, *images.IMAGE_FIELDS[(label, self.field_name)]
+        )
+
+    def upload(self):
+        from django.urls import reverse
+
+        response = self.client.post(
+            reverse("ticket_create"),
+            {
+                "title": "Benchmark",
+                "description": "Image de test",
+                "image": SimpleUploadedFile(self.file_name, self.data),
+            },
+        )
+        if response.status_code != 302:
+            raise RuntimeError(f"Envoi refusé (statut {response.status_code})")
+
+        if self.operation == "envoi-sync":
+            images.get_executor().submit(lambda: None).result()
+
+
+def format_value(value, divisor=1, digits=0):
+    """Valeur mise en forme, « - » si elle n'a pas pu être mesurée"""
+    if value is None:
+        return "-"
+    return f"{value / divisor:.{digits}f}"
+
+
+class Command(BaseCommand):
+    """
+    Mesure le traitement des images (réduction, variantes, envoi d'un ticket)
+
+    Chaque mesure tourne dans un processus neuf, sur des images générées
+    (JPEG et PNG, grandes et petites) identiques d'une exécution à l'autre.
+    Les fichiers sont écrits dans un dossier temporaire et l'envoi utilise
+    une base de test : la base de développement et media/ ne sont pas modifiés.
+
+    Mesures : durée médiane et minimale, pic de mémoire résidente,
+    octets écrits (Linux). --save enregistre une baseline, comparée
+    automatiquement aux exécutions suivantes.
+    """
+
+    help = "Mesure durée, mémoire et écritures du traitement des images."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--operations",
+            nargs="+",
+            choices=list(OPERATIONS),
+            default=list(OPERATIONS),
+            help="Opérations mesurées",
+        )
+        parser.add_argument(
+            "--images",
+            nargs="+",
+            choices=list(BENCHMARK_IMAGES),
+            default=list(BENCHMARK_IMAGES),
+            help="Images de test",
+        )
+        parser.add_argument(
+            "--filters",
+            nargs="+",
+            choices=list(FILTERS),
+            default=["lanczos"],
+            help="Filtres de rééchantillonnage comparés",
+        )
+        parser.add_argument(
+            "--repeats", type=int, default=5, help="Mesures par opération"
+        )
+        parser.add_argument("--seed", type=int, default=1, help="Graine aléatoire")
+        parser.add_argument(
+            "--baseline",
+            default=BASELINE_PATH,
+            help="Fichier JSON de la baseline",
+        )
+        parser.add_argument(
+            "--save",
+            action="store_true",
+            help="Enregistre les mesures comme nouvelle baseline",
+        )
+
+    def handle(self, *args, **options):
+        baseline = self.load_baseline(options["baseline"])
+
+        self.stdout.write(
+            f"{'Opération':<14}{'Image':<13}{'Filtre':<10}{'Médiane (ms)':>13}"
+            f"{'Min (ms)':>10}{'RSS max (Mo)':>14}{'+RSS (Mo)':>11}"
+            f"{'Écrit (Ko)':>12}{'vs base':>9}"
+        )
+
+        results = []
+        for operation in options["operations"]:
+            for image_name in options["images"]:
+                for filter_name in options["filters"]:
+                    result = self.run_isolated(
+                        operation, image_name, filter_name, options
+                    )
+                    results.append(result)
+                    self.write_result(result, baseline)
+
+        if options["save"]:
+            self.save_baseline(options["baseline"], results, options)
+
+    def run_isolated(self, operation, image_name, filter_name, options):
+        """Lance une mesure dans un processus neuf"""
+        with ProcessPoolExecutor(
+            max_workers=1, mp_context=get_context("spawn")
+        ) as pool:
+            future = pool.submit(
+                run_case,
+                operation,
+                image_name,
+                filter_name,
+                options["repeats"],
+                options["seed"],
+            )
+            return future.result()
+
+    def write_result(self, result, baseline):
+        reference = baseline.get(
+            (result["operation"], result["image"], result["filter"])
+        )
+        if reference:
+            change = (result["median_ms"] / reference["median_ms"] - 1) * 100
+            compared = f"{change:+.0f} %"
+        else:
+            compared = "-"
+
+        self.stdout.write(
+            f"{result['operation']:<14}{result['image']:<13}{result['filter']:<10}"
+            f"{result['median_ms']:>13.1f}{result['min_ms']:>10.1f}"
+            f"{format_value(result['peak_rss_kb'], 1024, 1):>14}"
+            f"{format_value(result['rss_growth_kb'], 1024, 1):>11}"
+            f"{format_value(result['bytes_written'], 1024):>12}{compared:>9}"
+        )
+
+    def load_baseline(self, path):
+        """Mesures de la baseline, par (opération, image, filtre)"""
+        if not os.path.exists(path):
+            return {}
+
+        try:
+            with open(path, encoding="utf-8") as baseline_file:
+                saved = json.load(baseline_file)
+        except (OSError, ValueError) as error:
+            raise CommandError(f"Baseline illisible ({path}) : {error}")
+
+        return {
+            (result["operation"], result["image"], result["filter"]): result
+            for result in saved["results"]
+        }
+
+    def save_baseline(self, path, results, options):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        saved = {
+            "environment": {
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "pillow": Image.__version__,
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+            },
+            "repeats": options["repeats"],
+            "seed": options["seed"],
+            "results": results,
+        }
+        with open(path, "w", encoding="utf-8") as baseline_file:
+            json.dump(saved, baseline_file, indent=2, ensure_ascii=False)
+            baseline_file.write("\n")
+
+        self.stdout.write(self.style.SUCCESS(f"Baseline enregistrée : {path}"))
@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.template.defaultfilters import filesizeformat
+
+from core import orphans
+
+
+class Command(BaseCommand):
+    """
+    Supprime (ou met en quarantaine) les fichiers média que plus aucun
+    ticket, photo ou profil ne référence
+
+    Sans --delete ni --quarantine, les fichiers orphelins sont seulement listés
+    """
+
+    help = "Supprime ou met en quarantaine les fichiers média orphelins."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--delete",
+            action="store_true",
+            help="Supprime les fichiers orphelins",
+        )
+        parser.add_argument(
+            "--quarantine",
+            metavar="DOSSIER",
+            help="Déplace les fichiers orphelins dans ce dossier (hors MEDIA_ROOT)",
+        )
+        parser.add_argument(
+            "--min-age",
+            type=float,
+            default=24,
+            help="Âge minimal des fichiers, en heures (défaut : 24)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=orphans.ORPHAN_BATCH_SIZE,
+            help="Nombre de fichiers vérifiés par requête",
+        )
+
+    def handle(self, *args, **options):
+        if options["delete"] and options["quarantine"]:
+            raise CommandError("Choisissez --delete ou --quarantine, pas les deux.")
+
+        root = settings.MEDIA_ROOT
+        min_age = options["min_age"] * 3600
+        dry_run = not (options["delete"] or options["quarantine"])
+
+        found = freed = 0
+        for batch in orphans.find_orphans(root, min_age, options["batch_size"]):
+            if not batch:
+                continue
+            found += len(batch)
+
+            if dry_run:
+                for path in batch:
+                    self.stdout.write(path)
+                continue
+
+            freed += orphans.remove_orphans(
+                root, batch, min_age, quarantine=options["quarantine"]
+            )
+            self.stdout.write(f"{found} fichier(s) orphelin(s) traité(s)...")
+
+        if dry_run:
+            self.stdout.write(f"{found} fichier(s) orphelin(s).")
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{found} fichier(s) orphelin(s), {filesizeformat(freed)} libéré(s)."
+                )
+            )
@@ -0,0 +1,119 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse
+
+from core import seeding
+
+
+# Pages dont les requêtes sont analysées (chemins critiques)
+EXPLAIN_URLS = [
+    "feed",
+    "feed_more",
+    "feed_stream",
+    "user_posts",
+    "subscriptions",
+    "blocked_users",
+]
+
+# Étapes d'un plan SQLite signalées : parcours complet et tri temporaire
+PLAN_WARNINGS = ("SCAN ", "USE TEMP B-TREE")
+
+
+class Command(BaseCommand):
+    """
+    Analyse le plan d'exécution (EXPLAIN QUERY PLAN) des requêtes des pages
+
+    Un jeu de données est généré dans une base de test temporaire,
+    puis chaque page est appelée par le lecteur le plus chargé.
+    Les parcours complets de table et les tris temporaires sont signalés.
+    """
+
+    help = "Signale les requêtes des pages principales qui parcourent une table ou trient sans index."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users", type=int, default=1000, help="Nombre d'utilisateurs générés"
+        )
+        parser.add_argument(
+            "--verbose-plans",
+            action="store_true",
+            help="Affiche le plan complet de chaque requête",
+        )
+        parser.add_argument(
+            "--fail",
+            action="store_true",
+            help="Termine en erreur si une requête est signalée (intégration continue)",
+        )
+        parser.add_argument("--seed", type=int, default=1, help="Graine aléatoire")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("EXPLAIN QUERY PLAN n'est disponible qu'avec SQLite.")
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+        try:
+            seeding.seed_social_graph(options["users"], seed=options["seed"])
+
+            # Statistiques des index, comme sur une base en production
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+            client = Client()
+            client.force_login(seeding.heaviest_viewers(1)[0])
+
+            flagged = sum(
+                self.explain_page(client, name, options["verbose_plans"])
+                for name in EXPLAIN_URLS
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if flagged and options["fail"]:
+            raise CommandError(f"{flagged} requête(s) signalée(s).")
+
+        self.stdout.write(f"{flagged} requête(s) signalée(s).")
+
+    def explain_page(self, client, name, verbose_plans):
+        """Analyse les requêtes SELECT d'une page, retourne le nombre signalé"""
+        cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(reverse(name))
+            if response.streaming:
+                b"".join(response.streaming_content)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{name} ({reverse(name)})"))
+
+        flagged = 0
+        # Requêtes identiques (lectures par blocs) analysées une seule fois
+        for sql in dict.fromkeys(query["sql"] for query in captured):
+            if not sql.startswith("SELECT"):
+                continue
+
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                plan = [row[-1] for row in cursor.fetchall()]
+
+            warnings = [step for step in plan if step.startswith(PLAN_WARNINGS)]
+            if warnings:
+                flagged += 1
+
+            if warnings or verbose_plans:
+                self.stdout.write(f"  {sql[:120]}...")
+                for step in plan:
+                    style = self.style.WARNING if step in warnings else str
+                    self.stdout.write(style(f"    {step}"))
+
+        if not flagged:
+            self.stdout.write(self.style.SUCCESS("  Toutes les requêtes utilisent un index."))
+
+        return flagged
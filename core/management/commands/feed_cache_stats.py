@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from core import feed
+
+
+class Command(BaseCommand):
+    """
+    Affiche les compteurs de succès / échecs du cache du flux
+
+    Compteurs cumulés de tous les processus du serveur, enregistrés en base
+    avec un retard de FEED_CACHE_STATS_FLUSH_INTERVAL secondes au plus
+    """
+
+    help = "Affiche (et remet éventuellement à zéro) les statistiques du cache du flux."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Remet les compteurs à zéro après affichage",
+        )
+
+    def handle(self, *args, **options):
+        stats = feed.get_cache_stats()
+
+        self.stdout.write(f"Succès : {stats['hits']}")
+        self.stdout.write(f"Échecs : {stats['misses']}")
+        self.stdout.write(f"Taux de succès : {stats['hit_ratio']:.1%}")
+
+        if options["reset"]:
+            feed.reset_cache_stats()
+            self.stdout.write(self.style.SUCCESS("Compteurs remis à zéro."))
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+
+from core import images
+
+
+class Command(BaseCommand):
+    """
+    Redimensionne les images en attente ou en échec (hors pool de threads)
+
+    À lancer après un redémarrage du serveur : les tâches du pool
+    qui n'avaient pas encore été exécutées sont perdues
+    """
+
+    help = "Traite les images en attente de redimensionnement ou en échec."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--include-processing",
+            action="store_true",
+            help="Reprend aussi les images restées « en cours » (tâche interrompue)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Affiche les images à traiter sans les modifier",
+        )
+
+    def handle(self, *args, **options):
+        statuses = [images.PENDING, images.FAILED]
+        if options["include_processing"]:
+            statuses.append(images.PROCESSING)
+
+        results = {images.READY: 0, images.FAILED: 0}
+        for task in images.unprocessed_images(statuses):
+            label, pk, field_name, name, max_size = task
+
+            if options["dry_run"]:
+                self.stdout.write(f"{label} {pk} : {name}")
+                continue
+
+            status = images.process_image(*task)
+            if status:
+                results[status] += 1
+
+        if options["dry_run"]:
+            return
+
+        if results[images.FAILED]:
+            self.stdout.write(
+                self.style.WARNING(f"{results[images.FAILED]} image(s) en échec.")
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"{results[images.READY]} image(s) traitée(s).")
+        )
@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import feed
+
+
+class Command(BaseCommand):
+    """
+    Reconstruit le flux matérialisé (FeedEntry) à partir des tickets et critiques
+
+    À lancer après la migration initiale, ou pour corriger un flux incohérent
+    """
+
+    help = "Reconstruit le flux matérialisé de tous les utilisateurs (ou d'un seul)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            dest="username",
+            help="Nom de l'utilisateur dont le flux doit être reconstruit",
+        )
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.order_by("id")
+
+        if options["username"]:
+            users = users.filter(username=options["username"])
+            if not users.exists():
+                raise CommandError(f"L'utilisateur {options['username']} n'existe pas.")
+
+        rebuilt = 0
+        for user in users.iterator():
+            with transaction.atomic():
+                feed.rebuild_feed(user)
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f"{rebuilt} flux reconstruit(s)."))
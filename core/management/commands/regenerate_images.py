@@ -0,0 +1,129 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
+
+from django.core.management.base import BaseCommand
+
+from core import images
+
+
+class Command(BaseCommand):
+    """
+    Régénère toutes les images (réduction, variantes, formats modernes)
+    en parallèle sur plusieurs processus
+
+    À lancer après un changement de IMAGE_MAX_SIZE ou des tailles de variantes.
+    Chaque exécution traite les images sous une nouvelle génération
+    (core/images.py) : elles restent prêtes et les pages gardent leurs
+    variantes pendant le traitement. Une exécution interrompue se reprend
+    avec --resume (images restées sous une génération antérieure).
+    """
+
+    help = "Régénère les variantes de toutes les images, en parallèle."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Nombre de processus (défaut : nombre de cœurs)",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Reprend une exécution interrompue (images pas encore retraitées)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Affiche le nombre d'images à traiter sans les modifier",
+        )
+        parser.add_argument(
+            "--progress",
+            type=int,
+            default=1000,
+            help="Affiche l'avancement toutes les N images",
+        )
+
+    def handle(self, *args, **options):
+        generation = images.current_generation()
+        if not options["resume"]:
+            generation += 1
+        total = images.count_outdated_images(generation)
+
+        if options["dry_run"]:
+            self.stdout.write(f"{total} image(s) à traiter.")
+            return
+
+        self.stdout.write(
+            f"{total} image(s) à traiter, génération {generation} "
+            f"({options['workers']} processus)."
+        )
+
+        results = self.run_pool(
+            images.outdated_images(generation),
+            total,
+            options["workers"],
+            options["progress"],
+        )
+
+        if results[images.FAILED]:
+            self.stdout.write(
+                self.style.WARNING(f"{results[images.FAILED]} image(s) en échec.")
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"{results[images.READY]} image(s) régénérée(s).")
+        )
+
+    def run_pool(self, tasks, total, workers, progress):
+        """Traite les tâches dans un pool de processus, peu de tâches en vol à la fois"""
+        results = {images.READY: 0, images.FAILED: 0}
+        done = 0
+        started = time.perf_counter()
+
+        # Processus neufs (spawn) : aucune connexion à la base n'est héritée
+        # du processus principal, qui lit les tâches pendant le traitement
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=get_context("spawn"),
+            initializer=images.init_worker_process,
+        ) as executor:
+            pending = set()
+            for task in tasks:
+                pending.add(executor.submit(images.process_image, *task))
+
+                # File d'attente bornée : les tâches sont lues au fil du traitement
+                if len(pending) >= workers * 4:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    done = self.collect(
+                        finished, results, done, total, progress, started
+                    )
+
+            finished, _ = wait(pending)
+            done = self.collect(finished, results, done, total, progress, started)
+
+        return results
+
+    def collect(self, finished, results, done, total, progress, started):
+        """Compte les tâches terminées et affiche l'avancement"""
+        for future in finished:
+            try:
+                status = future.result()
+            except Exception as error:
+                # Erreur hors traitement de l'image (base verrouillée...)
+                self.stderr.write(f"Tâche interrompue : {error}")
+                status = images.FAILED
+
+            if status:
+                results[status] += 1
+
+            done += 1
+            if done % progress == 0 or done == total:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{done}/{total} ({done * 100 // max(total, 1)} %), "
+                    f"{done / elapsed:.0f} image(s)/s"
+                )
+
+        return done
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core import counters
+
+
+class Command(BaseCommand):
+    """
+    Recalcule les compteurs dénormalisés (abonnés, abonnements, tickets, critiques)
+
+    À lancer après des insertions en masse ou des modifications directes en base
+    """
+
+    help = "Recalcule les compteurs dénormalisés des utilisateurs et des tickets."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Affiche les compteurs faux sans les corriger",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            repaired = counters.repair_counters(dry_run=options["dry_run"])
+
+        for label, count in repaired.items():
+            self.stdout.write(f"{label} : {count} ligne(s)")
+
+        total = sum(repaired.values())
+        if options["dry_run"]:
+            self.stdout.write(f"{total} compteur(s) à corriger.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{total} compteur(s) corrigé(s)."))
@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core import seeding
+
+
+class Command(BaseCommand):
+    """
+    Remplit la base avec un graphe social synthétique
+
+    Destiné aux bases de développement et de mesure, jamais à la production
+    """
+
+    help = "Crée des utilisateurs, abonnements (loi de puissance), blocages, tickets et critiques."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000, help="Nombre d'utilisateurs")
+        parser.add_argument(
+            "--follows", type=float, default=20, help="Abonnements moyens par utilisateur"
+        )
+        parser.add_argument(
+            "--blocks", type=float, default=0.1, help="Blocages moyens par utilisateur"
+        )
+        parser.add_argument(
+            "--tickets", type=int, default=5, help="Tickets moyens par utilisateur"
+        )
+        parser.add_argument(
+            "--reviews", type=int, default=5, help="Critiques moyennes par utilisateur"
+        )
+        parser.add_argument(
+            "--days", type=int, default=365, help="Période couverte par les publications"
+        )
+        parser.add_argument(
+            "--prefix", default="seed", help="Préfixe des noms d'utilisateur créés"
+        )
+        parser.add_argument("--seed", type=int, help="Graine aléatoire (résultat reproductible)")
+
+    def handle(self, *args, **options):
+        prefix = options["prefix"]
+
+        if get_user_model().objects.filter(username__startswith=f"{prefix}_").exists():
+            raise CommandError(
+                f"Des utilisateurs « {prefix}_* » existent déjà, choisissez un autre --prefix."
+            )
+
+        users = seeding.seed_social_graph(
+            options["users"],
+            follows_per_user=options["follows"],
+            blocks_per_user=options["blocks"],
+            tickets_per_user=options["tickets"],
+            reviews_per_user=options["reviews"],
+            days=options["days"],
+            prefix=prefix,
+            seed=options["seed"],
+        )
+
+        self.stdout.write(self.style.SUCCESS(f"{len(users)} utilisateur(s) créé(s)."))
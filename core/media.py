@@ -0,0 +1,181 @@
+"""
+Service des fichiers média (images envoyées)
+
+- Cache-Control : les originaux adressés par contenu (core/storage.py) ne
+  changent jamais, ils sont mis en cache un an (« immutable ») ; les
+  fichiers dérivés (variantes, AVIF / WebP), réécrits à chaque régénération,
+  et les fichiers envoyés avant ce stockage sont revalidés toutes les heures
+- ETag et Last-Modified : réponse 304 vide si le navigateur a déjà le fichier
+- Range : envoi d'une partie du fichier (réponse 206)
+- En production, l'envoi peut être confié au serveur web (nginx :
+  X-Accel-Redirect, Apache : X-Sendfile), voir MEDIA_SENDFILE_HEADER
+"""
+
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from .storage import is_addressed_original
+
+# Durée de cache des originaux adressés par contenu (un an) et des autres
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+MEDIA_MAX_AGE = 3600
+
+# Envoi confié au serveur web : en-tête (« X-Accel-Redirect », « X-Sendfile »)
+# et préfixe ajouté au chemin du fichier (location interne de nginx,
+# ou MEDIA_ROOT pour Apache). Sans en-tête, Django envoie le fichier.
+MEDIA_SENDFILE_HEADER = getattr(settings, "MEDIA_SENDFILE_HEADER", None)
+MEDIA_SENDFILE_ROOT = getattr(settings, "MEDIA_SENDFILE_ROOT", "/protected-media/")
+
+# Types absents des anciennes versions du module mimetypes
+MEDIA_TYPES = {".avif": "image/avif", ".webp": "image/webp"}
+
+# Plage demandée : « bytes=début-fin », « bytes=début- » ou « bytes=-longueur »
+RANGE_HEADER = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+@require_safe
+def serve_media(request, path):
+    """Envoie un fichier de MEDIA_ROOT"""
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (OSError, ValueError):
+        raise Http404("Fichier introuvable")
+
+    if not os.path.isfile(full_path):
+        raise Http404("Fichier introuvable")
+
+    immutable = is_addressed_original(path)
+    etag = media_etag(path, stat, immutable)
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        response = media_response(request, path, full_path, stat.st_size, etag)
+
+    response.headers["ETag"] = etag
+    response.headers["Last-Modified"] = http_date(stat.st_mtime)
+    response.headers.setdefault("Accept-Ranges", "bytes")
+    if immutable:
+        patch_cache_control(
+            response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True
+        )
+    else:
+        patch_cache_control(response, public=True, max_age=MEDIA_MAX_AGE)
+    return response
+
+
+def media_etag(path, stat, immutable):
+    """Nom de l'original adressé par contenu, sinon date de modification et taille"""
+    if immutable:
+        return f'"{os.path.basename(path)}"'
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def media_response(request, path, full_path, size, etag):
+    """Réponse complète ou partielle (Range), envoyée par Django ou le serveur web"""
+    content_type = media_type(path)
+
+    if MEDIA_SENDFILE_HEADER:
+        # Le serveur web lit le fichier et gère lui-même les plages
+        response = HttpResponse(content_type=content_type)
+        response.headers[MEDIA_SENDFILE_HEADER] = MEDIA_SENDFILE_ROOT + path
+        return response
+
+    byte_range = requested_range(request, size, etag)
+    if byte_range is None:
+        return FileResponse(open(full_path, "rb"), content_type=content_type)
+
+    if byte_range == ():
+        response = HttpResponse(status=416)
+        response.headers["Content-Range"] = f"bytes */{size}"
+        return response
+
+    start, end = byte_range
+    source = open(full_path, "rb")
+    source.seek(start)
+
+    response = FileResponse(
+        RangeFile(source, end - start + 1), status=206, content_type=content_type
+    )
+    response.headers["Content-Length"] = end - start + 1
+    response.headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return response
+
+
+def media_type(path):
+    """Type MIME d'un fichier (« livre.jpg.webp » : image/webp)"""
+    extension = os.path.splitext(path)[1].lower()
+    return (
+        MEDIA_TYPES.get(extension)
+        or mimetypes.guess_type(path)[0]
+        or ("application/octet-stream")
+    )
+
+
+def requested_range(request, size, etag):
+    """
+    Plage demandée (début, fin incluse), () si elle commence après la fin
+    du fichier, None pour envoyer tout le fichier (pas de Range, plage
+    invalide, plusieurs plages, ou If-Range ne correspondant plus au fichier)
+    """
+    header = request.headers.get("Range", "")
+    match = RANGE_HEADER.match(header.strip())
+    if not match or not size:
+        return None
+
+    if_range = request.headers.get("If-Range")
+    if if_range and if_range != etag:
+        return None
+
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        if last and int(last) < start:
+            # Plage invalide (« bytes=9-3 ») : ignorée, tout le fichier est envoyé
+            return None
+        end = min(int(last), size - 1) if last else size - 1
+    elif last:
+        # Derniers octets du fichier
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        return None
+
+    if start >= size:
+        return ()
+    return start, end
+
+
+class RangeFile:
+    """
+    Fichier limité à length octets à partir de sa position courante
+
+    fileno() est transmis : un serveur WSGI qui utilise sendfile()
+    (gunicorn) envoie la plage sans copie, d'après Content-Length
+    """
+
+    def __init__(self, source, length):
+        self.source = source
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.source.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.source.fileno()
+
+    def close(self):
+        self.source.close()
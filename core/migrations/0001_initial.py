@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_type', models.CharField(choices=[('TICKET', 'Ticket'), ('REVIEW', 'Critique')], max_length=6, verbose_name='Type de post')),
+                ('post_id', models.PositiveBigIntegerField(verbose_name='Identifiant du post')),
+                ('time_created', models.DateTimeField(verbose_name='Date de création du post')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL, verbose_name='Propriétaire du flux')),
+            ],
+            options={
+                'verbose_name': 'Entrée de flux',
+                'verbose_name_plural': 'Entrées de flux',
+                'ordering': ['-time_created', '-post_type', '-post_id'],
+                'indexes': [models.Index(fields=['owner', '-time_created', '-post_type', '-post_id'], name='core_feedentry_owner_time_idx'), models.Index(fields=['post_type', 'post_id'], name='core_feeden_post_ty_47a1b3_idx')],
+                'unique_together': {('owner', 'post_type', 'post_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FeedCacheCounter",
+            fields=[
+                (
+                    "name",
+                    models.CharField(
+                        max_length=20,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Compteur",
+                    ),
+                ),
+                (
+                    "value",
+                    models.PositiveBigIntegerField(default=0, verbose_name="Valeur"),
+                ),
+            ],
+            options={
+                "verbose_name": "Compteur du cache du flux",
+                "verbose_name_plural": "Compteurs du cache du flux",
+            },
+        ),
+    ]
@@ -1,3 +1,115 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class FeedEntry(models.Model):
+    """
+    Entrée du flux matérialisé d'un utilisateur
+
+    Chaque ligne référence un post (ticket ou critique) visible dans le flux
+    de son propriétaire. La table est remplie à l'écriture (fan-out) :
+    - création / suppression d'un ticket ou d'une critique
+    - reconstruction du flux quand un abonnement ou un blocage change
+
+    La lecture du flux devient un simple parcours d'index (owner, date)
+    """
+
+    # Types de post (l'ordre alphabétique sert au départage à date égale)
+    TICKET = "TICKET"
+    REVIEW = "REVIEW"
+
+    POST_TYPE_CHOICES = [
+        (TICKET, "Ticket"),
+        (REVIEW, "Critique"),
+    ]
+
+    # Utilisateur à qui appartient le flux
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Propriétaire du flux"
+    )
+
+    # Post référencé (type + identifiant)
+    post_type = models.CharField(
+        max_length=6,
+        choices=POST_TYPE_CHOICES,
+        verbose_name="Type de post"
+    )
+    post_id = models.PositiveBigIntegerField(verbose_name="Identifiant du post")
+
+    # Date de création du post (copiée pour trier sans jointure)
+    time_created = models.DateTimeField(verbose_name="Date de création du post")
+
+    class Meta:
+        # Contrainte unique : un post n'apparaît qu'une fois par flux
+        unique_together = ("owner", "post_type", "post_id")
+
+        ordering = ["-time_created", "-post_type", "-post_id"]
+
+        verbose_name = "Entrée de flux"
+        verbose_name_plural = "Entrées de flux"
+
+        # Index couvrant la lecture paginée du flux
+        indexes = [
+            models.Index(
+                fields=["owner", "-time_created", "-post_type", "-post_id"],
+                name="core_feedentry_owner_time_idx",
+            ),
+            models.Index(fields=["post_type", "post_id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.post_type} {self.post_id} dans le flux de {self.owner_id}"
+
+
+class FeedCacheCounter(models.Model):
+    """
+    Compteur de succès ou d'échecs du cache du flux
+
+    Stocké en base pour être partagé par tous les processus du serveur
+    et lu par la commande feed_cache_stats (voir core/feed.py)
+    """
+
+    HITS = "hits"
+    MISSES = "misses"
+
+    name = models.CharField(max_length=20, primary_key=True, verbose_name="Compteur")
+    value = models.PositiveBigIntegerField(default=0, verbose_name="Valeur")
+
+    class Meta:
+        verbose_name = "Compteur du cache du flux"
+        verbose_name_plural = "Compteurs du cache du flux"
+
+    def __str__(self):
+        return f"{self.name} : {self.value}"
+
+
+class CounterFieldsMixin:
+    """
+    Modèle à compteurs dénormalisés (COUNTER_FIELDS) ajustés par des
+    mises à jour F() (core/counters.py)
+
+    Un enregistrement complet d'une ligne existante n'écrit pas ces colonnes :
+    leurs valeurs en mémoire, lues avant l'enregistrement, peuvent être
+    périmées et annuleraient les ajustements faits entre-temps
+    """
+
+    COUNTER_FIELDS = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and not kwargs.get("force_insert")
+            and kwargs.get("update_fields") is None
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
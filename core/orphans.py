@@ -0,0 +1,137 @@
+"""
+Fichiers média orphelins : plus référencés par aucun champ image
+
+Les anciens fichiers restent sur le disque après la suppression d'un ticket,
+le remplacement d'une image ou d'une photo de profil. Le ramasse-miettes
+parcourt les dossiers des champs image au fil de l'eau et vérifie les
+fichiers par lots auprès de la base : ni la liste des fichiers ni celle
+des noms référencés ne sont chargées entièrement en mémoire.
+
+Un fichier dérivé (variante, copie AVIF / WebP) est gardé tant que
+son original est référencé. Les fichiers récents (envoi en cours,
+fichier partagé réutilisé) ne sont jamais supprimés.
+
+Utilisé par la commande collect_orphan_media
+"""
+
+import os
+import re
+import shutil
+import time
+
+from django.apps import apps
+
+from . import images
+
+# Nombre de fichiers vérifiés par requête (3 noms possibles par fichier,
+# sous la limite de 999 paramètres des anciennes versions de SQLite)
+ORPHAN_BATCH_SIZE = 300
+
+# Extensions ajoutées aux copies dans les formats modernes (« livre.jpg.webp »)
+DERIVED_EXTENSIONS = (".avif", ".webp")
+
+# Suffixe des variantes (« livre_400w.jpg »)
+VARIANT_SUFFIX = re.compile(r"_\d+w(?=\.\w+$)")
+
+
+def media_directories():
+    """Dossiers des champs image (upload_to), relatifs à MEDIA_ROOT"""
+    directories = set()
+    for label, field_name in images.IMAGE_FIELDS:
+        field = apps.get_model(label)._meta.get_field(field_name)
+        directories.add(field.upload_to.strip("/"))
+    return sorted(directories)
+
+
+def walk_files(root, directory):
+    """Fichiers d'un dossier et de ses sous-dossiers : (chemin relatif, date)"""
+    try:
+        entries = os.scandir(os.path.join(root, directory))
+    except FileNotFoundError:
+        return
+
+    with entries:
+        for entry in entries:
+            path = f"{directory}/{entry.name}"
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk_files(root, path)
+            elif entry.is_file(follow_symlinks=False):
+                yield path, entry.stat().st_mtime
+
+
+def owner_names(path):
+    """Noms qui gardent ce fichier : lui-même, ou son original s'il est dérivé"""
+    names = {path}
+
+    base, extension = os.path.splitext(path)
+    if extension in DERIVED_EXTENSIONS and os.path.splitext(base)[1]:
+        path = base
+        names.add(path)
+
+    names.add(VARIANT_SUFFIX.sub("", path))
+    return names
+
+
+def unreferenced(paths):
+    """Fichiers du lot qu'aucun champ image ne référence"""
+    owners = {path: owner_names(path) for path in paths}
+    names = set().union(*owners.values())
+
+    referenced = set()
+    for label, field_name in images.IMAGE_FIELDS:
+        referenced.update(
+            apps.get_model(label)
+            .objects.filter(**{f"{field_name}__in": names})
+            .values_list(field_name, flat=True)
+        )
+
+    return [path for path, candidates in owners.items() if not candidates & referenced]
+
+
+def find_orphans(root, min_age, batch_size=ORPHAN_BATCH_SIZE):
+    """Lots de fichiers orphelins modifiés il y a plus de min_age secondes"""
+    oldest = time.time() - min_age
+    batch = []
+
+    for directory in media_directories():
+        for path, modified in walk_files(root, directory):
+            if modified >= oldest:
+                continue
+
+            batch.append(path)
+            if len(batch) >= batch_size:
+                yield unreferenced(batch)
+                batch = []
+
+    if batch:
+        yield unreferenced(batch)
+
+
+def remove_orphans(root, paths, min_age, quarantine=None):
+    """
+    Supprime des fichiers orphelins, ou les déplace dans le dossier quarantine
+    (même arborescence), et retourne le nombre d'octets libérés
+
+    Un fichier modifié entre-temps (réutilisé par un envoi identique) est gardé
+    """
+    oldest = time.time() - min_age
+    freed = 0
+
+    for path in paths:
+        full_path = os.path.join(root, path)
+        try:
+            stat = os.stat(full_path)
+        except FileNotFoundError:
+            continue
+        if stat.st_mtime >= oldest:
+            continue
+
+        if quarantine:
+            target = os.path.join(quarantine, path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.move(full_path, target)
+        else:
+            os.remove(full_path)
+        freed += stat.st_size
+
+    return freed
@@ -0,0 +1,197 @@
+"""
+Génération d'un graphe social synthétique (mesures de performance)
+
+Les abonnements suivent une loi de puissance : quelques utilisateurs très
+suivis, une longue traîne d'utilisateurs peu suivis, comme en production.
+Les lignes sont insérées par lots (bulk_create, sans signaux) puis les flux
+matérialisés sont reconstruits une fois pour toutes.
+
+Utilisé par les commandes seed_social_graph, benchmark_feed et explain_queries
+"""
+
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from accounts import relationships
+from accounts.models import UserFollows, UserBlock
+from blog.models import Ticket, Review
+from . import counters, feed
+
+
+# Nombre de lignes insérées par requête
+SEED_BATCH_SIZE = 1000
+
+# Exposant de la loi de puissance (popularité du rang r proportionnelle à 1 / r^a)
+FOLLOW_POWER_LAW_EXPONENT = 1.2
+
+
+def seed_social_graph(
+    users,
+    follows_per_user=20,
+    blocks_per_user=0.1,
+    tickets_per_user=5,
+    reviews_per_user=5,
+    days=365,
+    prefix="seed",
+    seed=None,
+):
+    """
+    Crée un graphe social complet et retourne les utilisateurs créés
+    (compteurs dénormalisés et flux matérialisés compris)
+
+    - users : nombre d'utilisateurs
+    - follows_per_user : nombre moyen d'abonnements par utilisateur
+    - blocks_per_user : nombre moyen de blocages par utilisateur
+    - tickets_per_user / reviews_per_user : volume moyen de publications
+    - days : période sur laquelle les dates de publication sont réparties
+    """
+    rng = random.Random(seed)
+
+    with transaction.atomic():
+        created = create_users(users, prefix)
+        ids = [user.id for user in created]
+
+        create_follows(ids, follows_per_user, rng)
+        create_blocks(ids, blocks_per_user, rng)
+        tickets = create_tickets(ids, tickets_per_user, days, rng)
+        create_reviews(ids, tickets, reviews_per_user, rng)
+
+        for user in created:
+            feed.rebuild_feed(user)
+
+        # Insertions en masse sans signaux : compteurs recalculés
+        counters.repair_counters()
+
+    relationships.invalidate_relationships(*ids)
+    return created
+
+
+def create_users(count, prefix):
+    # Un seul hachage de mot de passe (coûteux) partagé par tous les comptes
+    password = make_password(prefix)
+    User = get_user_model()
+
+    User.objects.bulk_create(
+        [
+            User(username=f"{prefix}_{index}", password=password)
+            for index in range(count)
+        ],
+        batch_size=SEED_BATCH_SIZE,
+    )
+
+    return list(User.objects.filter(username__startswith=f"{prefix}_").order_by("id"))
+
+
+def create_follows(ids, follows_per_user, rng):
+    """Abonnements : cibles tirées selon leur popularité (loi de puissance)"""
+    weights = [1 / (rank + 1) ** FOLLOW_POWER_LAW_EXPONENT for rank in range(len(ids))]
+    popularity = ids[:]
+    rng.shuffle(popularity)
+
+    follows = []
+    for user_id in ids:
+        wanted = min(int(rng.expovariate(1 / follows_per_user)), len(ids) - 1)
+
+        followed = set()
+        # Nombre d'essais borné : les cibles très populaires sont souvent tirées
+        for followed_id in rng.choices(popularity, weights, k=wanted * 2):
+            if len(followed) >= wanted:
+                break
+            if followed_id != user_id:
+                followed.add(followed_id)
+
+        follows += [
+            UserFollows(user_id=user_id, followed_user_id=followed_id)
+            for followed_id in followed
+        ]
+
+    UserFollows.objects.bulk_create(follows, batch_size=SEED_BATCH_SIZE)
+
+
+def create_blocks(ids, blocks_per_user, rng):
+    """Blocages entre paires d'utilisateurs tirées au hasard"""
+    if len(ids) < 2:
+        return
+
+    pairs = set()
+    for _ in range(int(len(ids) * blocks_per_user)):
+        blocker_id, blocked_user_id = rng.sample(ids, 2)
+        pairs.add((blocker_id, blocked_user_id))
+
+    UserBlock.objects.bulk_create(
+        [
+            UserBlock(blocker_id=blocker_id, blocked_user_id=blocked_user_id)
+            for blocker_id, blocked_user_id in pairs
+        ],
+        batch_size=SEED_BATCH_SIZE,
+    )
+
+
+def create_tickets(ids, tickets_per_user, days, rng):
+    """Tickets répartis sur la période, retourne la liste (id, date de création)"""
+    tickets = []
+    for user_id in ids:
+        for index in range(rng.randint(0, tickets_per_user * 2)):
+            tickets.append(
+                Ticket(
+                    user_id=user_id,
+                    title=f"Livre {user_id}-{index}",
+                    description="Demande de critique générée automatiquement.",
+                )
+            )
+
+    Ticket.objects.bulk_create(tickets, batch_size=SEED_BATCH_SIZE)
+    spread_dates(Ticket, tickets, days, rng)
+
+    return [(ticket.id, ticket.time_created) for ticket in tickets]
+
+
+def create_reviews(ids, tickets, reviews_per_user, rng):
+    """Critiques sur des tickets distincts, jamais après le ticket critiqué"""
+    if not tickets:
+        return
+
+    reviews = []
+    for user_id in ids:
+        count = min(rng.randint(0, reviews_per_user * 2), len(tickets))
+
+        for ticket_id, ticket_created in rng.sample(tickets, count):
+            review = Review(
+                ticket_id=ticket_id,
+                user_id=user_id,
+                rating=rng.randint(0, 5),
+                headline=f"Critique de {user_id}",
+                body="Critique générée automatiquement.",
+            )
+            # Date fixée après l'insertion (auto_now_add l'écrase)
+            review.ticket_created = ticket_created
+            reviews.append(review)
+
+    Review.objects.bulk_create(reviews, batch_size=SEED_BATCH_SIZE)
+
+    # Date d'une critique : après celle de son ticket
+    now = timezone.now()
+    for review in reviews:
+        start = review.ticket_created
+        review.time_created = start + (now - start) * rng.random()
+
+    Review.objects.bulk_update(reviews, ["time_created"], batch_size=SEED_BATCH_SIZE)
+
+
+def spread_dates(model, objects, days, rng):
+    """Répartit les dates de création (fixées à l'insertion) sur la période"""
+    now = timezone.now()
+    for obj in objects:
+        obj.time_created = now - timedelta(seconds=rng.uniform(0, days * 86400))
+
+    model.objects.bulk_update(objects, ["time_created"], batch_size=SEED_BATCH_SIZE)
+
+
+def heaviest_viewers(count):
+    """Utilisateurs qui suivent le plus de comptes (flux les plus chargés)"""
+    return list(get_user_model().objects.order_by("-following_count", "id")[:count])
@@ -0,0 +1,194 @@
+"""
+Signaux de mise à jour du flux matérialisé (FeedEntry)
+
+- Ticket / Critique créé ou supprimé : ajout / retrait dans les flux concernés
+- Ticket / Critique modifié : invalidation du cache des flux qui le contiennent
+- Nom, photo de profil ou statut d'une image modifié : invalidation du cache
+  des flux qui les affichent (versions et ETag des pages)
+- Abonnement ou blocage modifié : reconstruction des flux des utilisateurs impliqués
+
+Les reconstructions sont différées après la validation de la transaction
+
+Ils tiennent aussi à jour les compteurs dénormalisés (core/counters.py).
+Un blocage supprime les abonnements mutuels : leurs compteurs sont ajustés
+par les signaux de suppression de UserFollows
+"""
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from accounts.models import UserFollows, UserBlock
+from blog.models import Ticket, Review
+from . import feed, images
+from .counters import adjust_counters, rating_change, rating_deltas
+
+
+def schedule_rebuild(*user_ids):
+    """Reconstruit les flux des utilisateurs après la validation de la transaction"""
+
+    def rebuild():
+        # L'utilisateur a pu être supprimé entre-temps (suppression en cascade)
+        for user in get_user_model().objects.filter(id__in=set(user_ids)):
+            feed.rebuild_feed(user)
+
+    transaction.on_commit(rebuild)
+
+
+@receiver(post_save, sender=Ticket)
+def add_ticket_to_feeds(sender, instance, created, **kwargs):
+    """Ajoute un nouveau ticket dans les flux (ou invalide leur cache s'il est modifié)"""
+    if created:
+        feed.add_post(feed.TICKET, instance)
+    else:
+        feed.touch_post(feed.TICKET, instance.id)
+
+
+@receiver(post_save, sender=Review)
+def add_review_to_feeds(sender, instance, created, **kwargs):
+    """Ajoute une nouvelle critique dans les flux (ou invalide leur cache si elle est modifiée)"""
+    if created:
+        feed.add_post(feed.REVIEW, instance)
+    else:
+        feed.touch_post(feed.REVIEW, instance.id)
+
+    # Les agrégats de notes affichés sur la carte du ticket ont changé
+    feed.touch_post(feed.TICKET, instance.ticket_id)
+
+
+@receiver(post_init, sender=get_user_model())
+def remember_author_display(sender, instance, **kwargs):
+    """Mémorise le nom et la photo chargés pour détecter leur modification"""
+    instance.saved_display = author_display(instance)
+
+
+@receiver(post_save, sender=get_user_model())
+def touch_author_feeds(sender, instance, created, **kwargs):
+    """Nom ou photo de profil modifié : les flux qui affichent l'auteur changent"""
+    display = author_display(instance)
+    if not created and display != instance.saved_display:
+        feed.touch_author(instance.pk)
+
+    instance.saved_display = display
+
+
+def author_display(user):
+    """Champs de l'auteur affichés dans les cartes du flux"""
+    # Lecture directe : un champ différé (only/defer) ne déclenche pas de requête
+    values = user.__dict__
+    photo = values.get("profile_photo")
+    return (
+        values.get("username"),
+        getattr(photo, "name", photo),
+        values.get("profile_photo_status"),
+    )
+
+
+@receiver(images.image_processed)
+def touch_processed_image(sender, pk, **kwargs):
+    """Variantes prêtes (ou échec) : les cartes qui affichent l'image changent"""
+    if sender is Ticket:
+        feed.touch_post(feed.TICKET, pk)
+    elif sender is get_user_model():
+        feed.touch_author(pk)
+
+
+@receiver(post_delete, sender=Ticket)
+def remove_ticket_from_feeds(sender, instance, **kwargs):
+    """Retire un ticket supprimé des flux"""
+    feed.remove_post(feed.TICKET, instance.id)
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_from_feeds(sender, instance, **kwargs):
+    """Retire une critique supprimée des flux (y compris en cascade)"""
+    feed.remove_post(feed.REVIEW, instance.id)
+    feed.touch_post(feed.TICKET, instance.ticket_id)
+
+
+# ==========================================
+# COMPTEURS DÉNORMALISÉS
+# ==========================================
+
+User = get_user_model()
+
+
+def count_ticket(ticket, delta):
+    adjust_counters(User, ticket.user_id, ticket_count=delta)
+
+
+def count_review(review, delta):
+    adjust_counters(User, review.user_id, review_count=delta)
+    adjust_counters(
+        Ticket, review.ticket_id, review_count=delta, **rating_deltas(review.rating, delta)
+    )
+
+
+def count_follow(follow, delta):
+    adjust_counters(User, follow.user_id, following_count=delta)
+    adjust_counters(User, follow.followed_user_id, followers_count=delta)
+
+
+@receiver(post_save, sender=Ticket)
+def count_created_ticket(sender, instance, created, **kwargs):
+    if created:
+        count_ticket(instance, 1)
+
+
+@receiver(post_delete, sender=Ticket)
+def count_deleted_ticket(sender, instance, **kwargs):
+    count_ticket(instance, -1)
+
+
+@receiver(post_init, sender=Review)
+def remember_rating(sender, instance, **kwargs):
+    """Mémorise la note chargée pour détecter sa modification"""
+    # Lecture directe : un champ différé (only/defer) ne déclenche pas de requête
+    instance.saved_rating = instance.__dict__.get("rating")
+
+
+@receiver(post_save, sender=Review)
+def count_saved_review(sender, instance, created, **kwargs):
+    if created:
+        count_review(instance, 1)
+    elif instance.saved_rating is not None and instance.saved_rating != instance.rating:
+        adjust_counters(
+            Ticket, instance.ticket_id, **rating_change(instance.saved_rating, instance.rating)
+        )
+
+    instance.saved_rating = instance.rating
+
+
+@receiver(post_delete, sender=Review)
+def count_deleted_review(sender, instance, **kwargs):
+    count_review(instance, -1)
+
+
+@receiver(post_save, sender=UserFollows)
+def count_created_follow(sender, instance, created, **kwargs):
+    if created:
+        count_follow(instance, 1)
+
+
+@receiver(post_delete, sender=UserFollows)
+def count_deleted_follow(sender, instance, **kwargs):
+    count_follow(instance, -1)
+
+
+# ==========================================
+# RECONSTRUCTION DES FLUX
+# ==========================================
+
+@receiver(post_save, sender=UserFollows)
+@receiver(post_delete, sender=UserFollows)
+def rebuild_follower_feed(sender, instance, **kwargs):
+    """Un abonnement change : seul le flux de l'abonné est concerné"""
+    schedule_rebuild(instance.user_id)
+
+
+@receiver(post_save, sender=UserBlock)
+@receiver(post_delete, sender=UserBlock)
+def rebuild_blocked_feeds(sender, instance, **kwargs):
+    """Un blocage change : les flux des deux utilisateurs sont concernés"""
+    schedule_rebuild(instance.blocker_id, instance.blocked_user_id)
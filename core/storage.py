@@ -0,0 +1,162 @@
+"""
+Stockage des images envoyées, adressé par contenu
+
+Une image est nommée d'après l'empreinte SHA-256 de son contenu :
+« tickets/livre.jpg » devient « tickets/3f/3fa8…c2.jpg ». Deux envois
+identiques (la même couverture postée par plusieurs utilisateurs)
+partagent un seul fichier, et un nom ne change jamais de contenu :
+les fichiers peuvent être mis en cache sans limite de durée.
+
+Les fichiers dérivés (variantes, copies AVIF / WebP) reprennent
+l'empreinte de l'original (« 3fa8…c2_400w.jpg.webp ») et sont partagés
+de la même façon.
+
+Un fichier n'est supprimé que s'il n'est plus référencé par aucun
+champ image (compte fait en base au moment de la suppression).
+
+Les fichiers sont écrits dans un fichier temporaire du même dossier, puis
+renommés sur leur nom final : une lecture en cours (page, requête Range)
+ne voit jamais un fichier tronqué ou à moitié écrit.
+"""
+
+import contextlib
+import hashlib
+import os
+import re
+import secrets
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, storages
+from django.utils.deconstruct import deconstructible
+
+from . import images
+
+# Nom d'un fichier adressé par contenu, original ou dérivé :
+# empreinte, suffixe de la variante (« _400w »), extension de l'original
+ADDRESSED_NAME = re.compile(
+    r"^(?P<digest>[0-9a-f]{64})(?P<suffix>_\d+w)?(?P<extension>\.\w+)"
+)
+
+# Taille des blocs lus pour calculer l'empreinte
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def image_storage():
+    """Stockage des champs image (alias « images » de STORAGES)"""
+    return storages["images"]
+
+
+@deconstructible(path="core.storage.ContentAddressedStorage")
+class ContentAddressedStorage(FileSystemStorage):
+    """Stockage sur disque des images, nommées par l'empreinte de leur contenu"""
+
+    def __init__(self, **kwargs):
+        # Un nom désigne toujours le même contenu (les dérivés sont réécrits
+        # sur place) : pas de renommage des doublons
+        kwargs.setdefault("allow_overwrite", True)
+        super().__init__(**kwargs)
+
+    def save(self, name, content, max_length=None):
+        """Enregistre un envoi sous son empreinte, sans l'écrire s'il existe déjà"""
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+
+        name = addressed_name(name, content)
+        if self.exists(name):
+            # Fichier réutilisé : date rafraîchie, le ramasse-miettes des
+            # fichiers orphelins (core/orphans.py) ne le supprime pas
+            os.utime(self.path(name))
+            return name
+
+        return super().save(name, content, max_length=max_length)
+
+    def overwrite(self, name, content):
+        """
+        Écrit un fichier dérivé sous ce nom exact (variantes, formats modernes)
+
+        Un original modifié est enregistré par save() sous sa nouvelle empreinte
+        """
+        return super().save(name, content)
+
+    def _save(self, name, content):
+        """Écrit le fichier dans un fichier temporaire, renommé par os.replace"""
+        full_path = self.path(name)
+        directory, file_name = os.path.split(full_path)
+        os.makedirs(directory, exist_ok=True)
+
+        # Fichier temporaire caché, repris par collect_orphan_media s'il reste
+        temporary = os.path.join(directory, f".{file_name}.{secrets.token_hex(8)}.tmp")
+        try:
+            # Droits par défaut (0o666 moins l'umask), comme FileSystemStorage
+            descriptor = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+            with os.fdopen(descriptor, "wb") as destination:
+                for chunk in content.chunks():
+                    destination.write(chunk)
+
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary, self.file_permissions_mode)
+            os.replace(temporary, full_path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temporary)
+            raise
+
+        return str(name).replace("\\", "/")
+
+    def delete(self, name):
+        """Supprime un fichier, seulement s'il n'est plus référencé"""
+        if name and reference_count(name):
+            return
+        super().delete(name)
+
+
+def addressed_name(name, content):
+    """« tickets/livre.JPG » -> « tickets/3f/3fa8…c2.jpg » (empreinte du contenu)"""
+    digest = hashlib.sha256()
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+
+    digest = digest.hexdigest()
+    directory, file_name = os.path.split(name)
+    extension = os.path.splitext(name)[1].lower()
+
+    # Nom déjà adressé (image réduite après son envoi) : même dossier d'envoi
+    match = ADDRESSED_NAME.match(file_name)
+    if match and os.path.basename(directory) == match["digest"][:2]:
+        directory = os.path.dirname(directory)
+
+    # Sous-dossier par préfixe : des dossiers de taille raisonnable
+    return f"{directory}/{digest[:2]}/{digest}{extension}".lstrip("/")
+
+
+def is_addressed_original(name):
+    """
+    Original adressé par contenu (« 3fa8…c2.jpg ») : son contenu ne change jamais
+
+    Les fichiers dérivés (« 3fa8…c2_400w.jpg », « 3fa8…c2.jpg.webp ») sont
+    réécrits sur place à chaque régénération des images
+    """
+    match = ADDRESSED_NAME.fullmatch(os.path.basename(name))
+    return bool(match) and not match["suffix"]
+
+
+def original_name(name):
+    """Nom de l'original d'un fichier dérivé (le nom lui-même sinon)"""
+    directory, file_name = os.path.split(name)
+    match = ADDRESSED_NAME.match(file_name)
+    if not match:
+        return name
+
+    return f"{directory}/{match['digest']}{match['extension']}".lstrip("/")
+
+
+def reference_count(name):
+    """Nombre de champs image qui pointent vers ce fichier (ou son original)"""
+    name = original_name(name)
+    return sum(
+        apps.get_model(label).objects.filter(**{field_name: name}).count()
+        for label, field_name in images.IMAGE_FIELDS
+    )
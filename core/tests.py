@@ -1,3 +1,1614 @@
-from django.test import TestCase
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django import forms
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.template.loader import render_to_string
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+from PIL import Image, PngImagePlugin
+
+from accounts import relationships
+from accounts.models import User, UserFollows, UserBlock
+from blog.models import Ticket, Review
+from . import feed, images, seeding, uploads
+from .storage import ADDRESSED_NAME, image_storage
+from .models import FeedEntry
+
+
+# Nombre maximal de requêtes SQL par page (nom d'URL), cache vide.
+# Une page absente de ce dictionnaire fait échouer les tests.
+QUERY_BUDGETS = {
+    # core
+    "home": 2,
+    "feed": 8,
+    # 3 requêtes par bloc de FEED_STREAM_CHUNK_SIZE posts, jusqu'à FEED_STREAM_LIMIT
+    "feed_stream": 35,
+    "feed_more": 8,
+    "feed_async": 9,
+    # accounts
+    "login": 2,
+    "signup": 2,
+    "logout": 4,
+    "profile": 2,
+    "edit_profile": 2,
+    "change_password": 2,
+    "subscriptions": 6,
+    "subscriptions_async": 7,
+    # Reconstruction du flux dans une transaction : SAVEPOINT et RELEASE par flux
+    "follow_user": 16,
+    "unfollow_user": 15,
+    "block_user": 20,
+    "unblock_user": 20,
+    "blocked_users": 3,
+    # blog
+    "ticket_create": 2,
+    "ticket_review_create": 2,
+    "edit_ticket": 4,
+    "edit_review": 4,
+    "review_create": 7,
+    "delete_ticket": 16,
+    "delete_review": 11,
+    "user_posts": 8,
+    "user_posts_async": 6,
+}
+
+# Tailles du jeu de données (utilisateurs générés) : le nombre de requêtes
+# d'une page ne doit pas dépendre de la taille
+DATASET_SIZES = (8, 32)
+
+# Modules d'URL couverts par les budgets
+URL_MODULES = ("core.urls", "accounts.urls", "blog.urls")
+
+# Pages lues par blocs jusqu'à une limite fixe (FEED_STREAM_LIMIT) :
+# leur nombre de requêtes augmente avec les données, dans la limite du budget
+CHUNKED_PAGES = {"feed_stream"}
+
+
+def jpeg_bytes(size, color="red"):
+    """Contenu d'une image JPEG unie"""
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def query_shape(sql):
+    """Forme d'une requête : valeurs littérales et listes IN remplacées par ?"""
+    sql = re.sub(r"'[^']*'|\b\d+\b", "?", sql)
+    return re.sub(r"\(\?(, \?)*\)", "(?)", sql)
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Nombre de requêtes SQL de chaque page sur un jeu de données généré
+
+    Échoue si une page dépasse son budget, ou si son nombre de requêtes
+    augmente avec la taille des données (requêtes N+1)
+    """
+
+    def test_every_url_has_a_budget(self):
+        names = set()
+        for module in URL_MODULES:
+            names |= {pattern.name for pattern in get_resolver(module).url_patterns}
+
+        self.assertEqual(names - set(QUERY_BUDGETS), set())
+
+    def test_query_budgets(self):
+        for size in DATASET_SIZES:
+            for name, queries in self.measure_dataset(size).items():
+                with self.subTest(page=name, size=size):
+                    self.assertLessEqual(
+                        len(queries), QUERY_BUDGETS[name], "\n".join(queries)
+                    )
+
+    def test_query_count_does_not_grow_with_data(self):
+        small, large = (self.measure_dataset(size) for size in DATASET_SIZES)
+
+        for name in QUERY_BUDGETS.keys() - CHUNKED_PAGES:
+            with self.subTest(page=name):
+                grown = Counter(map(query_shape, large[name]))
+                grown.subtract(Counter(map(query_shape, small[name])))
+                self.assertEqual(
+                    len(large[name]),
+                    len(small[name]),
+                    "\n".join(shape for shape, count in grown.items() if count),
+                )
+
+    def measure_dataset(self, size):
+        """Requêtes de chaque page, jeu de données annulé en fin de mesure"""
+        with transaction.atomic():
+            data = self.build_dataset(size)
+            queries = {
+                name: self.measure(data["viewer"], name, kwargs)
+                for name, kwargs in self.url_kwargs(data).items()
+            }
+            transaction.set_rollback(True)
+
+        cache.clear()
+        return queries
+
+    def measure(self, viewer, name, kwargs):
+        """Requêtes d'un appel de la page (effets de l'appel annulés)"""
+        with transaction.atomic():
+            self.client.force_login(viewer)
+            cache.clear()
+            # Compteurs du cache enregistrés hors mesure (écriture périodique)
+            feed.flush_cache_stats()
+
+            with CaptureQueriesContext(connection) as captured:
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = self.client.get(reverse(name, kwargs=kwargs))
+                    if response.streaming:
+                        b"".join(response.streaming_content)
+
+            transaction.set_rollback(True)
+
+        self.assertLess(response.status_code, 400, name)
+        return [query["sql"] for query in captured]
+
+    def url_kwargs(self, data):
+        kwargs = {name: {} for name in QUERY_BUDGETS}
+        kwargs.update(
+            {
+                "follow_user": {"user_id": data["stranger"].id},
+                "unfollow_user": {"user_id": data["friend"].id},
+                "block_user": {"user_id": data["stranger"].id},
+                "unblock_user": {"user_id": data["blocked"].id},
+                "edit_ticket": {"ticket_id": data["own_ticket"].id},
+                "delete_ticket": {"ticket_id": data["own_ticket"].id},
+                "review_create": {"ticket_id": data["open_ticket"].id},
+                "edit_review": {"review_id": data["own_review"].id},
+                "delete_review": {"review_id": data["own_review"].id},
+            }
+        )
+        return kwargs
+
+    def build_dataset(self, size):
+        """
+        Graphe généré, plus un lecteur dont les abonnements, abonnés,
+        blocages et publications augmentent avec la taille des données
+        """
+        seeded = seeding.seed_social_graph(
+            size,
+            follows_per_user=4,
+            tickets_per_user=2,
+            reviews_per_user=2,
+            prefix="budget",
+            seed=size,
+        )
+
+        viewer = User.objects.create_user("viewer", password="lecteur")
+        friend = User.objects.create_user("friend", password="ami")
+        stranger = User.objects.create_user("stranger", password="inconnu")
+
+        # Abonnements et abonnés sur les indices pairs, blocages sur les autres
+        UserFollows.objects.create(user=viewer, followed_user=friend)
+        UserFollows.objects.bulk_create(
+            [UserFollows(user=viewer, followed_user=user) for user in seeded[::2]]
+            + [UserFollows(user=user, followed_user=viewer) for user in seeded[::4]]
+        )
+        UserBlock.objects.bulk_create(
+            [UserBlock(blocker=viewer, blocked_user=user) for user in seeded[1::2]]
+        )
+
+        # Publications du lecteur et critiques reçues
+        for user in seeded[::2]:
+            ticket = Ticket.objects.create(user=viewer, title=f"Livre de {user}")
+            Review.objects.create(ticket=ticket, user=user, rating=4, headline="Reçue")
+            Review.objects.create(
+                ticket=Ticket.objects.filter(user=user).first()
+                or Ticket.objects.create(user=user, title="Livre"),
+                user=viewer,
+                rating=3,
+                headline="Publiée",
+            )
+
+        # Objets ciblés par les pages de modification et de suppression
+        own_ticket = Ticket.objects.create(user=viewer, title="Mon livre")
+        Review.objects.create(ticket=own_ticket, user=friend, rating=5, headline="Ami")
+        friend_ticket = Ticket.objects.create(user=friend, title="Livre d'un ami")
+        own_review = Review.objects.create(
+            ticket=friend_ticket, user=viewer, rating=2, headline="Ma critique"
+        )
+        open_ticket = Ticket.objects.create(user=friend, title="Sans critique")
+
+        feed.rebuild_feed(viewer)
+
+        return {
+            "viewer": viewer,
+            "friend": friend,
+            "stranger": stranger,
+            "blocked": seeded[1],
+            "own_ticket": own_ticket,
+            "own_review": own_review,
+            "open_ticket": open_ticket,
+        }
+
+
+class FanOutTests(TestCase):
+    """Contenu du flux matérialisé après chaque écriture qui le modifie"""
+
+    def setUp(self):
+        self.me = User.objects.create_user("moi")
+        self.author = User.objects.create_user("auteur")
+        self.stranger = User.objects.create_user("inconnu")
+
+        self.ticket = Ticket.objects.create(user=self.author, title="Livre")
+        self.review = Review.objects.create(
+            ticket=self.ticket, user=self.author, rating=4, headline="Bien"
+        )
+
+    def feed_of(self, user):
+        """Posts (type, id) du flux matérialisé d'un utilisateur"""
+        return set(
+            FeedEntry.objects.filter(owner=user).values_list("post_type", "post_id")
+        )
+
+    def author_posts(self):
+        return {(feed.TICKET, self.ticket.id), (feed.REVIEW, self.review.id)}
+
+    def follow(self, user, followed_user):
+        # Les reconstructions sont exécutées après la validation de la transaction
+        with self.captureOnCommitCallbacks(execute=True):
+            return UserFollows.objects.create(user=user, followed_user=followed_user)
+
+    def test_follow_adds_existing_posts(self):
+        self.assertEqual(self.feed_of(self.me), set())
+
+        self.follow(self.me, self.author)
+
+        self.assertEqual(self.feed_of(self.me), self.author_posts())
+
+    def test_new_post_reaches_followers(self):
+        self.follow(self.me, self.author)
+
+        ticket = Ticket.objects.create(user=self.author, title="Nouveau")
+
+        self.assertIn((feed.TICKET, ticket.id), self.feed_of(self.me))
+        self.assertNotIn((feed.TICKET, ticket.id), self.feed_of(self.stranger))
+
+    def test_unfollow_removes_posts(self):
+        follow = self.follow(self.me, self.author)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            follow.delete()
+
+        self.assertEqual(self.feed_of(self.me), set())
+
+    def test_blocking_removes_posts_both_ways(self):
+        self.follow(self.me, self.author)
+        self.follow(self.author, self.me)
+        own_ticket = Ticket.objects.create(user=self.me, title="Mon livre")
+        self.assertIn((feed.TICKET, own_ticket.id), self.feed_of(self.author))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            UserBlock.objects.create(blocker=self.me, blocked_user=self.author)
+
+        self.assertEqual(self.feed_of(self.me), {(feed.TICKET, own_ticket.id)})
+        self.assertEqual(self.feed_of(self.author), self.author_posts())
+
+    def test_blocked_user_posts_stay_out(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            UserBlock.objects.create(blocker=self.author, blocked_user=self.me)
+
+        # Un abonnement créé malgré le blocage (admin) n'affiche rien
+        self.follow(self.me, self.author)
+        ticket = Ticket.objects.create(user=self.author, title="Nouveau")
+
+        self.assertEqual(self.feed_of(self.me), set())
+        self.assertNotIn((feed.TICKET, ticket.id), self.feed_of(self.me))
+
+    def test_unblock_restores_posts(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            block = UserBlock.objects.create(blocker=self.me, blocked_user=self.author)
+        self.follow(self.me, self.author)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            block.delete()
+
+        self.assertEqual(self.feed_of(self.me), self.author_posts())
+
+    def test_review_on_my_ticket_by_stranger(self):
+        own_ticket = Ticket.objects.create(user=self.me, title="Mon livre")
+
+        review = Review.objects.create(
+            ticket=own_ticket, user=self.stranger, rating=3, headline="Avis"
+        )
+
+        self.assertIn((feed.REVIEW, review.id), self.feed_of(self.me))
+        self.assertIn((feed.REVIEW, review.id), self.feed_of(self.stranger))
+        self.assertNotIn((feed.REVIEW, review.id), self.feed_of(self.author))
+
+    def test_deleted_ticket_removes_its_reviews(self):
+        self.follow(self.me, self.author)
+        Review.objects.create(
+            ticket=self.ticket, user=self.stranger, rating=1, headline="Bof"
+        )
+
+        self.ticket.delete()
+
+        self.assertEqual(self.feed_of(self.me), set())
+        self.assertEqual(self.feed_of(self.author), set())
+        self.assertEqual(self.feed_of(self.stranger), set())
+
+
+
+def post_references(posts):
+    """Références (type, id) de posts chargés"""
+    return [
+        (feed.TICKET if isinstance(post, Ticket) else feed.REVIEW, post.id)
+        for post in posts
+    ]
+
+
+class FeedCursorTests(TestCase):
+    """Pagination du flux par curseur (date, type, identifiant)"""
+
+    def setUp(self):
+        self.me = User.objects.create_user("moi")
+        author = User.objects.create_user("auteur")
+        with self.captureOnCommitCallbacks(execute=True):
+            UserFollows.objects.create(user=self.me, followed_user=author)
+
+        for number in range(5):
+            ticket = Ticket.objects.create(user=author, title=f"Livre {number}")
+            if number % 2:
+                Review.objects.create(
+                    ticket=ticket, user=author, rating=3, headline=f"Avis {number}"
+                )
+
+        # Toutes les entrées à la même date, sauf deux plus anciennes
+        moment = timezone.now()
+        entries = FeedEntry.objects.filter(owner=self.me)
+        entries.update(time_created=moment)
+        older = list(entries.order_by("post_id", "post_type").values_list("id")[:2])
+        FeedEntry.objects.filter(id__in=[row[0] for row in older]).update(
+            time_created=moment - timezone.timedelta(seconds=1)
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def page_through(self, page_size):
+        """Références de toutes les pages, dans l'ordre"""
+        references = []
+        cursor = None
+        # Au plus une page par entrée : un curseur qui n'avance pas fait échouer
+        for _ in range(FeedEntry.objects.count() + 1):
+            posts, next_cursor = feed.get_feed_page(self.me, cursor, page_size)
+            references += post_references(posts)
+            if next_cursor is None:
+                return references
+            cursor = feed.decode_cursor(next_cursor)
+        self.fail("Pagination sans fin : le curseur n'avance pas")
+
+    def test_equal_timestamps_paged_without_duplicates_or_gaps(self):
+        expected = list(
+            FeedEntry.objects.filter(owner=self.me).values_list("post_type", "post_id")
+        )
+        self.assertEqual(len(expected), 7)
+
+        # À date égale : tickets avant critiques, identifiants décroissants
+        same_time = expected[:5]
+        self.assertEqual(same_time, sorted(same_time, reverse=True))
+
+        for page_size in (1, 2, 3, 7, 10):
+            with self.subTest(page_size=page_size):
+                self.assertEqual(self.page_through(page_size), expected)
+
+    def test_malformed_cursor_falls_back_to_first_page(self):
+        self.client.force_login(self.me)
+        expected = post_references(self.client.get(reverse("feed")).context["posts"])
+
+        for raw in (
+            "abc",
+            "1-AUTRE-2",
+            "x-TICKET-1",
+            "1-TICKET",
+            "1-TICKET-2-3",
+            f"{10 ** 30}-TICKET-1",
+        ):
+            with self.subTest(cursor=raw):
+                self.assertIsNone(feed.decode_cursor(raw))
+
+                response = self.client.get(reverse("feed"), {"cursor": raw})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(post_references(response.context["posts"]), expected)
+
+
+class FeedCacheInvalidationTests(TestCase):
+    """Pages du flux en cache : nouvelle version après chaque écriture visible"""
+
+    def setUp(self):
+        self.me = User.objects.create_user("moi")
+        self.author = User.objects.create_user("auteur")
+        with self.captureOnCommitCallbacks(execute=True):
+            UserFollows.objects.create(user=self.me, followed_user=self.author)
+        self.ticket = Ticket.objects.create(user=self.author, title="Livre")
+
+        # Première lecture : la page est mise en cache
+        self.read_page()
+
+    def tearDown(self):
+        cache.clear()
+
+    def read_page(self):
+        posts, _ = feed.get_feed_page(self.me)
+        return posts
+
+    def read_counted(self):
+        """Lit la page : (posts, (succès, échecs) du cache pendant la lecture)"""
+        feed.flush_cache_stats()
+        feed.reset_cache_stats()
+        posts = self.read_page()
+        feed.flush_cache_stats()
+
+        stats = feed.get_cache_stats()
+        return posts, (stats["hits"], stats["misses"])
+
+    def assertPageRefreshed(self, change):
+        """La page suivante n'est pas lue dans le cache et reflète change()"""
+        version = feed.get_feed_version(self.me.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        posts, accesses = self.read_counted()
+
+        self.assertNotEqual(feed.get_feed_version(self.me.id), version)
+        self.assertEqual(accesses, (0, 1))
+        return post_references(posts)
+
+    def test_unchanged_feed_read_from_cache(self):
+        _, accesses = self.read_counted()
+
+        self.assertEqual(accesses, (1, 0))
+
+    def test_post_created(self):
+        created = {}
+
+        def create():
+            created["ticket"] = Ticket.objects.create(user=self.author, title="Neuf")
+
+        posts = self.assertPageRefreshed(create)
+        self.assertIn((feed.TICKET, created["ticket"].id), posts)
+
+    def test_post_edited(self):
+        def edit():
+            self.ticket.title = "Titre modifié"
+            self.ticket.save()
+
+        self.assertPageRefreshed(edit)
+        self.assertEqual(self.read_page()[0].title, "Titre modifié")
+
+    def test_post_deleted(self):
+        posts = self.assertPageRefreshed(self.ticket.delete)
+        self.assertEqual(posts, [])
+
+    def test_unfollow(self):
+        posts = self.assertPageRefreshed(UserFollows.objects.all().delete)
+        self.assertEqual(posts, [])
+
+    def test_block(self):
+        def block():
+            UserBlock.objects.create(blocker=self.author, blocked_user=self.me)
+
+        posts = self.assertPageRefreshed(block)
+        self.assertEqual(posts, [])
+
+
+class BlockEnforcementTests(TestCase):
+    """
+    Les contrôles avant écriture lisent la base, pas le cache des relations :
+    un blocage enregistré par un autre processus (cache local en retard)
+    s'applique immédiatement
+    """
+
+    def setUp(self):
+        self.me = User.objects.create_user("moi")
+        self.other = User.objects.create_user("autre")
+        self.client.force_login(self.me)
+
+        # Relations en cache, puis blocage sans signal (autre processus)
+        relationships.get_relationships(self.me)
+        relationships.get_relationships(self.other)
+        UserBlock.objects.bulk_create(
+            [UserBlock(blocker=self.other, blocked_user=self.me)]
+        )
+        self.assertNotIn(self.other.id, relationships.get_blocked_ids(self.me))
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_follow_refused(self):
+        self.client.get(reverse("follow_user", kwargs={"user_id": self.other.id}))
+
+        self.assertFalse(UserFollows.objects.filter(user=self.me).exists())
+
+    def test_follow_by_name_refused(self):
+        self.client.post(reverse("subscriptions"), {"username": "autre"})
+
+        self.assertFalse(UserFollows.objects.filter(user=self.me).exists())
+
+    def test_review_refused(self):
+        ticket = Ticket.objects.create(user=self.other, title="Livre")
+
+        self.client.post(
+            reverse("review_create", kwargs={"ticket_id": ticket.id}),
+            {"headline": "Avis", "rating": 3, "body": ""},
+        )
+
+        self.assertFalse(Review.objects.filter(ticket=ticket).exists())
+
+    def test_fan_out_skips_blocked_feed(self):
+        UserFollows.objects.bulk_create(
+            [UserFollows(user=self.me, followed_user=self.other)]
+        )
+        ticket = Ticket.objects.create(user=self.other, title="Livre")
+
+        self.assertFalse(
+            FeedEntry.objects.filter(owner=self.me, post_id=ticket.id).exists()
+        )
+
+
+class FeedETagTests(TestCase):
+    """L'ETag du flux change quand un auteur affiché ou une image change"""
+
+    def setUp(self):
+        self.me = User.objects.create_user("moi")
+        self.author = User.objects.create_user("auteur")
+        with self.captureOnCommitCallbacks(execute=True):
+            UserFollows.objects.create(user=self.me, followed_user=self.author)
+
+        self.ticket = Ticket.objects.create(user=self.author, title="Livre")
+        Review.objects.create(
+            ticket=self.ticket, user=self.author, rating=4, headline="Bien"
+        )
+        self.client.force_login(self.me)
+
+    def tearDown(self):
+        cache.clear()
+
+    def page_etag(self, name):
+        # Premier appel : pose le cookie CSRF, qui fait partie de l'ETag
+        self.client.get(reverse(name))
+        return self.client.get(reverse(name))["ETag"]
+
+    def assertPageChanged(self, name, change):
+        etag = self.page_etag(name)
+        self.assertEqual(
+            self.client.get(reverse(name), HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+
+        change()
+
+        response = self.client.get(reverse(name), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_author_renamed(self):
+        def rename():
+            self.author.username = "nouveau-nom"
+            self.author.save()
+
+        self.assertPageChanged("feed", rename)
+
+    def test_author_photo_changed(self):
+        def change_photo():
+            self.author.profile_photo = "profile_pics/autre.jpg"
+            self.author.save()
+
+        self.assertPageChanged("feed", change_photo)
+
+    def test_author_login_keeps_etag(self):
+        etag = self.page_etag("feed")
+
+        self.author.last_login = timezone.now()
+        self.author.save(update_fields=["last_login"])
+
+        response = self.client.get(reverse("feed"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_ticket_image_processed(self):
+        Ticket.objects.filter(pk=self.ticket.pk).update(
+            image="tickets/livre.jpg", image_status=images.PENDING
+        )
+
+        def process():
+            with mock.patch.object(images, "resize_field_file"), mock.patch.object(
+                images, "create_variants", return_value=(400, 600)
+            ):
+                images.process_image(
+                    "blog.Ticket",
+                    self.ticket.pk,
+                    "image",
+                    "tickets/livre.jpg",
+                    (800, 800),
+                )
+
+        self.assertPageChanged("feed", process)
+
+    def test_reviewer_renamed_on_user_posts(self):
+        own_ticket = Ticket.objects.create(user=self.me, title="Mon livre")
+        Review.objects.create(
+            ticket=own_ticket, user=self.author, rating=2, headline="Bof"
+        )
+
+        def rename():
+            self.author.username = "nouveau-nom"
+            self.author.save()
+
+        self.assertPageChanged("user_posts", rename)
+
+
+class CounterTests(TestCase):
+    """Compteurs dénormalisés tenus à jour par les signaux (core/signals.py)"""
+
+    def setUp(self):
+        self.author = User.objects.create_user("auteur")
+        self.reader = User.objects.create_user("lecteur")
+
+    def assertCounters(self, obj, **expected):
+        obj.refresh_from_db()
+        self.assertEqual(
+            {field: getattr(obj, field) for field in expected}, expected
+        )
+
+    def test_ticket_and_review_created_and_deleted(self):
+        ticket = Ticket.objects.create(user=self.author, title="Livre")
+        review = Review.objects.create(
+            ticket=ticket, user=self.reader, rating=3, headline="Avis"
+        )
+
+        self.assertCounters(self.author, ticket_count=1, review_count=0)
+        self.assertCounters(self.reader, ticket_count=0, review_count=1)
+        self.assertCounters(ticket, review_count=1)
+
+        review.delete()
+
+        self.assertCounters(self.reader, review_count=0)
+        self.assertCounters(ticket, review_count=0)
+
+    def test_ticket_deleted_with_its_reviews(self):
+        ticket = Ticket.objects.create(user=self.author, title="Livre")
+        Review.objects.create(ticket=ticket, user=self.reader, rating=3, headline="A")
+        Review.objects.create(ticket=ticket, user=self.author, rating=5, headline="B")
+
+        ticket.delete()
+
+        self.assertCounters(self.author, ticket_count=0, review_count=0)
+        self.assertCounters(self.reader, review_count=0)
+
+    def test_user_deleted_with_follows_and_reviews(self):
+        ticket = Ticket.objects.create(user=self.author, title="Livre")
+        Review.objects.create(ticket=ticket, user=self.reader, rating=3, headline="A")
+        UserFollows.objects.create(user=self.reader, followed_user=self.author)
+
+        self.reader.delete()
+
+        self.assertCounters(self.author, followers_count=0, ticket_count=1)
+        self.assertCounters(ticket, review_count=0, rating_sum=0, rating_3_count=0)
+
+    def test_follow_counters(self):
+        follow = UserFollows.objects.create(user=self.reader, followed_user=self.author)
+
+        self.assertCounters(self.reader, following_count=1, followers_count=0)
+        self.assertCounters(self.author, following_count=0, followers_count=1)
+
+        follow.delete()
+
+        self.assertCounters(self.reader, following_count=0)
+        self.assertCounters(self.author, followers_count=0)
+
+    def test_follows_removed_by_block(self):
+        UserFollows.objects.create(user=self.reader, followed_user=self.author)
+        UserFollows.objects.create(user=self.author, followed_user=self.reader)
+
+        UserBlock.objects.create(blocker=self.author, blocked_user=self.reader)
+
+        self.assertCounters(self.author, followers_count=0, following_count=0)
+        self.assertCounters(self.reader, followers_count=0, following_count=0)
+
+    def test_full_save_keeps_concurrent_counter_updates(self):
+        # Instance lue avant l'abonnement (edit_profile, admin, connexion...)
+        stale = User.objects.get(pk=self.author.pk)
+        UserFollows.objects.create(user=self.reader, followed_user=self.author)
+        Ticket.objects.create(user=self.author, title="Livre")
+
+        stale.first_name = "Nouveau"
+        stale.save()
+
+        self.assertCounters(self.author, first_name="Nouveau")
+        self.assertCounters(self.author, followers_count=1, ticket_count=1)
+
+    def test_deferred_save_keeps_counters(self):
+        user = User.objects.only("id", "username").get(pk=self.author.pk)
+        UserFollows.objects.create(user=self.reader, followed_user=self.author)
+
+        user.username = "renomme"
+        user.save()
+
+        self.assertCounters(self.author, username="renomme", followers_count=1)
+
+    def test_repair_counters_after_drift(self):
+        ticket = Ticket.objects.create(user=self.author, title="Livre")
+        Review.objects.create(ticket=ticket, user=self.reader, rating=4, headline="A")
+
+        # Dérive : modifications directes en base, sans signaux
+        User.objects.filter(pk=self.author.pk).update(ticket_count=7)
+        Ticket.objects.filter(pk=ticket.pk).update(rating_sum=0, rating_4_count=0)
+
+        output = StringIO()
+        call_command("repair_counters", "--dry-run", stdout=output)
+
+        self.assertIn("accounts.User.ticket_count : 1 ligne(s)", output.getvalue())
+        self.assertIn("blog.Ticket.rating_sum : 1 ligne(s)", output.getvalue())
+        self.assertIn("3 compteur(s) à corriger.", output.getvalue())
+        self.assertCounters(self.author, ticket_count=7)
+
+        call_command("repair_counters", stdout=StringIO())
+
+        self.assertCounters(self.author, ticket_count=1)
+        self.assertCounters(ticket, rating_sum=4, rating_4_count=1)
+
+
+class RatingAggregateTests(TestCase):
+    """Somme et répartition des notes de chaque ticket (core/counters.py)"""
+
+    def setUp(self):
+        self.author = User.objects.create_user("auteur")
+        self.reader = User.objects.create_user("lecteur")
+        self.ticket = Ticket.objects.create(user=self.author, title="Livre")
+        self.review = Review.objects.create(
+            ticket=self.ticket, user=self.reader, rating=4, headline="Bien"
+        )
+
+    def assertRatings(self, rating_sum, counts):
+        self.ticket.refresh_from_db()
+        self.assertEqual(self.ticket.rating_sum, rating_sum)
+        self.assertEqual(self.ticket.rating_counts, counts)
+
+    def test_created_and_deleted(self):
+        Review.objects.create(
+            ticket=self.ticket, user=self.author, rating=1, headline="Bof"
+        )
+        self.assertRatings(5, [0, 1, 0, 0, 1, 0])
+        self.assertEqual(self.ticket.rating_average, 2.5)
+
+        self.review.delete()
+
+        self.assertRatings(1, [0, 1, 0, 0, 0, 0])
+
+    def test_ticket_edit_keeps_concurrent_reviews(self):
+        # Ticket lu par edit_ticket avant l'arrivée d'une autre critique
+        stale = Ticket.objects.get(pk=self.ticket.pk)
+        Review.objects.create(
+            ticket=self.ticket, user=self.author, rating=1, headline="Bof"
+        )
+
+        stale.title = "Titre modifié"
+        stale.save()
+
+        self.assertRatings(5, [0, 1, 0, 0, 1, 0])
+        self.assertEqual(self.ticket.title, "Titre modifié")
+        self.assertEqual(self.ticket.review_count, 2)
+
+    def test_rating_edited_through_edit_review(self):
+        self.client.force_login(self.reader)
+
+        response = self.client.post(
+            reverse("edit_review", kwargs={"review_id": self.review.id}),
+            {"edit_review": "1", "headline": "Finalement", "rating": 1, "body": ""},
+        )
+
+        self.assertRedirects(response, reverse("user_posts"))
+        self.assertRatings(1, [0, 1, 0, 0, 0, 0])
+
+    def test_saved_rating_follows_each_save(self):
+        # Régression : la note mémorisée (post_init) est mise à jour après
+        # chaque enregistrement, sinon le second changement est mal compté
+        review = Review.objects.get(pk=self.review.pk)
+        self.assertEqual(review.saved_rating, 4)
+
+        review.rating = 2
+        review.save()
+        review.save()
+        self.assertRatings(2, [0, 0, 1, 0, 0, 0])
+
+        review.rating = 5
+        review.save()
+        self.assertRatings(5, [0, 0, 0, 0, 0, 1])
+
+    def test_deferred_rating_is_not_counted(self):
+        # Note non chargée (only) : aucune requête, aucun ajustement
+        review = Review.objects.only("id", "ticket_id", "headline").get(
+            pk=self.review.pk
+        )
+        self.assertIsNone(review.saved_rating)
+
+        review.headline = "Titre modifié"
+        review.save()
+
+        self.assertRatings(4, [0, 0, 0, 0, 1, 0])
+
+    def test_unchanged_rating_is_not_counted(self):
+        review = Review.objects.get(pk=self.review.pk)
+        review.headline = "Titre modifié"
+        review.save()
+
+        self.assertRatings(4, [0, 0, 0, 0, 1, 0])
+
+
+class MediaTestCase(TestCase):
+    """Tests écrivant des fichiers : MEDIA_ROOT temporaire"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user("auteur")
+
+    def media_path(self, name):
+        return os.path.join(self.media_root, name)
+
+
+class StorageTests(MediaTestCase):
+    """Stockage adressé par contenu (core/storage.py)"""
+
+    def upload_ticket(self, file_name, content):
+        return Ticket.objects.create(
+            user=self.user,
+            title=file_name,
+            image=SimpleUploadedFile(file_name, content),
+        )
+
+    def test_identical_uploads_share_a_file(self):
+        content = jpeg_bytes((200, 100))
+        first = self.upload_ticket("couverture.jpg", content)
+        second = self.upload_ticket("COPIE.JPG", content)
+        other = self.upload_ticket("autre.jpg", jpeg_bytes((200, 100), "blue"))
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, other.image.name)
+        self.assertTrue(ADDRESSED_NAME.match(os.path.basename(first.image.name)))
+
+        directory = os.path.dirname(self.media_path(first.image.name))
+        self.assertEqual(os.listdir(directory), [os.path.basename(first.image.name)])
+
+    def test_referenced_file_is_not_deleted(self):
+        content = jpeg_bytes((200, 100))
+        first = self.upload_ticket("couverture.jpg", content)
+        second = self.upload_ticket("copie.jpg", content)
+        name = first.image.name
+
+        first.delete()
+        image_storage().delete(name)
+        self.assertTrue(os.path.exists(self.media_path(name)))
+
+        second.delete()
+        image_storage().delete(name)
+        self.assertFalse(os.path.exists(self.media_path(name)))
+
+    def test_derived_file_kept_while_original_is_referenced(self):
+        ticket = self.upload_ticket("couverture.jpg", jpeg_bytes((200, 100)))
+        variant = images.variant_name(ticket.image.name, 400) + ".webp"
+        image_storage().overwrite(variant, ContentFile(b"variante"))
+
+        image_storage().delete(variant)
+        self.assertTrue(os.path.exists(self.media_path(variant)))
+
+    def test_upload_reencoded_at_explicit_jpeg_quality(self):
+        ticket = self.upload_ticket("couverture.jpg", jpeg_bytes((200, 100)))
+
+        # Tables de quantification : déterminées par la qualité d'enregistrement
+        expected = BytesIO()
+        Image.new("RGB", (8, 8)).save(
+            expected, format="JPEG", quality=images.IMAGE_JPEG_QUALITY
+        )
+        with Image.open(self.media_path(ticket.image.name)) as stored, Image.open(
+            expected
+        ) as reference:
+            self.assertEqual(stored.quantization, reference.quantization)
+
+    def test_overwrite_replaces_file_atomically(self):
+        name = images.variant_name("tickets/ab/livre.jpg", 400)
+        image_storage().overwrite(name, ContentFile(b"ancien"))
+
+        # Une lecture commencée avant la réécriture garde l'ancien fichier entier
+        with open(self.media_path(name), "rb") as reader:
+            image_storage().overwrite(name, ContentFile(b"nouveau contenu"))
+            self.assertEqual(reader.read(), b"ancien")
+
+        with open(self.media_path(name), "rb") as written:
+            self.assertEqual(written.read(), b"nouveau contenu")
+        directory = os.path.dirname(self.media_path(name))
+        self.assertEqual(os.listdir(directory), ["livre_400w.jpg"])
+
+        # Droits d'un fichier ordinaire (umask), pas ceux d'un fichier temporaire
+        reference = self.media_path("reference")
+        open(reference, "wb").close()
+        self.assertEqual(
+            os.stat(self.media_path(name)).st_mode, os.stat(reference).st_mode
+        )
+
+    def test_resized_original_saved_under_new_digest(self):
+        # Original trop grand partagé par deux tickets
+        name = image_storage().save(
+            "tickets/grand.jpg", ContentFile(jpeg_bytes((1200, 600)))
+        )
+        with open(self.media_path(name), "rb") as original:
+            content = original.read()
+        ticket = Ticket.objects.create(user=self.user, title="A", image=name)
+        shared = Ticket.objects.create(user=self.user, title="B", image=name)
+
+        status = images.process_image(
+            "blog.Ticket", ticket.pk, "image", name, Ticket.IMAGE_MAX_SIZE
+        )
+
+        self.assertEqual(status, images.READY)
+        ticket.refresh_from_db()
+        self.assertNotEqual(ticket.image.name, name)
+        self.assertEqual(os.path.dirname(os.path.dirname(ticket.image.name)), "tickets")
+        self.assertTrue(ADDRESSED_NAME.match(os.path.basename(ticket.image.name)))
+        self.assertEqual((ticket.image_width, ticket.image_height), (800, 400))
+        self.assertTrue(os.path.exists(self.media_path(ticket.image.name + ".webp")))
+
+        # L'original n'est pas modifié : son nom correspond toujours à son contenu
+        with open(self.media_path(name), "rb") as original:
+            self.assertEqual(original.read(), content)
+        shared.refresh_from_db()
+        self.assertEqual(shared.image.name, name)
+
+    def test_small_original_keeps_its_name(self):
+        name = image_storage().save(
+            "tickets/petit.jpg", ContentFile(jpeg_bytes((300, 200)))
+        )
+        ticket = Ticket.objects.create(user=self.user, title="A", image=name)
+
+        images.process_image(
+            "blog.Ticket", ticket.pk, "image", name, Ticket.IMAGE_MAX_SIZE
+        )
+
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.image.name, name)
+        self.assertEqual(ticket.image_status, images.READY)
+
+
+@mock.patch.object(uploads, "IMAGE_UPLOAD_MAX_BYTES", 100)
+class UploadLimitTests(MediaTestCase):
+    """Fichiers trop volumineux arrêtés à la réception (core/uploads.py)"""
+
+    def test_oversized_upload_rejected_by_site_form(self):
+        self.client.force_login(self.user)
+
+        upload = SimpleUploadedFile("a.jpg", jpeg_bytes((64, 64)))
+        response = self.client.post(
+            reverse("ticket_create"), {"title": "Livre", "image": upload}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Ticket.objects.exists())
+        self.assertContains(response, "Fichier trop volumineux")
+
+    def test_oversized_upload_rejected_by_admin_forms(self):
+        admin = User.objects.create_superuser("admin")
+        self.client.force_login(admin)
+
+        for url_name, field_name in (
+            ("admin:blog_ticket_add", "image"),
+            ("admin:blog_photo_add", "image"),
+            ("admin:accounts_user_add", "profile_photo"),
+        ):
+            with self.subTest(url_name):
+                response = self.client.post(
+                    reverse(url_name),
+                    {field_name: SimpleUploadedFile("a.jpg", jpeg_bytes((64, 64)))},
+                )
+
+                self.assertEqual(response.status_code, 200)
+                errors = response.context["adminform"].form.errors[field_name]
+                self.assertIn("Fichier trop volumineux", errors[0])
+
+    def test_oversized_upload_rejected_by_plain_image_field(self):
+        upload = uploads.OversizedUpload("a.jpg", "image/jpeg", 10_000)
+
+        with self.assertRaises(ValidationError):
+            forms.ImageField().clean(upload)
+
+
+def image_bytes(image, image_format, **options):
+    buffer = BytesIO()
+    image.save(buffer, format=image_format, **options)
+    return buffer.getvalue()
+
+
+class UploadImageTests(MediaTestCase):
+    """Images envoyées : nombre de pixels, orientation et métadonnées"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def post_ticket(self, name, content):
+        return self.client.post(
+            reverse("ticket_create"),
+            {"title": "Livre", "image": SimpleUploadedFile(name, content)},
+        )
+
+    def stored_image(self):
+        ticket = Ticket.objects.get()
+        with ticket.image.open("rb") as source:
+            image = Image.open(source)
+            image.load()
+        return image
+
+    def test_oversized_png_rejected(self):
+        # 25,2 mégapixels, quelques kilo-octets une fois compressés
+        content = image_bytes(Image.new("1", (6000, 4200)), "PNG")
+        self.assertLess(len(content), uploads.IMAGE_UPLOAD_MAX_BYTES)
+
+        response = self.post_ticket("a.png", content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Ticket.objects.exists())
+        self.assertContains(response, "Image trop grande")
+
+    @mock.patch.object(uploads, "IMAGE_UPLOAD_MAX_PIXELS", 64 * 64)
+    def test_pixel_limit_is_inclusive(self):
+        response = self.post_ticket("a.jpg", jpeg_bytes((65, 64)))
+        self.assertContains(response, "Image trop grande")
+
+        response = self.post_ticket("a.jpg", jpeg_bytes((64, 64)))
+        self.assertRedirects(response, reverse("feed"), fetch_redirect_response=False)
+        self.assertEqual(self.stored_image().size, (64, 64))
+
+    def test_exif_orientation_applied_and_metadata_stripped(self):
+        # Paysage 3000x1000 : moitié gauche rouge, moitié droite bleue
+        image = Image.new("RGB", (3000, 1000), "red")
+        image.paste("blue", (1500, 0, 3000, 1000))
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation : rotation de 90° dans le sens horaire
+        exif[0x010F] = "Appareil"  # Make
+        content = image_bytes(image, "JPEG", exif=exif)
+
+        self.post_ticket("a.jpg", content)
+
+        stored = self.stored_image()
+        self.assertEqual(stored.size, (267, 800))
+        self.assertEqual(len(stored.getexif()), 0)
+        self.assertNotIn("exif", stored.info)
+
+        # Après rotation, la moitié gauche se retrouve en haut
+        red, _, blue = stored.getpixel((133, 100))
+        self.assertGreater(red, 200)
+        self.assertLess(blue, 50)
+        red, _, blue = stored.getpixel((133, 700))
+        self.assertLess(red, 50)
+        self.assertGreater(blue, 200)
+
+    def test_png_text_chunks_stripped(self):
+        info = PngImagePlugin.PngInfo()
+        info.add_text("Author", "Quelqu'un")
+        content = image_bytes(Image.new("RGB", (64, 64), "red"), "PNG", pnginfo=info)
+
+        self.post_ticket("a.png", content)
+
+        stored = self.stored_image()
+        self.assertEqual(stored.format, "PNG")
+        self.assertNotIn("Author", stored.info)
+
+
+class RegenerateImagesTests(MediaTestCase):
+    """Régénération des images par génération (commande regenerate_images)"""
+
+    def stored_ticket(self, color):
+        name = image_storage().save(
+            "tickets/livre.jpg", ContentFile(jpeg_bytes((200, 100), color))
+        )
+        return Ticket.objects.create(user=self.user, title=color, image=name)
+
+    def test_image_stays_ready_while_regenerated(self):
+        ticket = self.stored_ticket("red")
+        statuses = []
+
+        def create_variants(field_file, *args):
+            statuses.append(Ticket.objects.get(pk=ticket.pk).image_status)
+            return (200, 100)
+
+        generation = images.current_generation() + 1
+        with mock.patch.object(images, "create_variants", create_variants):
+            for task in images.outdated_images(generation):
+                self.assertEqual(images.process_image(*task), images.READY)
+
+        self.assertEqual(statuses, [images.READY])
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.image_status, images.READY)
+        self.assertEqual(ticket.image_generation, 1)
+        self.assertEqual(images.current_generation(), 1)
+        self.assertEqual(images.count_outdated_images(1), 0)
+
+    def test_interrupted_run_resumed_from_current_generation(self):
+        first = self.stored_ticket("red")
+        second = self.stored_ticket("blue")
+
+        # Exécution interrompue après la première image
+        task = next(images.outdated_images(images.current_generation() + 1))
+        images.process_image(*task)
+
+        self.assertEqual(images.current_generation(), 1)
+        self.assertEqual(
+            [task[1] for task in images.outdated_images(1)], [second.pk]
+        )
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(second.image_status, images.READY)
+        self.assertEqual((first.image_generation, second.image_generation), (1, 0))
+
+    def test_new_upload_stamped_with_current_generation(self):
+        self.stored_ticket("red")
+        for task in images.outdated_images(1):
+            images.process_image(*task)
+
+        # Image envoyée après la régénération : traitée par le pool de threads
+        ticket = self.stored_ticket("blue")
+        images.process_image(
+            "blog.Ticket", ticket.pk, "image", ticket.image.name, Ticket.IMAGE_MAX_SIZE
+        )
+
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.image_generation, 1)
+        self.assertEqual(images.count_outdated_images(images.current_generation()), 0)
+
+    def test_dry_run_counts_images_of_next_generation(self):
+        self.stored_ticket("red")
+        output = StringIO()
+
+        call_command("regenerate_images", "--dry-run", stdout=output)
+        call_command("regenerate_images", "--dry-run", "--resume", stdout=output)
+
+        self.assertEqual(
+            output.getvalue(), "1 image(s) à traiter.\n0 image(s) à traiter.\n"
+        )
+
+
+
+class RegenerateImagesPoolTests(SimpleTestCase):
+    """
+    Commande regenerate_images lancée avec son pool de processus
+
+    Les processus ne voient pas la base de test en mémoire : la commande
+    est lancée dans un sous-processus, sur une base SQLite temporaire
+    """
+
+    SEED = """
+from io import BytesIO
+from PIL import Image
+from django.core.files.base import ContentFile
+from accounts.models import User
+from blog.models import Ticket
+from core.storage import image_storage
+
+user = User.objects.create_user("auteur")
+for color in ("red", "blue", "green"):
+    buffer = BytesIO()
+    Image.new("RGB", (1200, 600), color).save(buffer, format="JPEG")
+    name = image_storage().save("tickets/livre.jpg", ContentFile(buffer.getvalue()))
+    Ticket.objects.create(user=user, title=color, image=name)
+"""
+
+    RESULT = """
+from blog.models import Ticket
+for ticket in Ticket.objects.order_by("pk"):
+    print(ticket.image_status, ticket.image_generation, ticket.image_width)
+"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+        with open(os.path.join(self.directory, "pool_settings.py"), "w") as module:
+            module.write(
+                "from config.settings import *\n"
+                f"DATABASES = {{'default': {{'ENGINE': 'django.db.backends.sqlite3', "
+                f"'NAME': {os.path.join(self.directory, 'db.sqlite3')!r}}}}}\n"
+                f"MEDIA_ROOT = {os.path.join(self.directory, 'media')!r}\n"
+            )
+
+    def manage(self, *args):
+        environment = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": "pool_settings",
+            "PYTHONPATH": os.pathsep.join([self.directory, str(settings.BASE_DIR)]),
+        }
+        result = subprocess.run(
+            [sys.executable, "manage.py", *args],
+            cwd=settings.BASE_DIR,
+            env=environment,
+            capture_output=True,
+            text=True,
+            timeout=300,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return result.stdout
+
+    def test_images_regenerated_by_worker_processes(self):
+        self.manage("migrate", "-v0")
+        self.manage("shell", "-v0", "-c", self.SEED)
+
+        output = self.manage("regenerate_images", "--workers", "2")
+
+        self.assertIn("3 image(s) régénérée(s).", output)
+        self.assertEqual(
+            self.manage("shell", "-v0", "-c", self.RESULT).splitlines(),
+            ["READY 1 800"] * 3,
+        )
+        output = self.manage("regenerate_images", "--resume", "--workers", "2")
+        self.assertIn("0 image(s) régénérée(s).", output)
+
+class OrphanMediaTests(MediaTestCase):
+    """Ramasse-miettes des fichiers média (commande collect_orphan_media)"""
+
+    def setUp(self):
+        super().setUp()
+        storage = image_storage()
+        self.kept = storage.save("tickets/a.jpg", ContentFile(jpeg_bytes((20, 10))))
+        self.orphan = storage.save(
+            "tickets/b.jpg", ContentFile(jpeg_bytes((20, 10), "blue"))
+        )
+        Ticket.objects.create(user=self.user, title="Livre", image=self.kept)
+
+    def write_derived(self, name, age=48 * 3600):
+        """Variantes et copies AVIF / WebP de name, modifiées il y a age secondes"""
+        variant = images.variant_name(name, 400)
+        paths = [name, variant, name + ".webp", variant + ".avif", variant + ".webp"]
+        for path in paths[1:]:
+            image_storage().overwrite(path, ContentFile(b"derive"))
+
+        modified = time.time() - age
+        for path in paths:
+            os.utime(self.media_path(path), (modified, modified))
+        return paths
+
+    def test_derived_files_of_referenced_original_are_kept(self):
+        kept = self.write_derived(self.kept)
+        removed = self.write_derived(self.orphan)
+
+        call_command("collect_orphan_media", "--delete", stdout=StringIO())
+
+        for path in kept:
+            self.assertTrue(os.path.exists(self.media_path(path)), path)
+        for path in removed:
+            self.assertFalse(os.path.exists(self.media_path(path)), path)
+
+    def test_recent_files_are_kept(self):
+        recent = self.write_derived(self.orphan, age=3600)
+
+        output = StringIO()
+        call_command("collect_orphan_media", "--min-age", "2", stdout=output)
+        self.assertIn("0 fichier(s) orphelin(s).", output.getvalue())
+
+        call_command(
+            "collect_orphan_media", "--delete", "--min-age", "0.5", stdout=StringIO()
+        )
+        for path in recent:
+            self.assertFalse(os.path.exists(self.media_path(path)), path)
+
+    def test_quarantine_keeps_tree(self):
+        quarantine = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, quarantine, ignore_errors=True)
+        self.write_derived(self.orphan)
+
+        call_command(
+            "collect_orphan_media", "--quarantine", quarantine, stdout=StringIO()
+        )
+
+        self.assertTrue(os.path.exists(os.path.join(quarantine, self.orphan)))
+        self.assertFalse(os.path.exists(self.media_path(self.orphan)))
+        self.assertTrue(os.path.exists(self.media_path(self.kept)))
+
+
+class MediaViewTests(MediaTestCase):
+    """Envoi des fichiers média (core/media.py)"""
+
+    def setUp(self):
+        super().setUp()
+        self.name = image_storage().save(
+            "tickets/fichier.txt", ContentFile(b"0123456789")
+        )
+        self.url = reverse("media", kwargs={"path": self.name})
+
+    def get(self, url=None, **headers):
+        return self.client.get(url or self.url, headers=headers)
+
+    def content(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_full_file(self):
+        response = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.content(response), b"0123456789")
+        self.assertEqual(response["ETag"], f'"{os.path.basename(self.name)}"')
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("immutable", response["Cache-Control"])
+
+    def test_file_not_addressed_is_revalidated(self):
+        os.makedirs(self.media_path("tickets"), exist_ok=True)
+        with open(self.media_path("tickets/ancien.txt"), "wb") as old_file:
+            old_file.write(b"ancien")
+
+        response = self.get(reverse("media", kwargs={"path": "tickets/ancien.txt"}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("immutable", response["Cache-Control"])
+        self.assertIn("max-age=3600", response["Cache-Control"])
+
+    def test_derived_file_is_revalidated(self):
+        name = images.variant_name(self.name, 400) + ".webp"
+        image_storage().overwrite(name, ContentFile(b"variante"))
+        url = reverse("media", kwargs={"path": name})
+
+        response = self.get(url)
+        self.assertEqual(response["Content-Type"], "image/webp")
+        self.assertNotIn("immutable", response["Cache-Control"])
+        self.assertIn("max-age=3600", response["Cache-Control"])
+
+        # Réécrite par une régénération : l'ancien ETag ne correspond plus
+        etag = response["ETag"]
+        image_storage().overwrite(name, ContentFile(b"variante regeneree"))
+
+        response = self.get(url, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.content(response), b"variante regeneree")
+
+    def test_not_modified(self):
+        etag = self.get()["ETag"]
+
+        response = self.get(if_none_match=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_partial_content(self):
+        for header, content, content_range in (
+            ("bytes=2-5", b"2345", "bytes 2-5/10"),
+            ("bytes=7-", b"789", "bytes 7-9/10"),
+            ("bytes=-3", b"789", "bytes 7-9/10"),
+            ("bytes=8-20", b"89", "bytes 8-9/10"),
+        ):
+            with self.subTest(header):
+                response = self.get(range=header)
+
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(self.content(response), content)
+                self.assertEqual(response["Content-Range"], content_range)
+                self.assertEqual(response["Content-Length"], str(len(content)))
+
+    def test_range_not_satisfiable(self):
+        response = self.get(range="bytes=10-")
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */10")
+
+    def test_ignored_ranges_send_full_file(self):
+        for headers in (
+            {"range": "bytes=9-3"},
+            {"range": "bytes=0-1,4-5"},
+            {"range": "bytes=2-5", "if_range": '"ancien"'},
+        ):
+            with self.subTest(**headers):
+                response = self.get(**headers)
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(self.content(response), b"0123456789")
+
+    def test_missing_file(self):
+        response = self.get(reverse("media", kwargs={"path": "tickets/absent.jpg"}))
+        self.assertEqual(response.status_code, 404)
+
+        response = self.get(reverse("media", kwargs={"path": "tickets"}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_path_traversal(self):
+        # Fichier hors de MEDIA_ROOT, dans un dossier voisin
+        outside = tempfile.mkdtemp(dir=os.path.dirname(self.media_root))
+        self.addCleanup(shutil.rmtree, outside, ignore_errors=True)
+        with open(os.path.join(outside, "secret.txt"), "w") as secret:
+            secret.write("secret")
+        relative = f"{os.path.basename(outside)}/secret.txt"
+
+        for path in (
+            f"/media/../{relative}",
+            f"/media/tickets/../../{relative}",
+            f"/media/%2e%2e/{relative}",
+            f"/media/{os.path.join(outside, 'secret.txt')}",
+        ):
+            with self.subTest(path):
+                response = self.get(path)
+                self.assertIn(response.status_code, (400, 404))
+
+
+class DuplicateReviewTests(TestCase):
+    """Double envoi d'une critique : contrainte unique ticket / utilisateur"""
+
+    def test_concurrent_review_redirects_with_message(self):
+        author = User.objects.create_user("auteur")
+        reader = User.objects.create_user("lecteur")
+        ticket = Ticket.objects.create(user=author, title="Livre")
+        # Critique enregistrée par la première requête, après la vérification
+        # préalable de la seconde (simulée en masquant la critique existante)
+        Review.objects.create(ticket=ticket, user=reader, rating=3, headline="A")
+        self.client.force_login(reader)
+
+        with mock.patch("django.db.models.query.QuerySet.first", return_value=None):
+            response = self.client.post(
+                reverse("review_create", kwargs={"ticket_id": ticket.id}),
+                {"headline": "B", "rating": 4, "body": ""},
+            )
+
+        self.assertRedirects(response, reverse("feed"), fetch_redirect_response=False)
+        self.assertEqual(
+            [str(message) for message in get_messages(response.wsgi_request)],
+            ["Vous avez déjà publié une critique pour ce ticket."],
+        )
+        self.assertEqual(Review.objects.filter(ticket=ticket).count(), 1)
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.review_count, 1)
+
+
+class AvatarTemplateTests(TestCase):
+    """Avatar partagé par les cartes et les pages d'abonnements (avatar.html)"""
+
+    def setUp(self):
+        self.me = User.objects.create_user("moi")
+        self.other = User.objects.create_user(
+            "autre", profile_photo="profile_pics/ab/photo.jpg"
+        )
+
+    def test_box_size_follows_size_parameter(self):
+        for size, expected in ((None, 40), (48, 48), (96, 96)):
+            with self.subTest(size=size):
+                html = render_to_string(
+                    "core/includes/avatar.html", {"person": self.other, "size": size}
+                )
+
+                self.assertIn(f'width="{expected}" height="{expected}"', html)
+                self.assertIn(f"width: {expected}px; height: {expected}px", html)
+                self.assertIn("profile_pics/ab/photo_48w.jpg", html)
+
+    def test_subscriptions_pages_use_shared_avatar(self):
+        UserFollows.objects.create(user=self.me, followed_user=self.other)
+        UserFollows.objects.create(user=self.other, followed_user=self.me)
+        self.client.force_login(self.me)
+
+        response = self.client.get(reverse("subscriptions"))
+        self.assertTemplateUsed(response, "core/includes/avatar.html")
+        self.assertContains(response, 'width="48" height="48"', count=2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            UserFollows.objects.filter(user=self.me).delete()
+            UserBlock.objects.create(blocker=self.me, blocked_user=self.other)
+
+        response = self.client.get(reverse("blocked_users"))
+        self.assertTemplateUsed(response, "core/includes/avatar.html")
+        self.assertContains(response, "grayscale")
+
+
+class CardCacheTests(TestCase):
+    """Fragments {% cache %} des cartes du flux : une modification vide la carte"""
+
+    def setUp(self):
+        self.me = User.objects.create_user("moi")
+        self.author = User.objects.create_user(
+            "auteur", profile_photo="profile_pics/ab/photo.jpg"
+        )
+        self.critic = User.objects.create_user("critique")
+        self.ticket = Ticket.objects.create(
+            title="Titre initial", description="Description", user=self.author
+        )
+        self.review = Review.objects.create(
+            ticket=self.ticket, rating=4, headline="Avis initial", body="Corps",
+            user=self.critic,
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def render_card(self, content_type, post_id):
+        """Carte rendue à partir d'un post relu en base, comme dans le flux"""
+        posts = feed.load_posts([(content_type, post_id)])
+        feed.annotate_viewer_flags(posts, self.me, set())
+        return render_to_string(
+            "core/includes/feed_post.html", {"post": posts[0], "user": self.me}
+        )
+
+    def render_cards(self):
+        return {
+            "ticket": self.render_card(feed.TICKET, self.ticket.id),
+            "review": self.render_card(feed.REVIEW, self.review.id),
+        }
+
+    def test_unchanged_card_served_from_cache(self):
+        self.render_cards()
+
+        # Modification hors clé de cache (update ne touche pas time_updated)
+        Ticket.objects.filter(id=self.ticket.id).update(title="Titre caché")
+        Review.objects.filter(id=self.review.id).update(headline="Avis caché")
+
+        cards = self.render_cards()
+        self.assertIn("Titre initial", cards["ticket"])
+        self.assertIn("Avis initial", cards["review"])
+        self.assertNotIn("caché", cards["ticket"] + cards["review"])
+
+    def test_review_edit_refreshes_card(self):
+        self.render_cards()
+
+        self.review.headline = "Avis modifié"
+        self.review.save()
+
+        self.assertIn("Avis modifié", self.render_card(feed.REVIEW, self.review.id))
+
+    def test_ticket_edit_refreshes_ticket_and_review_cards(self):
+        self.render_cards()
+
+        self.ticket.title = "Titre modifié"
+        self.ticket.save()
+
+        # La carte de la critique affiche l'aperçu du ticket
+        for name, html in self.render_cards().items():
+            with self.subTest(card=name):
+                self.assertIn("Titre modifié", html)
+
+    def test_author_rename_refreshes_cards(self):
+        self.render_cards()
+
+        self.author.username = "auteur_renomme"
+        self.author.save()
+
+        # Auteur du ticket, et du ticket cité par la critique
+        for name, html in self.render_cards().items():
+            with self.subTest(card=name):
+                self.assertIn("auteur_renomme", html)
+
+    def test_author_photo_change_refreshes_cards(self):
+        self.render_cards()
+
+        self.critic.profile_photo = "profile_pics/cd/nouvelle.jpg"
+        self.critic.save()
+        self.author.profile_photo = "profile_pics/cd/autre.jpg"
+        self.author.save()
+
+        cards = self.render_cards()
+        self.assertIn("profile_pics/cd/autre_48w.jpg", cards["ticket"])
+        self.assertIn("profile_pics/cd/nouvelle_48w.jpg", cards["review"])
+
+    def test_author_photo_status_refreshes_cards(self):
+        # Variantes pas encore prêtes : l'avatar pointe vers l'original
+        self.author.profile_photo_status = images.PENDING
+        self.author.save()
+        self.assertNotIn("photo_48w.jpg", self.render_card(feed.TICKET, self.ticket.id))
+
+        self.author.profile_photo_status = images.READY
+        self.author.save()
+
+        html = self.render_card(feed.TICKET, self.ticket.id)
+        self.assertIn("profile_pics/ab/photo_48w.jpg", html)
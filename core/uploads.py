@@ -0,0 +1,92 @@
+"""
+Limites des images envoyées (taille du fichier, nombre de pixels)
+
+La taille est contrôlée pendant la réception : au-delà de
+IMAGE_UPLOAD_MAX_BYTES, la suite du fichier n'est ni gardée en mémoire
+ni écrite sur disque, et le formulaire affiche une erreur.
+Le nombre de pixels est lu dans l'en-tête, avant tout décodage.
+"""
+
+from io import BytesIO
+
+from django import forms
+from django.conf import settings
+from django.db import models
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.template.defaultfilters import filesizeformat
+
+# Taille maximale d'un fichier envoyé (octets)
+IMAGE_UPLOAD_MAX_BYTES = getattr(settings, "IMAGE_UPLOAD_MAX_BYTES", 5 * 1024 * 1024)
+
+# Nombre maximal de pixels d'une image envoyée (largeur x hauteur)
+IMAGE_UPLOAD_MAX_PIXELS = getattr(settings, "IMAGE_UPLOAD_MAX_PIXELS", 25_000_000)
+
+
+class OversizedUpload(UploadedFile):
+    """
+    Fichier refusé car trop volumineux : vide, seule sa taille reçue est conservée
+
+    Sa taille (size) est nulle : tout champ fichier le refuse comme fichier
+    vide, BoundedImageField affiche la taille maximale (received)
+    """
+
+    def __init__(self, name, content_type, received):
+        super().__init__(BytesIO(), name, content_type, 0)
+        self.received = received
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    """
+    Premier gestionnaire d'envoi (FILE_UPLOAD_HANDLERS) : ne transmet pas
+    aux gestionnaires suivants les données au-delà de IMAGE_UPLOAD_MAX_BYTES
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > IMAGE_UPLOAD_MAX_BYTES:
+            return None
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.received > IMAGE_UPLOAD_MAX_BYTES:
+            return OversizedUpload(self.file_name, self.content_type, self.received)
+        return None
+
+
+class BoundedImageField(forms.ImageField):
+    """Champ image qui refuse les fichiers trop lourds et les images trop grandes"""
+
+    def to_python(self, data):
+        if isinstance(data, OversizedUpload) or (
+            data and data.size > IMAGE_UPLOAD_MAX_BYTES
+        ):
+            raise ValidationError(
+                "Fichier trop volumineux (%(size)s maximum).",
+                code="file_too_large",
+                params={"size": filesizeformat(IMAGE_UPLOAD_MAX_BYTES)},
+            )
+
+        upload = super().to_python(data)
+        if upload is None:
+            return None
+
+        # Dimensions lues dans l'en-tête (image vérifiée, pas décodée)
+        width, height = upload.image.size
+        if width * height > IMAGE_UPLOAD_MAX_PIXELS:
+            raise ValidationError(
+                "Image trop grande (%(pixels)s mégapixels maximum).",
+                code="image_too_large",
+                params={"pixels": IMAGE_UPLOAD_MAX_PIXELS // 1_000_000},
+            )
+
+        return upload
+
+
+# Admin (formfield_overrides) : images limitées comme dans les formulaires du site
+IMAGE_FORMFIELD_OVERRIDES = {models.ImageField: {"form_class": BoundedImageField}}
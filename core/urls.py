@@ -5,4 +5,7 @@ from . import views
 urlpatterns = [
     path("", views.home_page, name="home"),
     path("feed/", views.feed_page, name="feed"),
+    path("feed/stream/", views.feed_stream_page, name="feed_stream"),
+    path("feed/more/", views.feed_more, name="feed_more"),
+    path("feed/async/", views.feed_page_async, name="feed_async"),
 ]
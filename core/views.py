@@ -1,11 +1,17 @@
-from itertools import chain
+import asyncio
 
+from asgiref.sync import sync_to_async
 from django.contrib.auth.decorators import login_required
+from django.http import StreamingHttpResponse
 from django.shortcuts import render, redirect
-from django.db.models import Q, Value, CharField
+from django.template.loader import get_template, render_to_string
+from django.urls import reverse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import etag
 
-from accounts.models import UserFollows, UserBlock
-from blog.models import Ticket, Review
+from accounts import relationships
+from . import feed
+from .etags import user_page_etag
 
 
 def home_page(request):
@@ -22,7 +28,23 @@ def home_page(request):
     return render(request, "core/home.html")
 
 
+def feed_etag(request):
+    """
+    ETag d'une page du flux, sans requête en base
+
+    La version du flux change à chaque publication, modification,
+    suppression, abonnement ou blocage qui concerne l'utilisateur, et quand
+    un auteur affiché change de nom, de photo, ou qu'une image est traitée
+    (voir core/signals.py)
+    """
+    return user_page_etag(
+        request, feed.get_feed_version(request.user.id), request.GET.get("cursor", "")
+    )
+
+
 @login_required
+@cache_control(private=True, no_cache=True)
+@etag(feed_etag)
 def feed_page(request):
     """
     Page du flux pour les utilisateurs connectés
@@ -33,78 +55,157 @@ def feed_page(request):
     - Les critiques en réponse aux tickets de l'utilisateur
 
     Exclut les utilisateurs bloqués (bidirectionnel)
+    Pagination par curseur : seuls les posts de la page demandée sont chargés
+    Requête conditionnelle : 304 si le flux n'a pas changé (voir feed_etag)
     """
 
-    # Récupération des utilisateurs suivis
-    followed_users = UserFollows.objects.filter(
-        user=request.user
-    ).values_list('followed_user', flat=True)
-
-    # Récupération des utilisateurs bloqués (bidirectionnel)
-    # 1. Utilisateurs que j'ai bloqués
-    blocked_by_me = UserBlock.objects.filter(
-        blocker=request.user
-    ).values_list('blocked_user_id', flat=True)
-
-    # 2. Utilisateurs qui m'ont bloqué
-    blocked_me = UserBlock.objects.filter(
-        blocked_user=request.user
-    ).values_list('blocker_id', flat=True)
-
-    # Combine les deux listes (set supprime les doublons)
-    blocked_ids = set(blocked_by_me) | set(blocked_me)
-
-    # Récupération des tickets (demandes de critique)
-    tickets = Ticket.objects.filter(
-        Q(user=request.user) |  # Mes tickets
-        Q(user__in=followed_users)  # Tickets des utilisateurs suivis
-    ).exclude(
-        user__id__in=blocked_ids  # Exclut les utilisateurs bloqués
-    ).annotate(
-        content_type=Value('TICKET', output_field=CharField())
-    )
+    # Relations de l'utilisateur (depuis le cache)
+    followed_ids, blocked_ids = relationships.get_relationships(request.user)
 
-    # Récupération des critiques
-    reviews = Review.objects.filter(
-        Q(user=request.user) |  # Mes critiques
-        Q(user__in=followed_users) |  # Critiques des utilisateurs suivis
-        Q(ticket__user=request.user)  # Critiques sur mes tickets
-    ).exclude(
-        user__id__in=blocked_ids  # Exclut les utilisateurs bloqués
-    ).annotate(
-        content_type=Value('REVIEW', output_field=CharField())
-    )
+    # Page du flux demandée (curseur absent : première page)
+    cursor = feed.decode_cursor(request.GET.get("cursor"))
+
+    # Page lue dans le flux matérialisé (tickets et critiques déjà fusionnés)
+    # La première page se limite au premier écran (suite chargée au défilement)
+    page_size = feed.FEED_PAGE_SIZE if cursor else feed.FEED_FIRST_PAGE_SIZE
+    posts, next_cursor = feed.get_feed_page(request.user, cursor, page_size)
+
+    # Indicateurs propres au lecteur : ses posts, ses critiques déjà publiées
+    # et les auteurs bloqués (une requête pour toute la page)
+    feed.annotate_viewer_flags(posts, request.user, blocked_ids)
+
+    # Vérifie si l'utilisateur suit au moins une personne
+    has_following = bool(followed_ids)
+
+    context = {
+        "posts": posts,
+        "has_following": has_following,
+        "cursor": cursor,
+        "next_cursor": next_cursor,
+        "feed_url": reverse("feed"),
+        "fragment_url": reverse("feed_more"),
+        "active_page": "feed",
+    }
+
+    return render(request, "core/feed.html", context)
 
-    # Combine tickets et critiques dans un seul flux
-    combined_posts = chain(tickets, reviews)
 
-    # Trie par date (plus récent en premier)
-    posts = sorted(
-        combined_posts,
-        key=lambda post: post.time_created,
-        reverse=True
+@login_required
+async def feed_page_async(request):
+    """
+    Version asynchrone de la page du flux (servie par config/asgi.py)
+
+    Les relations et la page du flux sont attendues ensemble (asyncio.gather),
+    mais l'ORM asynchrone de Django passe par un seul thread
+    (sync_to_async, thread_sensitive=True) : les requêtes s'exécutent
+    l'une après l'autre. La boucle d'événements reste libre pendant l'attente
+    """
+
+    user = await request.auser()
+    cursor = feed.decode_cursor(request.GET.get("cursor"))
+    page_size = feed.FEED_PAGE_SIZE if cursor else feed.FEED_FIRST_PAGE_SIZE
+
+    (followed_ids, blocked_ids), (posts, next_cursor) = await asyncio.gather(
+        relationships.aget_relationships(user),
+        feed.aget_feed_page(user, cursor, page_size),
     )
 
-    # Pour chaque ticket, vérifie si l'utilisateur a déjà répondu
-    # et si l'auteur est bloqué
-    for post in posts:
-        if post.content_type == "TICKET":
-            # Cherche une critique existante de l'utilisateur pour ce ticket
-            post.user_review = Review.objects.filter(
-                ticket=post,
-                user=request.user
-            ).first()
+    await feed.aannotate_viewer_flags(posts, user, blocked_ids)
 
-            # Vérifie si l'auteur du ticket est bloqué
-            post.is_blocked = post.user.id in blocked_ids
+    context = {
+        "posts": posts,
+        "has_following": bool(followed_ids),
+        "cursor": cursor,
+        "next_cursor": next_cursor,
+        "feed_url": reverse("feed_async"),
+        "fragment_url": reverse("feed_more"),
+        "active_page": "feed",
+    }
 
-    # Vérifie si l'utilisateur suit au moins une personne
-    has_following = UserFollows.objects.filter(user=request.user).exists()
+    # Le rendu (gabarits, session, messages) reste synchrone
+    return await sync_to_async(render)(request, "core/feed.html", context)
+
+
+@login_required
+def feed_more(request):
+    """
+    Fragment HTML du flux pour le défilement infini
+
+    Retourne uniquement les cartes de la page suivant le curseur,
+    suivies de la pagination pointant vers la page d'après
+    """
+
+    blocked_ids = relationships.get_blocked_ids(request.user)
+    cursor = feed.decode_cursor(request.GET.get("cursor"))
+
+    posts, next_cursor = feed.get_feed_page(request.user, cursor)
+    feed.annotate_viewer_flags(posts, request.user, blocked_ids)
 
     context = {
         "posts": posts,
+        "feed_url": reverse("feed"),
+        "fragment_url": reverse("feed_more"),
+        "next_cursor": next_cursor,
+    }
+
+    return render(request, "core/includes/feed_fragment.html", context)
+
+
+# Marqueurs remplacés par le contenu envoyé au fil de l'eau (mode streaming)
+STREAM_POSTS_MARKER = "__FEED_STREAM_POSTS__"
+STREAM_PAGINATION_MARKER = "__FEED_STREAM_PAGINATION__"
+
+
+@login_required
+def feed_stream_page(request):
+    """
+    Flux en mode streaming
+
+    L'en-tête de la page et les premières cartes sont envoyés avant
+    que la suite du flux ne soit lue : les posts sont chargés par lots
+    et chaque carte est transmise dès qu'elle est rendue
+    """
+
+    followed_ids, blocked_ids = relationships.get_relationships(request.user)
+    cursor = feed.decode_cursor(request.GET.get("cursor"))
+    has_following = bool(followed_ids)
+
+    context = {
+        "streaming": True,
+        "stream_marker": STREAM_POSTS_MARKER,
+        "pagination_marker": STREAM_PAGINATION_MARKER,
         "has_following": has_following,
         "active_page": "feed",
     }
 
-    return render(request, "core/feed.html", context)
\ No newline at end of file
+    # Squelette de la page, découpé autour des marqueurs
+    page = render_to_string("core/feed.html", context, request)
+    head, rest = page.split(STREAM_POSTS_MARKER)
+    middle, tail = rest.split(STREAM_PAGINATION_MARKER)
+
+    stream = feed.FeedStream(request.user, blocked_ids, cursor)
+
+    def render_page():
+        yield head
+
+        post_template = get_template("core/includes/feed_post.html")
+        for post in stream:
+            yield post_template.render({"post": post, "user": request.user})
+
+        if not stream.count:
+            yield render_to_string(
+                "core/includes/feed_empty.html", {"has_following": has_following}
+            )
+
+        yield middle
+        yield render_to_string(
+            "core/includes/feed_pagination.html",
+            {
+                "feed_url": reverse("feed_stream"),
+                "cursor": cursor,
+                "next_cursor": stream.next_cursor,
+            },
+        )
+        yield tail
+
+    return StreamingHttpResponse(render_page(), content_type="text/html; charset=utf-8")
\ No newline at end of file
@@ -0,0 +1,86 @@
+/**
+ * Défilement infini du flux
+ *
+ * Quand la pagination du flux devient visible, la page suivante est
+ * demandée au serveur sous forme de fragment HTML (cartes + pagination).
+ * Les cartes sont ajoutées au flux et la pagination est remplacée par
+ * celle du fragment. Sans JavaScript, le lien « Publications plus
+ * anciennes » continue de fonctionner normalement.
+ */
+
+document.addEventListener('DOMContentLoaded', function() {
+    const container = document.getElementById('feed-posts');
+
+    if (!container || !('IntersectionObserver' in window)) {
+        return;
+    }
+
+    let loading = false;
+
+    // Charge le fragment suivant et remplace la pagination observée
+    async function loadMore(pagination, observer) {
+        if (loading) return;
+        loading = true;
+        observer.unobserve(pagination);
+
+        try {
+            const response = await fetch(pagination.dataset.fragmentUrl, {
+                headers: { 'X-Requested-With': 'XMLHttpRequest' },
+                credentials: 'same-origin',
+            });
+
+            // Session expirée : fetch a suivi la redirection vers la page de
+            // connexion. La page est rechargée pour que la connexion ramène au flux
+            if (response.redirected) {
+                window.location.reload();
+                return;
+            }
+
+            if (!response.ok) {
+                throw new Error(`Réponse ${response.status}`);
+            }
+
+            const fragment = document.createElement('template');
+            fragment.innerHTML = await response.text();
+
+            // Pagination de la page suivante (absente en fin de flux)
+            const nextPagination = fragment.content.querySelector('nav[aria-label="Pagination du flux"]');
+            if (nextPagination) {
+                nextPagination.remove();
+            }
+
+            container.append(fragment.content);
+
+            if (nextPagination) {
+                pagination.replaceWith(nextPagination);
+                observePagination(nextPagination, observer);
+            } else {
+                pagination.remove();
+            }
+        } catch (error) {
+            // En cas d'erreur, le lien de pagination classique reste utilisable
+            console.error('Erreur lors du chargement du flux :', error);
+        } finally {
+            loading = false;
+        }
+    }
+
+    function observePagination(pagination, observer) {
+        if (pagination.hasAttribute('data-infinite-scroll')) {
+            observer.observe(pagination);
+        }
+    }
+
+    const observer = new IntersectionObserver(function(entries) {
+        entries.forEach(entry => {
+            if (entry.isIntersecting) {
+                loadMore(entry.target, observer);
+            }
+        });
+    }, { rootMargin: '400px' });
+
+    const pagination = document.querySelector('nav[data-infinite-scroll]');
+    if (pagination) {
+        observePagination(pagination, observer);
+    }
+});